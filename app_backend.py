@@ -1,13 +1,40 @@
-from flask import Flask, send_file, request, jsonify, session, render_template
+from flask import Flask, send_file, request, jsonify, session, render_template, has_request_context, Response, stream_with_context, g
 import os
+import json
+import logging
+import re
+import shutil
 import uuid
 import subprocess
+import time
+from contextvars import ContextVar
 from datetime import datetime
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage
 from langchain_core.tools import tool
 from typing import Optional
 from dotenv import load_dotenv
+from workspace import workspaces
+from conversation_store import create_conversation_store, DEFAULT_PAGE_SIZE
+from context_builder import build_context
+from document_store import document_store
+from resume_template import RESUME_PREAMBLE, render_resume
+from resume_data import apply_resume_patch, ResumeDataError
+from latex_sections import patch_section, SectionError
+from latex_cleanup import extract_latex_from_response
+from latex_validator import validate_latex
+from latex_log import read_log, parse_log, describe_error, local_fixes, excerpt_bounds
+from compile_cache import pdf_cache
+from latex_compiler import discover_compiler, get_compiler
+from latex_format import format_load_failed, latex_formats
+from compile_scheduler import CompileScheduler, CompileJob, QueueFullError
+from logging_setup import configure_logging
+from llm_cassette import open_cassette
+from llm_cache import llm_response_cache
+from prompt_registry import prompts
+from metrics import registry, session_activity, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS, LLM_REQUEST_SECONDS, LLM_TOKENS, TOOL_SECONDS, PDFLATEX_SECONDS
+from tracing import start_trace, finish_trace, current_trace, activate, span
 
 
 
@@ -15,6 +42,9 @@ from dotenv import load_dotenv
 # environment variables
 load_dotenv()
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 
 
 
@@ -22,8 +52,49 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  
 
-conversation_messages = {}  
-conversation_metadata = {}  
+
+def forget_session_files(session_id):
+    """Drop what a conversation keeps outside the conversation store: its workspace and document history"""
+    document_store.forget(session_id)
+    workspaces.remove(session_id)
+
+
+# Conversation history lives in a pluggable store (in-memory LRU or SQLite);
+# conversations it evicts take their workspace with them
+conversation_store = create_conversation_store(on_evict=forget_session_files)
+
+
+# Endpoints whose responses carry a Server-Timing header (tracing.py)
+TRACED_ENDPOINTS = {'chat', 'chat_stream', 'generate_and_compile', 'compile_resume'}
+
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    if request.endpoint in TRACED_ENDPOINTS:
+        start_trace(request.endpoint)
+    else:
+        # Drop anything a request that failed before after_request left behind
+        finish_trace()
+
+
+@app.after_request
+def record_request_metrics(response):
+    """Per-route request count and latency; the route template keeps label cardinality bounded"""
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    started = g.get('request_started')
+    if started is not None:
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=route, method=request.method)
+    HTTP_REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+    session_activity.touch(session.get('conversation_id'))
+    
+    trace = finish_trace()
+    if trace is not None:
+        response.headers['Server-Timing'] = trace.server_timing()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("⏱️ %s %s: %s", request.method, route, response.headers['Server-Timing'],
+                         extra={'trace': trace.to_dict()})
+    return response
 
 # Initialize LangChain Groq client
 llm = None
@@ -32,13 +103,40 @@ llm_with_tools = None
 # LATEX TOOLS AND COMPILATION FUNCTIONS
 
 
+# Set by the async handlers (asgi_app.py), which run outside a Flask request context
+request_session_id = ContextVar('request_session_id', default=None)
+
+
+def current_session_id():
+    """Conversation ID of the active request, if there is one"""
+    if has_request_context():
+        return session.get('conversation_id')
+    return request_session_id.get()
+
+
+
+
+def check_latex(latex_code: str) -> dict:
+    """Run the static LaTeX checks (see latex_validator.py), logging repairs and errors"""
+    started = time.perf_counter()
+    check = validate_latex(latex_code)
+    elapsed_us = int((time.perf_counter() - started) * 1_000_000)
+    if check['repairs']:
+        logger.info("🩹 LaTeX auto-repaired in %d µs: %s", elapsed_us, '; '.join(check['repairs']))
+    if not check['valid']:
+        logger.warning("🚫 LaTeX check failed in %d µs: %s", elapsed_us, '; '.join(check['errors']))
+    return check
+
+
+def repair_note(check: dict) -> str:
+    return f" Auto-repaired: {'; '.join(check['repairs'])}." if check['repairs'] else ""
 
 
 @tool
 def write_latex(latex_code: str) -> dict:
 
     """
-    Writes LaTeX code to an output.tex file.
+    Writes LaTeX code to the current conversation's output.tex file.
     
     Args:
         latex_code (str): The LaTeX code to write to the file.
@@ -48,38 +146,36 @@ def write_latex(latex_code: str) -> dict:
             - success (bool): True if the write operation succeeded, False otherwise.
             - message (str): Status message or error details.
             - output_file (str, optional): Path to the written file if successful.
+            - latex_code (str, optional): The code as written, after automatic repairs.
     """
-    
-
-    # DEBUG: Print when tool is being used
-    print("\n" + "="*80)
-    print("🔧 WRITE_LATEX TOOL INVOKED")
-    print("="*80)
-    print(f"📄 LaTeX code length: {len(latex_code)} characters")
-    print(f"⏰ Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("-"*80)
-    print("📝 LATEX CODE CONTENT:")
-    print("-"*80)
-    print(latex_code)
-    print("-"*80)
+    logger.info("🔧 write_latex invoked with %d characters of LaTeX", len(latex_code))
+    # The full source only at DEBUG; it is most of what this tool would log
+    logger.debug("LaTeX source:\n%s", latex_code)
     
     try:
-        tex_file = "output.tex"
+        check = check_latex(latex_code)
+        if not check['valid']:
+            return {
+                "success": False,
+                "message": "The LaTeX has errors, nothing was written: " + "; ".join(check['errors'])
+            }
+        latex_code = check['latex_code']
         
-        with open(tex_file, "w", encoding="utf-8") as f:
-            f.write(latex_code)
+        workspace = workspaces.get(current_session_id())
+        tex_file = workspace.write_source(latex_code)
+        # Hand-written LaTeX replaces whatever the resume data rendered
+        workspace.drop_data()
         
         if os.path.exists(tex_file):
-            print("✅ SUCCESS: LaTeX code written to output.tex successfully")
-            print("="*80 + "\n")
+            logger.info("✅ LaTeX code written to %s", tex_file)
             return {
                 "success": True,
-                "message": "LaTeX code written to output.tex successfully.",
-                "output_file": os.path.abspath(tex_file)
+                "message": "LaTeX code written to output.tex successfully." + repair_note(check),
+                "output_file": tex_file,
+                "latex_code": latex_code
             }
         else:
-            print("❌ FAILED: Could not verify that output.tex was written")
-            print("="*80 + "\n")
+            logger.error("❌ Could not verify that output.tex was written")
             return {
                 "success": False,
                 "message": "Failed to verify that output.tex was written."
@@ -88,219 +184,546 @@ def write_latex(latex_code: str) -> dict:
 
 
     except PermissionError:
-        print("❌ PERMISSION ERROR: Permission denied while writing to output.tex")
-        print("="*80 + "\n")
+        logger.error("❌ Permission denied while writing to output.tex")
         return {
             "success": False,
             "message": "Permission denied while writing to output.tex."
         }
     except Exception as e:
-        print(f"❌ EXCEPTION ERROR: {str(e)}")
-        print("="*80 + "\n")
+        logger.exception("❌ write_latex failed: %s", e)
+        return {
+            "success": False,
+            "message": f"An unexpected error occurred: {str(e)}"
+        }
+
+
+@tool
+def update_resume_data(resume_json: str) -> dict:
+    """
+    Creates or updates the resume from structured data; the server renders the LaTeX.
+    Prefer this over write_latex: send only what changes.
+    
+    Args:
+        resume_json (str): A JSON merge patch applied to the current resume data.
+            Objects are merged, lists replace the whole list, null deletes a key.
+            Sections (all optional):
+            - header: {name, email, phone, linkedin, github, website, location}
+            - summary: string
+            - skills: [{category, items: [string]}]
+            - experience: [{title, company, location, dates, bullets: [string]}]
+            - projects: [{name, technologies, date, bullets: [string]}]
+            - achievements: [{name, year, description}]
+            - certifications: [{name, description}]
+            - education: [{institution, degree, grade, dates, location}]
+            Use plain text everywhere; do not write LaTeX commands or escapes.
+    
+    Returns:
+        dict: A dictionary containing:
+            - success (bool): True if the resume was updated.
+            - message (str): Status message or what was wrong with the data.
+            - latex_code (str, optional): The rendered LaTeX document.
+    """
+    logger.info("🔧 update_resume_data invoked with a %d character patch", len(resume_json))
+    
+    try:
+        workspace = workspaces.get(current_session_id())
+        current_data = workspace.read_data()
+        current_source = workspace.read_source()
+        # Re-rendering from data that no longer matches output.tex would throw away LaTeX edits
+        if current_source is not None and (current_data is None or current_source != render_resume(current_data)):
+            logger.warning("❌ update_resume_data refused: output.tex was edited as LaTeX")
+            return {
+                "success": False,
+                "message": "The resume has been edited as LaTeX since it was last rendered from data, so "
+                           "update_resume_data would overwrite those edits. Use patch_resume_section to change it."
+            }
+        data = apply_resume_patch(current_data, resume_json)
+        latex_code = render_resume(data)
+        
+        workspace.write_data(data)
+        workspace.write_source(latex_code)
+        logger.info("✅ Resume data updated, rendered %d characters of LaTeX", len(latex_code))
+        return {
+            "success": True,
+            "message": "Resume data updated and rendered to output.tex.",
+            "latex_code": latex_code
+        }
+    
+    except ResumeDataError as e:
+        logger.warning("❌ Invalid resume data: %s", e)
+        return {
+            "success": False,
+            "message": f"Invalid resume data: {e}"
+        }
+    except Exception as e:
+        logger.exception("❌ update_resume_data failed: %s", e)
         return {
             "success": False,
             "message": f"An unexpected error occurred: {str(e)}"
         }
 
 
+@tool
+def patch_resume_section(section: str, new_content: str) -> dict:
+    """
+    Replaces a single section of the current LaTeX resume (output.tex), leaving the rest untouched.
+    Use this for small edits to a resume written with write_latex instead of resending the whole document.
+    
+    Args:
+        section (str): The section to replace: "heading" for the name/contact block, otherwise the
+            \\section{} title, e.g. "Experience" or "Technical Skills".
+        new_content (str): The new LaTeX for that section only. It may start with the \\section{...}
+            header or contain just the body (the existing header is kept). An empty string removes
+            the section; a new section (with its \\section{...} header) is added at the end.
+    
+    Returns:
+        dict: A dictionary containing:
+            - success (bool): True if the section was replaced.
+            - message (str): Status message, or the available sections if none matched.
+            - latex_code (str, optional): The full updated LaTeX document.
+    """
+    logger.info("🔧 patch_resume_section invoked for '%s' with %d characters", section, len(new_content))
+    
+    try:
+        workspace = workspaces.get(current_session_id())
+        current = workspace.read_source()
+        if not current:
+            return {
+                "success": False,
+                "message": "There is no resume yet; create one with update_resume_data or write_latex first."
+            }
+        
+        check = check_latex(patch_section(current, section, new_content))
+        if not check['valid']:
+            return {
+                "success": False,
+                "message": "The patched resume has LaTeX errors, nothing was written: " + "; ".join(check['errors'])
+            }
+        latex_code = check['latex_code']
+        workspace.write_source(latex_code)
+        workspace.drop_data()
+        logger.info("✅ Section '%s' patched (%d -> %d characters)", section, len(current), len(latex_code))
+        return {
+            "success": True,
+            "message": f"Section '{section}' updated in output.tex." + repair_note(check),
+            "latex_code": latex_code
+        }
+    
+    except SectionError as e:
+        logger.warning("❌ Section patch failed: %s", e)
+        return {
+            "success": False,
+            "message": f"Could not patch section: {e}"
+        }
+    except Exception as e:
+        logger.exception("❌ patch_resume_section failed: %s", e)
+        return {
+            "success": False,
+            "message": f"An unexpected error occurred: {str(e)}"
+        }
+
+
+RESUME_TOOLS = {resume_tool.name: resume_tool for resume_tool in (write_latex, update_resume_data, patch_resume_section)}
+
+
+def run_resume_tool(tool_call):
+    """Execute a resume-writing tool call; returns (result, latex_code), or (None, None) for other tools"""
+    resume_tool = RESUME_TOOLS.get(tool_call['name'])
+    if resume_tool is None:
+        return None, None
+    with span('tool', resume_tool.name), TOOL_SECONDS.time(tool=resume_tool.name, outcome='success') as labels:
+        result = resume_tool.invoke(tool_call['args'])
+        if not result.get('success'):
+            labels['outcome'] = 'failed'
+    # write_latex hands back the validated (possibly repaired) source
+    return result, result.get('latex_code', tool_call['args'].get('latex_code'))
+
+
+
+
+# 'google' (Gemini, needs GOOGLE_API_KEY) or 'fake' (offline canned replies, see fake_llm.py)
+LLM_PROVIDER = os.getenv('LLM_PROVIDER', 'google').lower()
+GEMINI_MODEL = "gemini-2.0-flash-001"
+LLM_TEMPERATURE = 0.7
 
 
 def initialize_llm():
     global llm, llm_with_tools
     try:
         api_key = os.getenv('GOOGLE_API_KEY')
-        if api_key:
+        if LLM_PROVIDER == 'fake':
+            from fake_llm import FakeChatModel
+            llm = FakeChatModel()
+            llm_with_tools = llm.bind_tools([update_resume_data, patch_resume_section, write_latex])
+            logger.warning("🧪 Using the offline fake LLM (LLM_PROVIDER=fake, %.0f ms latency)", llm.latency_ms)
+        elif api_key:
             llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash-001",
-                temperature=0.7,
+                model=GEMINI_MODEL,
+                temperature=LLM_TEMPERATURE,
                 max_tokens=2000,  # Increased for tool calls + LaTeX generation
                 timeout=30,
                 max_retries=2,
                 google_api_key=api_key
             )
-            print("✅ LangChain Google Gemini client initialized successfully!")
-            print(f"🤖 Using model: gemini-2.0-flash-001")
+            logger.info("✅ LangChain Google Gemini client initialized (model %s)", GEMINI_MODEL)
             
             # Bind tools to the LLM with proper configuration for Gemini
-            llm_with_tools = llm.bind_tools([write_latex])
-            print("🔧 LaTeX writing tool bound to LLM")
+            llm_with_tools = llm.bind_tools([update_resume_data, patch_resume_section, write_latex])
+            logger.info("🔧 Resume data, section patch and LaTeX writing tools bound to LLM")
         else:
-            print("⚠️  GOOGLE_API_KEY not found in environment variables")
-            print("💡 Please create a .env file with your GOOGLE_API_KEY")
-            print("🔗 Get your API key from: https://aistudio.google.com/app/apikey")
+            logger.warning("⚠️ GOOGLE_API_KEY not found in environment variables; create a .env file with it "
+                           "(get a key from https://aistudio.google.com/app/apikey)")
     except Exception as e:
-        print(f"❌ Error initializing LangChain Google Gemini client: {e}")
+        logger.error("❌ Error initializing LangChain Google Gemini client: %s", e)
+    
+    # Record or replay LLM traffic (llm_cassette.py); replay needs no provider at all
+    try:
+        cassette = open_cassette(session_fn=current_session_id)
+    except (OSError, ValueError) as e:
+        logger.error("❌ LLM cassette unavailable: %s", e)
+        cassette = None
+    if cassette is not None:
+        llm = cassette.wrap(llm, 'llm')
+        llm_with_tools = cassette.wrap(llm_with_tools, 'llm_with_tools')
+        logger.warning("📼 LLM cassette in %s mode: %s (%d calls indexed)", cassette.mode, cassette.path, len(cassette))
+
+    # Repeated prompts are answered from the response cache (llm_cache.py); cached
+    # tool calls still go through dispatch_tool_calls, write_latex and the compile
+    if llm_response_cache is not None:
+        model_name, temperature = ('fake', 0.0) if LLM_PROVIDER == 'fake' else (GEMINI_MODEL, LLM_TEMPERATURE)
+        llm = llm_response_cache.wrap(llm, model_name, temperature)
+        llm_with_tools = llm_response_cache.wrap(llm_with_tools, model_name, temperature, RESUME_TOOLS)
+        if not llm_response_cache.cacheable(temperature):
+            logger.info("ℹ️ LLM response cache bypassed: temperature %.2f is above %.2f",
+                        temperature, llm_response_cache.max_temperature)
 
 initialize_llm()
 
+# Resolve pdflatex once so requests never have to probe for it
+startup_compiler = discover_compiler()
+if startup_compiler:
+    # Dump the standard resume preamble in the background so the first compiles can use it
+    latex_formats.prepare(RESUME_PREAMBLE, startup_compiler)
+
 # LATEX COMPILATION FUNCTIONS
 
 
 
-def clean_latex_code(raw_latex: str) -> str:
-    """Clean up LaTeX code generated by LLM to ensure it compiles properly"""
-    
-    # Remove any explanatory text before \documentclass
-    lines = raw_latex.split('\n')
-    latex_start_idx = -1
+def run_pdflatex(compiler, job_dir, extra_args=()):
+    """Run one pdflatex pass over job_dir/output.tex; returns (success, output)"""
+    job_pdf_file = os.path.join(job_dir, "output.pdf")
+    compilation_output = ""
+    started = time.perf_counter()
+    outcome = 'error'
+    try:
+        logger.info("🔄 Compiling with %s", compiler.path)
+        
+        # Run pdflatex with appropriate flags
+        result = subprocess.run(
+            compiler.base_args() + list(extra_args) + ["output.tex"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=30,
+            cwd=job_dir
+        )
+        
+        compilation_output = result.stdout + result.stderr
+        
+        if result.returncode == 0 and os.path.exists(job_pdf_file):
+            outcome = 'success'
+            logger.info("✅ Compilation successful with %s", compiler.path)
+            return True, compilation_output
+        
+        outcome = 'failed'
+        # The first few lines of output are enough to tell what went wrong
+        logger.warning("❌ Compilation failed with %s (return code %d): %s | %s", compiler.path, result.returncode,
+                       ' | '.join(result.stderr.split('\n')[:5]), ' | '.join(result.stdout.split('\n')[:3]))
+            
+    except FileNotFoundError:
+        # The binary vanished since discovery (e.g. TeX was uninstalled)
+        logger.error("❌ Command not found: %s", compiler.path)
+        discover_compiler(force=True)
+    except subprocess.TimeoutExpired:
+        outcome = 'timeout'
+        logger.warning("⏱️ Compilation timeout with %s", compiler.path)
+        compilation_output = "pdflatex timed out after 30 seconds."
+    except Exception as e:
+        logger.error("❌ Error with %s: %s", compiler.path, e)
+        compilation_output = str(e)
+    finally:
+        elapsed = time.perf_counter() - started
+        PDFLATEX_SECONDS.observe(elapsed, compiler=compiler.path, outcome=outcome)
+        trace = current_trace()
+        if trace is not None:
+            trace.add('pdflatex', elapsed, outcome, started)
+    return False, compilation_output
+
+# Failed compiles are retried after local fixes from the log, then after up
+# to LATEX_REPAIR_MAX_ATTEMPTS LLM repairs of a LATEX_REPAIR_EXCERPT_CHARS excerpt.
+# The LLM repairs run on the scheduler's repair pool, not in a compile worker,
+# and each repaired source is compiled as a new job.
+LATEX_REPAIR_MAX_ATTEMPTS = int(os.getenv('LATEX_REPAIR_MAX_ATTEMPTS', '2'))
+LATEX_REPAIR_EXCERPT_CHARS = int(os.getenv('LATEX_REPAIR_EXCERPT_CHARS', '1500'))
+LATEX_REPAIR_TIME_BUDGET = int(os.getenv('LATEX_REPAIR_TIME_BUDGET', '60'))
+MAX_LOCAL_FIX_ROUNDS = 3
+
+
+def compile_source(compiler, job_dir, latex_code):
+    """Compile latex_code in job_dir, against a precompiled format when one is ready; returns (success, output)"""
+    job_tex_file = os.path.join(job_dir, "output.tex")
     
-    for i, line in enumerate(lines):
-        if line.strip().startswith('\\documentclass'):
-            latex_start_idx = i
-            break
+    # Prefer a precompiled format for this preamble. Its errors are the
+    # document's own unless the format failed to load, so only that case
+    # costs a second, plain run.
+    preamble_format = latex_formats.lookup(latex_code, compiler)
+    if preamble_format:
+        with open(job_tex_file, 'w', encoding='utf-8') as f:
+            f.write(preamble_format.rewrite(latex_code))
+        logger.info("⚡ Using precompiled format %s", preamble_format.name)
+        compilation_success, compilation_output = run_pdflatex(compiler, job_dir, preamble_format.args())
+        if compilation_success or not format_load_failed(compilation_output + read_log(job_dir)):
+            return compilation_success, compilation_output
+        logger.warning("⚠️ Format %s could not be used - disabling it", preamble_format.name)
+        latex_formats.report_failure(preamble_format)
     
-    if latex_start_idx == -1:
-        print("❌ No \\documentclass found in generated LaTeX!")
-        return raw_latex
+    with open(job_tex_file, 'w', encoding='utf-8') as f:
+        f.write(latex_code)
+    return run_pdflatex(compiler, job_dir)
+
+
+def llm_repair(latex_code, compile_errors, timeout):
+    """Ask the LLM to fix the excerpt around the first error within timeout seconds; returns the patched document or None"""
+    if llm is None or not compile_errors:
+        return None
+    error = compile_errors[0]
+    bounds = excerpt_bounds(latex_code, error, LATEX_REPAIR_EXCERPT_CHARS)
+    if bounds is None:
+        return None
+    start, end = bounds
+    excerpt = latex_code[start:end]
     
-    latex_lines = lines[latex_start_idx:]
+    logger.info("🤖 Asking the LLM to repair %d characters around: %s", len(excerpt), describe_error(error))
+    with span('llm', 'repair'), LLM_REQUEST_SECONDS.time(operation='repair', outcome='success'):
+        response = llm.invoke([
+            prompts.get('latex_repair').message,
+            HumanMessage(content=f"Error: {describe_error(error)}\nTeX had read up to: {error['context']}\n\nExcerpt:\n{excerpt}")
+        ], timeout=timeout)
+    record_llm_usage('repair', response)
+    replacement = re.sub(r'^\s*```[a-zA-Z]*\s*|\s*```\s*$', '', response.content or '')
     
-    cleaned_latex = '\n'.join(latex_lines)
+    # Anything much larger than the excerpt is not a targeted fix
+    if not replacement.strip() or len(replacement) > 2 * len(excerpt) + 200:
+        logger.warning("⚠️ LLM repair rejected: empty or unexpectedly large reply")
+        return None
+    return latex_code[:start] + replacement + latex_code[end:]
+
+
+def repair_and_recompile(compiler, job_dir, latex_code, compilation_output):
+    """Fix a failed compile from its log with local fixes, recompiling after each round.
+
+    Returns (success, latex_code, output, repairs, compile_errors); the
+    errors are those of the last failed run.
+    """
+    repairs = []
+    compile_errors = parse_log(read_log(job_dir, compilation_output))
+    if compile_errors:
+        logger.info("🔎 pdflatex errors: %s", ' | '.join(describe_error(error) for error in compile_errors[:3]))
     
-    if '\\end{document}' in cleaned_latex:
-        end_doc_pos = cleaned_latex.find('\\end{document}') + len('\\end{document}')
-        cleaned_latex = cleaned_latex[:end_doc_pos]
+    for _ in range(MAX_LOCAL_FIX_ROUNDS):
+        if not compile_errors:
+            break
+        fixed_code, notes = local_fixes(latex_code, compile_errors)
+        if fixed_code == latex_code:
+            break
+        
+        check = check_latex(fixed_code)
+        if not check['valid']:
+            break
+        latex_code = check['latex_code']
+        repairs += notes + check['repairs']
+        
+        success, compilation_output = compile_source(compiler, job_dir, latex_code)
+        if success:
+            logger.info("🩹 Compile repaired: %s", '; '.join(repairs))
+            return True, latex_code, compilation_output, repairs, []
+        compile_errors = parse_log(read_log(job_dir, compilation_output))
     
-    replacements = {
-        '[LINKEDIN_URL]': 'https://linkedin.com/in/yourprofile',
-        '[LINKEDIN_DISPLAY]': 'yourprofile',
-        '[GITHUB_URL]': 'https://github.com/yourprofile',
-        '[GITHUB_DISPLAY]': 'yourprofile',
-        '[USER_LINKEDIN_URL]': 'https://linkedin.com/in/yourprofile',
-        '[USER_LINKEDIN_DISPLAY]': 'yourprofile',
-        '[USER_GITHUB_URL]': 'https://github.com/yourprofile',
-        '[USER_GITHUB_DISPLAY]': 'yourprofile',
-    }
+    return False, latex_code, compilation_output, repairs, compile_errors
+
+
+def repair_failed_compile(job: CompileJob, result: dict):
+    """LLM repair of a compile that local fixes couldn't save; runs on the scheduler's repair pool.
+
+    Returns (latex_code, options) for the follow-up compile job, or None.
+    """
+    state = job.options.get('repair_state') or {}
+    # The budget covers the whole chain of repairs, not each attempt
+    deadline = state.get('deadline') or time.monotonic() + LATEX_REPAIR_TIME_BUDGET
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        return None
     
-    for placeholder, replacement in replacements.items():
-        cleaned_latex = cleaned_latex.replace(placeholder, replacement)
+    compile_errors = result['repair_errors']
+    fixed_code = llm_repair(result['repair_source'], compile_errors, timeout=remaining)
+    if fixed_code is None or fixed_code == result['repair_source'] or time.monotonic() > deadline:
+        return None
+    check = check_latex(fixed_code)
+    if not check['valid']:
+        return None
     
+    return check['latex_code'], {'repair_state': {
+        'attempts': state.get('attempts', 0) + 1,
+        'deadline': deadline,
+        'repairs': result['repairs'] + [f"LLM fix for {describe_error(compile_errors[0])}"] + check['repairs'],
+        'cache_keys': result['cache_keys']
+    }}
 
 
+def compiled_message(repairs):
+    message = "✅ LaTeX compiled successfully!\n\n📄 The PDF is now available in the preview."
+    if repairs:
+        message += "\n\n🩹 Fixed automatically: " + "; ".join(repairs)
+    return message
 
 
-    import re
+def store_compiled_pdf(cache_keys, pdf_file):
+    """Cache a compiled PDF under each source key that produces it"""
+    for cache_key in dict.fromkeys(cache_keys):
+        try:
+            pdf_cache.put(cache_key, pdf_file)
+        except OSError as e:
+            logger.warning("⚠️ Could not store PDF in compile cache: %s", e)
 
 
-    cleaned_latex = re.sub(r'\\resumeItem\{\s*\}', '', cleaned_latex)
-    cleaned_latex = re.sub(r'\\resumeItem\{\s+\}', '', cleaned_latex)
-    
-    cleaned_latex = re.sub(
-        r'(\\resumeSubheading\s*\{[^}]+\}\s*\{[^}]+\}\s*\{[^}]+\}\s*\{[^}]+\})\s*\{[^}]*\}',
-        r'\1',
-        cleaned_latex
-    )
-    
-    print(f"🧹 LaTeX cleaning completed:")
-    print(f"   - Removed explanatory text")
-    print(f"   - Fixed placeholder URLs")
-    print(f"   - Cleaned empty resume items")
-    print(f"   - Fixed malformed sections")
-    
-    return cleaned_latex
+def compile_latex(latex_code: str, session_id: Optional[str] = None, repair_state: Optional[dict] = None) -> dict:
+    """Compile LaTeX code to PDF using pdflatex inside the session's own workspace.
 
+    repair_state is set for the compile of an LLM-repaired source (see
+    repair_failed_compile): attempts so far, their deadline, the repairs
+    made and the cache keys of the broken sources it stands in for.
+    """
+    job_dir = None
+    repair_state = repair_state or {}
+    # Cache keys of earlier broken versions of this source; they get its PDF too
+    alias_keys = repair_state.get('cache_keys', [])
+    try:
+        workspace = workspaces.get(session_id)
 
+        # Catch broken source before it costs a pdflatex run (up to its timeout)
+        check = check_latex(latex_code)
+        latex_code = check['latex_code']
 
+        # Keep the session's current source, then compile a private copy
+        # in a throwaway job directory so parallel compiles never collide
+        tex_file = workspace.write_source(latex_code)
+        if repair_state:
+            # LLM-repaired LaTeX is no longer what the resume data renders to
+            workspace.drop_data()
 
-def compile_latex(latex_code: str) -> dict:
-    """Compile LaTeX code to PDF using pdflatex"""
-    try:
-        # Write LaTeX to file
-        tex_file = "output.tex"
-        pdf_file = "output.pdf"
-        
-        with open(tex_file, 'w', encoding='utf-8') as f:
-            f.write(latex_code)
-        
-        print(f"📄 LaTeX code saved to {tex_file}")
+        if not check['valid']:
+            return {
+                "success": False,
+                "message": "❌ The LaTeX has errors, so it was not compiled:\n" + "\n".join(f"- {error}" for error in check['errors']),
+                "validation_errors": check['errors'],
+                "pdf_generated": False
+            }
+
+        compiler = get_compiler()
+        compiler_version = compiler.version if compiler else "unknown"
+
+        cache_key = source_key = pdf_cache.key_for(latex_code, compiler_version)
+        cached_pdf = pdf_cache.get(cache_key)
+        artifact_id = None
+        if cached_pdf:
+            try:
+                artifact_id = workspace.link_artifact(cached_pdf)
+            except OSError as e:
+                # A concurrent put() evicted the entry after get() returned it
+                logger.info("♻️ Cached PDF %s went away (%s); compiling instead", cache_key[:12], e)
+                pdf_cache.lost(cache_key)
+        if artifact_id:
+            store_compiled_pdf(alias_keys, workspace.artifact_path(artifact_id))
+            logger.info("⚡ Compile cache hit (%s) - skipping pdflatex", cache_key[:12])
+            return {
+                "success": True,
+                "message": compiled_message(repair_state.get('repairs', [])),
+                "artifact_id": artifact_id,
+                "compiler_used": "cache",
+                "pdf_generated": True,
+                "cache_hit": True
+            }
+
+        job_dir = workspace.new_job_dir()
+        job_pdf_file = os.path.join(job_dir, "output.pdf")
         
-        pdflatex_commands = [
-            r"C:\Program Files\MiKTeX\miktex\bin\x64\miktex-pdflatex.exe",
-            r"C:\Users\raghu\AppData\Local\Programs\MiKTeX\miktex\bin\x64\miktex-pdflatex.exe",
-            "miktex-pdflatex",
-            "pdflatex"
-        ]
+        logger.debug("📄 LaTeX code saved to %s", tex_file)
         
-
         compilation_success = False
         compilation_output = ""
+        repairs = list(repair_state.get('repairs', []))
+        compile_errors = []
         
-
-
-        for cmd in pdflatex_commands:
-            try:
-                print(f"🔄 Attempting compilation with: {cmd}")
-                
-                # Run pdflatex with appropriate flags
-                result = subprocess.run(
-                    [cmd, "--disable-installer", "-interaction=nonstopmode", tex_file],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True,
-                    timeout=30,
-                    cwd=os.getcwd()
+        if compiler is None:
+            logger.error("❌ No working pdflatex found - skipping compilation")
+            compilation_output = "No working pdflatex installation was found on this server."
+        else:
+            compilation_success, compilation_output = compile_source(compiler, job_dir, latex_code)
+            if not compilation_success:
+                compilation_success, repaired_code, compilation_output, local_repairs, compile_errors = repair_and_recompile(
+                    compiler, job_dir, latex_code, compilation_output
                 )
-                
-                compilation_output = result.stdout + result.stderr
-                
-                if result.returncode == 0 and os.path.exists(pdf_file):
-                    print(f"✅ Compilation successful with {cmd}")
-                    compilation_success = True
-                    break
-                else:
-                    print(f"❌ Compilation failed with {cmd} (return code: {result.returncode})")
-                    # Print first few lines of error output for debugging
-                    if result.stderr:
-                        error_lines = result.stderr.split('\n')[:5]
-                        print(f"   Error details: {' | '.join(error_lines)}")
-                    if result.stdout:
-                        output_lines = result.stdout.split('\n')[:3]
-                        print(f"   Output: {' | '.join(output_lines)}")
-                    
-            except FileNotFoundError:
-                print(f"❌ Command not found: {cmd}")
-                continue
-            except subprocess.TimeoutExpired:
-                print(f"⏱️ Compilation timeout with: {cmd}")
-                continue
-            except Exception as e:
-                print(f"❌ Error with {cmd}: {str(e)}")
-                continue
-        
-
-
-        for ext in [".aux", ".log", ".out", ".fls", ".fdb_latexmk", ".synctex.gz"]:
-            aux_file = f"output{ext}"
-            if os.path.exists(aux_file):
-                try:
-                    os.remove(aux_file)
-                except:
-                    pass
+                repairs += local_repairs
+                if compilation_success:
+                    latex_code = repaired_code
+                    workspace.write_source(latex_code)
+                    workspace.drop_data()
+                    cache_key = pdf_cache.key_for(latex_code, compiler_version)
         
         if compilation_success:
+            # Resubmitting the broken source (or an earlier one) then hits the cache instead of repairing again
+            store_compiled_pdf([cache_key, source_key] + alias_keys, job_pdf_file)
+            artifact_id = workspace.store_artifact(job_pdf_file)
             return {
                 "success": True,
-                "message": f"✅ LaTeX compiled successfully to {pdf_file}!\n\n📄 The PDF is now available in the preview.",
-                "output_file": os.path.abspath(pdf_file),
-                "compiler_used": "automatic",
-                "pdf_generated": True
+                "message": compiled_message(repairs),
+                "artifact_id": artifact_id,
+                "compiler_used": compiler.path,
+                "pdf_generated": True,
+                "cache_hit": False,
+                "repairs": repairs
             }
         
 
 
         else:
-            return {
+            manual_command = subprocess.list2cmdline(compiler.base_args()) if compiler else "pdflatex -interaction=nonstopmode"
+            first_error = f"🔎 {describe_error(compile_errors[0])}\n\n" if compile_errors else ""
+            needs_repair = bool(
+                llm is not None and compile_errors
+                and repair_state.get('attempts', 0) < LATEX_REPAIR_MAX_ATTEMPTS
+                and time.monotonic() < repair_state.get('deadline', float('inf'))
+            )
+            result = {
                 "success": True,  # Still success because LaTeX was saved
-                "message": f"✅ LaTeX code saved to {tex_file}!\n\n" +
+                "message": "✅ LaTeX code saved to output.tex!\n\n" +
                           "⚠️ Automatic compilation failed. Manual compilation required:\n\n" +
+                          first_error +
                           "📋 Run this command in your terminal:\n" +
-                          f'"{pdflatex_commands[0]}" --disable-installer -interaction=nonstopmode output.tex\n\n' +
+                          f'{manual_command} output.tex\n\n' +
                           "💡 Or open output.tex in TeXworks/TeXstudio and compile there.",
-                "output_file": os.path.abspath(tex_file),
                 "compiler_used": "manual",
                 "pdf_generated": False,
-                "compilation_error": compilation_output[-500:] if compilation_output else "Unknown error"
+                "compilation_error": compilation_output[-500:] if compilation_output else "Unknown error",
+                "compile_errors": [describe_error(error) for error in compile_errors],
+                "repairs": repairs,
+                "needs_repair": needs_repair
             }
+            if needs_repair:
+                # What repair_failed_compile needs; never sent to the browser
+                result.update(repair_source=latex_code, repair_errors=compile_errors,
+                              cache_keys=alias_keys + [source_key])
+            return result
     
     except PermissionError:
         return {
@@ -309,11 +732,125 @@ def compile_latex(latex_code: str) -> dict:
             "pdf_generated": False
         }
     except Exception as e:
+        logger.exception("❌ compile_latex failed: %s", e)
         return {
             "success": False,
             "message": f"❌ An unexpected error occurred: {str(e)}",
             "pdf_generated": False
         }
+    finally:
+        # The job directory holds only aux files and the scratch source by now
+        if job_dir:
+            with span('cleanup'):
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+# All compiles go through a bounded worker pool instead of running inline
+COMPILE_WAIT_TIMEOUT = int(os.getenv('COMPILE_WAIT_TIMEOUT', '120'))
+SSE_KEEPALIVE_SECONDS = 15
+compile_scheduler = CompileScheduler(compile_latex, repair_fn=repair_failed_compile)
+
+# Components that already keep counters are read when /metrics is scraped
+registry.counter('cache_lookups_total', 'Compiled PDF cache lookups by result',
+                 ['result'], callback=lambda: {('hit',): pdf_cache.hits, ('miss',): pdf_cache.misses})
+registry.gauge('cache_hit_ratio', 'Compiled PDF cache hit ratio since start',
+               callback=lambda: pdf_cache.stats()['hit_ratio'])
+registry.counter('latex_format_hits_total', 'Compiles that used a precompiled preamble format',
+                 callback=lambda: latex_formats.hits)
+registry.gauge('latex_formats_ready', 'Precompiled preamble formats on disk',
+               callback=lambda: latex_formats.stats()['ready'])
+registry.gauge('compile_queue_depth', 'Compile jobs waiting for a worker',
+               callback=lambda: compile_scheduler.stats()['queue_depth'])
+registry.gauge('compile_jobs_running', 'Compile jobs being run by a worker',
+               callback=lambda: compile_scheduler.stats()['running'])
+registry.counter('compile_jobs_rejected_total', 'Compile jobs refused because the queue was full',
+                 callback=lambda: compile_scheduler.rejected)
+registry.gauge('conversations', 'Conversations held by the conversation store',
+               callback=conversation_store.count)
+if llm_response_cache is not None:
+    registry.counter('llm_cache_lookups_total', 'LLM response cache lookups by result', ['result'],
+                     callback=lambda: {('hit',): llm_response_cache.hits, ('disk_hit',): llm_response_cache.disk_hits,
+                                       ('miss',): llm_response_cache.misses})
+
+
+def run_compile(latex_code: str, session_id: Optional[str] = None) -> dict:
+    """Queue a compile on the worker pool and wait for it; raises QueueFullError"""
+    job = compile_scheduler.submit(latex_code, session_id)
+    return compile_job_result(job, job.wait(COMPILE_WAIT_TIMEOUT))
+
+
+def compile_job_result(job: CompileJob, result: Optional[dict]) -> dict:
+    """What a request that waited for job gets back; the job's spans join the request's trace"""
+    trace, job_trace = current_trace(), job.latest().trace
+    if trace is not None and job_trace is not None:
+        trace.extend(job_trace)
+    if result is None:
+        return {
+            "success": False,
+            "message": "⏱️ Compilation is taking longer than expected. Press Refresh in a moment.",
+            "pdf_generated": False
+        }
+    return result
+
+
+def read_session_source(session_id: Optional[str]) -> Optional[str]:
+    """The conversation's LaTeX source, or the shared output.tex for sessions that never wrote one"""
+    latex_code = workspaces.get(session_id).read_source()
+    if latex_code is None and os.path.exists('output.tex'):
+        with open('output.tex', 'r', encoding='utf-8') as f:
+            latex_code = f.read()
+    return latex_code
+
+
+SOURCE_NOT_FOUND_PAYLOAD = {
+    'success': False,
+    'message': 'output.tex file not found. Please ensure the LaTeX file exists.',
+    'status': 'error'
+}
+
+
+def compile_busy_payload(error: QueueFullError) -> dict:
+    return {
+        'success': False,
+        'message': f'⏳ The compile server is busy. Please retry in {error.retry_after} seconds.',
+        'retry_after': error.retry_after,
+        'pdf_generated': False,
+        'status': 'error'
+    }
+
+
+def compile_error_payload(error: Exception) -> dict:
+    return {
+        'success': False,
+        'message': f'Error compiling resume: {str(error)}',
+        'status': 'error'
+    }
+
+
+def compile_response_payload(result: dict):
+    """The /compile_resume payload and status code for a compile result"""
+    if result['success']:
+        return {
+            'success': True,
+            'message': result['message'],
+            'artifact_id': result.get('artifact_id'),
+            'pdf_generated': result.get('pdf_generated', False),
+            'compiler_used': result.get('compiler_used', 'unknown'),
+            'status': 'success'
+        }, 200
+    return {
+        'success': False,
+        'message': result['message'],
+        'pdf_generated': False,
+        'status': 'error'
+    }, 500
+
+
+def queue_full_response(error: QueueFullError, payload: dict):
+    """429 response telling the client when to retry"""
+    response = jsonify(payload)
+    response.status_code = 429
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
 
 # MEMORY MANAGEMENT FUNCTIONS
 
@@ -323,89 +860,66 @@ def compile_latex(latex_code: str) -> dict:
 
 def get_or_create_conversation_memory(session_id):
     """Get existing conversation messages or create a new conversation"""
-    if session_id not in conversation_messages:
-        conversation_messages[session_id] = []
-        conversation_metadata[session_id] = {
-            'created_at': datetime.now().isoformat(),
-            'title': 'New Conversation',
-            'message_count': 0
-        }
-    return conversation_messages[session_id]
+    conversation_store.ensure(session_id)
+    return conversation_store.get_messages(session_id)
 
-def save_conversation_message(session_id, human_message, ai_message):
-    """Save messages to conversation storage with size management"""
+def save_conversation_message(session_id, human_message, ai_message, document=None):
+    """Save messages to conversation storage with size management.
+
+    LaTeX documents (embedded in either message, or the tool-written
+    document) go to the document version store; messages keep a reference.
+    """
     try:
-        messages = get_or_create_conversation_memory(session_id)
-        
-        print(f"💾 Saving conversation message:")
-        print(f"   Session ID: {session_id}")
-        print(f"   Human message length: {len(human_message)} characters")
-        print(f"   AI message length: {len(ai_message)} characters")
+        logger.debug("💾 Saving conversation message (%d human, %d AI characters)", len(human_message), len(ai_message),
+                     extra={'session_id': session_id})
         
-
-
-
         MAX_MESSAGE_LENGTH = 50000  
         
-        human_content = human_message
-        ai_content = ai_message
+        human_content, human_document_ref = document_store.externalize(session_id, human_message)
+        ai_content, ai_document_ref = document_store.externalize(session_id, ai_message)
+        if document:
+            ai_document_ref = document_store.get(session_id).add(document)
         
-        if len(human_message) > MAX_MESSAGE_LENGTH:
-            human_content = human_message[:MAX_MESSAGE_LENGTH] + "\n\n[Message truncated due to length...]"
-            print(f"   ⚠️ Human message truncated from {len(human_message)} to {len(human_content)} chars")
+        if len(human_content) > MAX_MESSAGE_LENGTH:
+            human_content = human_content[:MAX_MESSAGE_LENGTH] + "\n\n[Message truncated due to length...]"
+            logger.warning("⚠️ Human message truncated from %d to %d characters", len(human_message), len(human_content),
+                           extra={'session_id': session_id})
         
-        if len(ai_message) > MAX_MESSAGE_LENGTH:
-            ai_content = ai_message[:MAX_MESSAGE_LENGTH] + "\n\n[Message truncated due to length...]"
-            print(f"   ⚠️ AI message truncated from {len(ai_message)} to {len(ai_content)} chars")
+        if len(ai_content) > MAX_MESSAGE_LENGTH:
+            ai_content = ai_content[:MAX_MESSAGE_LENGTH] + "\n\n[Message truncated due to length...]"
+            logger.warning("⚠️ AI message truncated from %d to %d characters", len(ai_message), len(ai_content),
+                           extra={'session_id': session_id})
         
-        messages.append({
+        new_messages = [{
             'type': 'human',
             'content': human_content,
             'timestamp': datetime.now().isoformat(),
             'original_length': len(human_message)
-        })
+        }]
         
-
-
-
-
-        messages.append({
+        new_messages.append({
             'type': 'ai',
             'content': ai_content,
             'timestamp': datetime.now().isoformat(),
             'original_length': len(ai_message)
         })
-
         
-        conversation_metadata[session_id]['message_count'] += 2
-        conversation_metadata[session_id]['last_updated'] = datetime.now().isoformat()
+        for message, document_ref in zip(new_messages, (human_document_ref, ai_document_ref)):
+            if document_ref:
+                message['document_ref'] = document_ref
+                logger.debug("📄 %s message references document v%d", message['type'], document_ref['version'],
+                             extra={'session_id': session_id})
         
-        if (conversation_metadata[session_id]['title'] == 'New Conversation' and 
-            conversation_metadata[session_id]['message_count'] == 2):
-            title = human_message[:50] + "..." if len(human_message) > 50 else human_message
-            conversation_metadata[session_id]['title'] = title
+        # The first exchange names the conversation
+        title = human_message[:50] + "..." if len(human_message) > 50 else human_message
         
-
-
-
         MAX_MESSAGES = 100  
-        if len(messages) > MAX_MESSAGES:
-
-
-            messages_to_remove = len(messages) - MAX_MESSAGES
-            if messages_to_remove % 2 == 1:  
-                messages_to_remove += 1
-            messages[:messages_to_remove] = []
-            print(f"   🧹 Trimmed conversation history: removed {messages_to_remove} old messages")
+        message_total = conversation_store.append_messages(session_id, new_messages, MAX_MESSAGES, title=title)
         
-        print(f"   ✅ Conversation saved successfully")
-        print(f"   📊 Total messages in conversation: {len(messages)}")
+        logger.info("💾 Conversation saved (%d messages)", message_total, extra={'session_id': session_id})
         
     except Exception as e:
-        print(f"❌ Error saving conversation message: {str(e)}")
-        print(f"   Session ID: {session_id}")
-        print(f"   Human message length: {len(human_message) if human_message else 0}")
-        print(f"   AI message length: {len(ai_message) if ai_message else 0}")
+        logger.exception("❌ Error saving conversation message: %s", e, extra={'session_id': session_id})
 
 
 # LATEX UTILITIES
@@ -416,59 +930,179 @@ def test_latex_installation():
 
     """Test if LaTeX is properly installed and accessible"""
 
-    print("\n🔍 TESTING LATEX INSTALLATION...")
+    compiler = get_compiler()
     
+    if compiler:
+        logger.info("✅ LaTeX installation found: %s (found via %s, version %s)",
+                    compiler.path, compiler.source, compiler.version)
+        return True
+    
+    else:
+        logger.error("❌ No working LaTeX installation found! Set PDFLATEX_PATH to point at your pdflatex binary, "
+                     "or install MiKTeX (https://miktex.org/download) or TeX Live (https://www.tug.org/texlive/)")
+        return False
+
+
+# CHAT HELPERS
 
-    pdflatex_commands = [
-        "pdflatex",
-        "miktex-pdflatex",
-        r"C:\Program Files\MiKTeX\miktex\bin\x64\miktex-pdflatex.exe",
-        r"C:\Users\raghu\AppData\Local\Programs\MiKTeX\miktex\bin\x64\miktex-pdflatex.exe",
-        r"C:\Program Files\MiKTeX\miktex\bin\x64\pdflatex.exe",
-        r"C:\Users\raghu\AppData\Local\Programs\MiKTeX\miktex\bin\x64\pdflatex.exe",
-        r"C:\texlive\2023\bin\win32\pdflatex.exe",
-        r"C:\texlive\2024\bin\win32\pdflatex.exe"
-    ]
+
+def build_chat_messages(conversation_history, user_message, session_id, prompt_name='chat'):
+    """Fit the conversation history into the context budget; returns (messages, context_stats)"""
+    system_prompt = prompts.get(prompt_name)
+    workspace = workspaces.get(session_id)
+    latest_document = workspace.read_source()
+    document_heading = "CURRENT RESUME (latest LaTeX source)"
+    
+    # When output.tex is exactly what the resume data renders to, the data is
+    # both smaller and what update_resume_data patches
+    resume_data = workspace.read_data()
+    if resume_data is not None and latest_document == render_resume(resume_data):
+        latest_document = json.dumps(resume_data, ensure_ascii=False, separators=(',', ':'))
+        document_heading = "CURRENT RESUME DATA (JSON, edit with update_resume_data)"
     
-    working_commands = []
+    messages, context_stats = build_context(system_prompt.message, conversation_history, user_message,
+                                            latest_document, document_heading=document_heading)
+    context_stats['system_prompt'] = system_prompt.version
     
-    for cmd in pdflatex_commands:
+    logger.info("🧮 Context: ~%d prompt tokens (%d/%d messages, %d compacted, ~%d tokens saved)",
+                context_stats['prompt_tokens'], context_stats['included_messages'], context_stats['history_messages'],
+                context_stats['compacted_messages'], context_stats['saved_tokens'],
+                extra={'session_id': session_id, 'context_stats': context_stats})
+    return messages, context_stats
 
-        try:
 
-            result = subprocess.run(
-                [cmd, "--version"],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                timeout=10
+def record_llm_usage(operation, ai_response):
+    """Count the provider-reported input and output tokens of an LLM response"""
+    usage = getattr(ai_response, 'usage_metadata', None) or {}
+    for direction in ('input', 'output'):
+        if usage.get(f'{direction}_tokens'):
+            LLM_TOKENS.inc(usage[f'{direction}_tokens'], operation=operation, direction=direction)
 
-            )
-            if result.returncode == 0:
-                version_info = result.stdout.split('\n')[0] if result.stdout else "Unknown version"
-                print(f"✅ Working: {cmd}")
-                print(f"   Version: {version_info}")
-                working_commands.append(cmd)
-            else:
-                print(f"❌ Failed: {cmd} (return code: {result.returncode})")
-        except FileNotFoundError:
-            print(f"❌ Not found: {cmd}")
-        except subprocess.TimeoutExpired:
-            print(f"⏱️ Timeout: {cmd}")
-        except Exception as e:
-            print(f"❌ Error: {cmd} - {str(e)}")
 
+def with_token_usage(context_stats, ai_response):
+    """Add the provider-reported prompt token count, when there is one, to the context stats"""
+    usage = getattr(ai_response, 'usage_metadata', None)
+    if usage and usage.get('input_tokens') is not None:
+        context_stats = dict(context_stats, reported_prompt_tokens=usage['input_tokens'])
+    return context_stats
+
+
+def dispatch_tool_calls(ai_response, session_id, response_content):
+    """Execute resume tool calls (write_latex, update_resume_data, patch_resume_section) and queue their compiles.
+
+    Returns the response text with status notes appended, the queued
+    CompileJob (or None), the QueueFullError if the queue was full and the
+    LaTeX document that was written (or None).
+    """
+    queue_full = None
+    compile_job = None
+    document = None
+    if hasattr(ai_response, 'tool_calls') and ai_response.tool_calls:
+        for i, tool_call in enumerate(ai_response.tool_calls):
+            logger.info("📞 Tool call %d/%d: %s", i + 1, len(ai_response.tool_calls), tool_call['name'],
+                        extra={'session_id': session_id})
+            write_result, latex_code = run_resume_tool(tool_call)
+            if write_result is not None:
+                logger.info("📋 Tool result: %s", write_result['message'], extra={'session_id': session_id})
+                
+                if write_result['success']:
+                    document = latex_code
+                    # Compile in the background; the browser is told when it's done
+                    try:
+                        compile_job = compile_scheduler.submit(latex_code, session_id)
+                    except QueueFullError as e:
+                        queue_full = e
+                        response_content += f"\n\n⏳ Resume updated, but the compile server is busy. Press Refresh in about {e.retry_after}s to see the PDF."
+                        continue
+                    logger.info("📋 Compile job %s queued", compile_job.id, extra={'session_id': session_id})
+                    
+                    response_content += "\n\n✅ Resume updated! The PDF preview will refresh as soon as it has compiled."
+                else:
+                    response_content += f"\n\n❌ Failed to update resume: {write_result['message']}"
+    else:
+        logger.info("💬 Regular response without tool calls (%d characters)", len(response_content),
+                    extra={'session_id': session_id})
     
-    if working_commands:
-        print(f"\n✅ LaTeX installation found! Using: {working_commands[0]}")
-        return True
+    return response_content, compile_job, queue_full, document
+
+
+def prepare_chat(session_id, user_message):
+    """Messages for one chat turn, history fitted to the context budget; returns (messages, context_stats)"""
+    conversation_history = get_or_create_conversation_memory(session_id)
+    with span('prompt'):
+        return build_chat_messages(conversation_history, user_message, session_id)
+
+
+def finish_chat(operation, session_id, user_message, ai_response, context_stats):
+    """Run the reply's tool calls and save the turn; returns (payload, QueueFullError or None)"""
+    record_llm_usage(operation, ai_response)
+    response_content = ai_response.content if isinstance(ai_response.content, str) else ''
+    context_stats = with_token_usage(context_stats, ai_response)
     
+    response_content, compile_job, queue_full, document = dispatch_tool_calls(ai_response, session_id, response_content)
+    
+    try:
+        save_conversation_message(session_id, user_message, response_content, document)
+    except Exception as save_error:
+        logger.error("❌ Failed to save conversation: %s", save_error, extra={'session_id': session_id})
+    
+    payload = {
+        'response': response_content,
+        'status': 'success',
+        'session_id': session_id,
+        'conversation_title': conversation_store.get_metadata(session_id)['title'],
+        'compile_job_id': compile_job.id if compile_job else None,
+        'context_stats': context_stats
+    }
+    if queue_full:
+        payload['error'] = 'COMPILE_QUEUE_FULL'
+        payload['retry_after'] = queue_full.retry_after
+    return payload, queue_full
+
+
+def save_chat_error(session_id, user_message, error_msg):
+    """Keep a failed turn in the conversation, so the user sees what went wrong after a reload"""
+    try:
+        save_conversation_message(session_id, user_message, f"❌ Error: {error_msg}")
+    except Exception as save_error:
+        logger.error("❌ Failed to save error conversation: %s", save_error, extra={'session_id': session_id})
+
+
+LLM_NOT_CONFIGURED_PAYLOAD = {
+    'response': "❌ Google Gemini API is not connected. Please check your API key configuration.\n\n" +
+               "📋 Setup steps:\n" +
+               "1. Create a .env file in the Niti-AI directory\n" +
+               "2. Add: GOOGLE_API_KEY=your_api_key_here\n" +
+               "3. Restart the application\n" +
+               "🔗 Get your API key from: https://aistudio.google.com/app/apikey",
+    'error': 'API_NOT_CONFIGURED'
+}
+
+
+def sse_event(event, data):
+    """Format one Server-Sent Events frame with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def chat_error_payload(error_msg):
+    """Map an LLM/provider error to the chat API's error payload and status code"""
+    if "401" in error_msg or "invalid_api_key" in error_msg.lower() or "api_key" in error_msg.lower():
+        return {
+            'response': "❌ Invalid API key. Please check your GOOGLE_API_KEY in the .env file.\n\n" +
+                       "🔑 Make sure your API key is correct and active.\n" +
+                       "🔗 Get your API key from: https://aistudio.google.com/app/apikey",
+            'error': 'INVALID_API_KEY'
+        }, 401
+    elif "429" in error_msg or "rate_limit" in error_msg.lower():
+        return {
+            'response': "⏳ Rate limit exceeded. Please wait a moment and try again.",
+            'error': 'RATE_LIMIT'
+        }, 429
     else:
-        print(f"\n❌ No working LaTeX installation found!")
-        print(f"📥 Please install LaTeX:")
-        print(f"   • MiKTeX: https://miktex.org/download")
-        print(f"   • TeX Live: https://www.tug.org/texlive/")
-        return False
+        return {
+            'response': f"❌ Error generating response: {error_msg}",
+            'error': 'API_ERROR'
+        }, 500
 
 
 # ROUTES
@@ -490,15 +1124,7 @@ def chat():
             return jsonify({'error': 'No message provided'}), 400
         
         if not llm or not llm_with_tools:
-            return jsonify({
-                'response': "❌ Google Gemini API is not connected. Please check your API key configuration.\n\n" +
-                           "📋 Setup steps:\n" +
-                           "1. Create a .env file in the Niti-AI directory\n" +
-                           "2. Add: GOOGLE_API_KEY=your_api_key_here\n" +
-                           "3. Restart the application\n" +
-                           "🔗 Get your API key from: https://aistudio.google.com/app/apikey",
-                'error': 'API_NOT_CONFIGURED'
-            }), 503
+            return jsonify(LLM_NOT_CONFIGURED_PAYLOAD), 503
         
 
 
@@ -507,365 +1133,98 @@ def chat():
             session_id = str(uuid.uuid4())
             session['conversation_id'] = session_id
         
-
-        conversation_history = get_or_create_conversation_memory(session_id)
-        
-        system_prompt = """You are an expert LaTeX resume generator. When asked to create or modify a resume, you MUST:
-
-        
-
-**1. ALWAYS USE THE EXACT TEMPLATE STRUCTURE**: Follow the provided LaTeX template exactly, maintaining all packages, custom commands, and formatting.
-
-**2. GENERATE PROPERLY FORMATTED CODE**: Never output LaTeX code as a single line. Always maintain proper indentation, line breaks, and sectioning as shown in the template.
-
-**3. USE ONLY DEFINED CUSTOM COMMANDS**: Strictly use the template's custom commands:
-   - \\resumeSubheading{job_title}{dates}{company}{location}
-   - \\resumeProjectHeading{project_name}{date}
-   - \\resumeItem{description}
-   - \\resumeItemListStart and \\resumeItemListEnd
-   - \\resumeSubHeadingListStart and \\resumeSubHeadingListEnd
-
-**4. MAINTAIN EXACT SECTION ORDER**:
-   - HEADING (name, contact info)
-   - Professional Summary
-   - Technical Skills
-   - Experience
-   - Projects
-   - Achievements
-   - Certifications
-   - Education
-
-**5. INTELLIGENT TOOL USAGE**: 
-When users request resume creation, generation, updates, or modifications, you MUST call the write_latex tool immediately. Examples of user requests that require tool usage:
-- "create my resume" / "build my resume" / "generate my resume"
-- "write my resume" / "make my resume" / "put together my resume"
-- "update my resume" / "modify my resume" / "edit my resume"
-- "compile my information" / "create a resume for me"
-- Any request to create, build, generate, update, or modify a resume document
-
-CRITICAL INSTRUCTIONS:
-- ANALYZE the user's request and DECIDE if they want resume generation/updates
-- If YES, immediately call the write_latex tool with the COMPLETE LaTeX template (ALL packages, commands, sections)
-- Generate the ENTIRE template from \\documentclass to \\end{document} as one line
-- MUST include ALL template sections: heading, summary, skills, experience, projects, achievements, certifications, education
-- Do NOT provide LaTeX code in your response text
-- Your response should explain what you're doing, then call the tool
-- Use ONLY the write_latex tool for creating/updating resumes
-- NEVER generate partial templates - always provide the FULL compilable document
-
-**6. COMPLETE LATEX TEMPLATE - GENERATE THIS ENTIRE TEMPLATE:**
-You MUST generate this COMPLETE template structure for all resumes. Include EVERY part from \\documentclass to \\end{document}:
-
-```latex
-\\documentclass[letterpaper,11pt]{article}
-
-\\usepackage{latexsym}
-\\usepackage[empty]{fullpage}
-\\usepackage{titlesec}
-\\usepackage{marvosym}
-\\usepackage[usenames,dvipsnames]{color}
-\\usepackage{verbatim}
-\\usepackage{enumitem}
-\\usepackage[hidelinks]{hyperref}
-\\usepackage{fancyhdr}
-\\usepackage[english]{babel}
-\\usepackage{tabularx}
-\\usepackage{fontawesome5}
-\\usepackage{multicol}
-\\setlength{\\multicolsep}{-3.0pt}
-\\setlength{\\columnsep}{-1pt}
-\\input{glyphtounicode}
-
-\\pagestyle{fancy}
-\\fancyhf{}
-\\fancyfoot{}
-\\renewcommand{\\headrulewidth}{0pt}
-\\renewcommand{\\footrulewidth}{0pt}
-
-% Adjust margins
-\\addtolength{\\oddsidemargin}{-0.6in}
-\\addtolength{\\evensidemargin}{-0.5in}
-\\addtolength{\\textwidth}{1.19in}
-\\addtolength{\\topmargin}{-.7in}
-\\addtolength{\\textheight}{1.4in}
-
-\\urlstyle{same}
-\\raggedbottom
-\\raggedright
-\\setlength{\\tabcolsep}{0in}
-
-% Section formatting
-\\titleformat{\\section}{
-  \\vspace{-4pt}\\scshape\\raggedright\\large\\bfseries
-}{}{0em}{}[\\color{black}\\titlerule \\vspace{-5pt}]
-
-% Unicode support for ATS
-\\pdfgentounicode=1
-
-% Custom commands
-\\newcommand{\\resumeItem}[1]{\\item\\small{{#1 \\vspace{-2pt}}}}
-\\newcommand{\\resumeSubheading}[4]{
-  \\vspace{-2pt}\\item
-    \\begin{tabular*}{1.0\\textwidth}[t]{l@{\\extracolsep{\\fill}}r}
-      \\textbf{#1} & \\textbf{\\small #2} \\\\
-      \\textit{\\small#3} & \\textit{\\small #4} \\\\
-    \\end{tabular*}\\vspace{-7pt}
-}
-\\newcommand{\\resumeProjectHeading}[2]{
-    \\item
-    \\begin{tabular*}{1.001\\textwidth}{l@{\\extracolsep{\\fill}}r}
-      \\small#1 & \\textbf{\\small #2} \\\\
-    \\end{tabular*}\\vspace{-7pt}
-}
-\\newcommand{\\resumeItemListStart}{\\begin{itemize}}
-\\newcommand{\\resumeItemListEnd}{\\end{itemize}\\vspace{-5pt}}
-\\newcommand{\\resumeSubHeadingListStart}{\\begin{itemize}[leftmargin=0.0in, label={}]}
-\\newcommand{\\resumeSubHeadingListEnd}{\\end{itemize}}
-
-\\begin{document}
-
-%----------HEADING----------
-\\begin{center}
-    {\\Huge \\scshape [FULL NAME]} \\\\ \\vspace{1pt}
-    \\small \\raisebox{-0.1\\height}\\faEnvelope\\ \\href{mailto:[EMAIL]}{[EMAIL]} ~ 
-    \\raisebox{-0.1\\height}\\faPhone\\ [PHONE] ~ 
-    \\href{[LINKEDIN_URL]}{\\raisebox{-0.2\\height}\\faLinkedin\\ \\underline{[LINKEDIN_DISPLAY]}} ~ 
-    \\href{[GITHUB_URL]}{\\raisebox{-0.2\\height}\\faGithub\\ \\underline{[GITHUB_DISPLAY]}}
-    \\vspace{-8pt}
-\\end{center}
-
-%-----------PROFESSIONAL SUMMARY-----------
-\\section{Professional Summary}
-[PROFESSIONAL_SUMMARY_TEXT]
-
-%-----------SKILLS-----------
-\\section{Technical Skills}
-\\begin{itemize}[leftmargin=0.15in, label={}]
-    \\item \\textbf{Programming Languages}{: [PROGRAMMING_LANGUAGES]}
-    \\item \\textbf{Machine Learning Tools}{: [ML_TOOLS]}
-    \\item \\textbf{Generative AI \\& Agents}{: [AI_TOOLS]}
-    \\item \\textbf{Data Analysis}{: [DATA_TOOLS]}
-    \\item \\textbf{Development Tools}{: [DEV_TOOLS]}
-    \\item \\textbf{Soft Skills}{: [SOFT_SKILLS]}
-\\end{itemize}
-
-%-----------EXPERIENCE-----------
-\\section{Experience}
-  \\resumeSubHeadingListStart
-    \\resumeSubheading
-      {[JOB_TITLE]}{[DATES]}
-      {[COMPANY]}{[LOCATION]}
-      \\resumeItemListStart
-        \\resumeItem{[RESPONSIBILITY_1]}
-        \\resumeItem{[RESPONSIBILITY_2]}
-        \\resumeItem{[RESPONSIBILITY_3]}
-      \\resumeItemListEnd
-  \\resumeSubHeadingListEnd
-
-%-----------PROJECTS-----------
-\\section{Projects}
-  \\resumeSubHeadingListStart
-    \\resumeProjectHeading
-      {\\textbf{[PROJECT_NAME]} \\$|\\$ \\emph{[TECHNOLOGIES]}}{[DATE]}
-      \\resumeItemListStart
-        \\resumeItem{[PROJECT_DESCRIPTION_1]}
-        \\resumeItem{[PROJECT_DESCRIPTION_2]}
-      \\resumeItemListEnd
-  \\resumeSubHeadingListEnd
-
-%-----------ACHIEVEMENTS-----------
-\\section{Achievements}
-  \\resumeSubHeadingListStart
-    \\resumeItem{\\textbf{[ACHIEVEMENT_NAME]} ([YEAR]): [ACHIEVEMENT_DESCRIPTION]}
-  \\resumeSubHeadingListEnd
-
-%-----------CERTIFICATIONS-----------
-\\section{Certifications}
-  \\resumeSubHeadingListStart
-    \\resumeItem{\\textbf{[CERTIFICATION_NAME]}: [CERTIFICATION_DESCRIPTION]}
-  \\resumeSubHeadingListEnd
-
-%-----------EDUCATION-----------
-\\section{Education}
-  \\resumeSubHeadingListStart
-    \\resumeSubheading
-      {[UNIVERSITY_NAME]}{[GRADUATION_DATE]}
-      {[DEGREE] in [MAJOR]; \\textbf{[GPA/CGPA]}}{[LOCATION]}
-  \\resumeSubHeadingListEnd
-
-\\end{document}
-```
-
-**MANDATORY: Generate the COMPLETE template above as a single line with ALL sections filled.**
-
-**CRITICAL RULES FOR COMPLETE LATEX TEMPLATE GENERATION:**
-1. GENERATE the COMPLETE LaTeX template as a SINGLE LINE without any whitespace characters
-2. MUST include ALL parts: document class, ALL packages, ALL custom commands, complete document structure
-3. NEVER omit ANY part of the template structure (preamble, packages, custom commands, document sections)
-4. ALWAYS generate the FULL template from \\documentclass to \\end{document}
-5. ALWAYS use the write_latex tool to save the complete LaTeX document
-6. ENSURE the LaTeX code is compilation-ready with ALL necessary components
-7. Replace ALL placeholders [PLACEHOLDER_NAME] with actual user information from conversation
-8. If user doesn't provide certain information, use reasonable defaults but NEVER omit sections
-9. Generate the ENTIRE compact single-line LaTeX template without any whitespace
-10. MUST generate COMPLETE resume with ALL sections for proper PDF compilation
-
-**CRITICAL: NO WHITESPACE CHARACTERS**
-- NEVER use any whitespace characters like spaces, tabs, or line breaks
-- Generate ALL LaTeX code as ONE CONTINUOUS LINE
-- Do NOT use \\n, \\t, \\r or any other escape sequences
-- Concatenate all LaTeX commands directly without spaces
-
-**COMPLETE TEMPLATE REQUIREMENTS:**
-- Generate the ENTIRE LaTeX template in ONE continuous line
-- MUST include: \\documentclass, ALL \\usepackage commands, ALL \\newcommand definitions, complete document content, \\end{document}
-- Include ALL sections: Heading, Professional Summary, Technical Skills, Experience, Projects, Achievements, Certifications, Education
-- NO spaces between commands, environments, or parameters
-- NO line breaks anywhere in the LaTeX code
-- NO indentation or formatting whitespace
-- Generate the complete resume template as one compact LaTeX string
-- NEVER generate partial templates - always generate the FULL compilable document
-- Do NOT use any whitespace characters anywhere in the code
-
-**FORMATTING REQUIREMENTS:**
-- Use proper spacing with \\vspace commands
-- Maintain tabular formatting for contact information
-- Use FontAwesome icons (\\faEnvelope, \\faPhone, \\faLinkedin, \\faGithub)
-- Keep itemize lists properly indented
-- Use \\textbf{} for bold text appropriately
-- Include proper section separators and spacing
-
-**SINGLE-LINE CODE EXAMPLE:**
-When using the write_latex tool, generate ALL code as ONE continuous line like this:
-
-```latex
-\\documentclass[letterpaper,11pt]{article}\\usepackage{latexsym}\\usepackage[empty]{fullpage}\\usepackage{titlesec}\\usepackage{marvosym}\\usepackage[usenames,dvipsnames]{color}\\usepackage{verbatim}\\usepackage{enumitem}\\usepackage[hidelinks]{hyperref}\\usepackage{fancyhdr}\\usepackage[english]{babel}\\usepackage{tabularx}\\usepackage{fontawesome5}\\usepackage{multicol}\\setlength{\\multicolsep}{-3.0pt}\\setlength{\\columnsep}{-1pt}\\input{glyphtounicode}\\pagestyle{fancy}\\fancyhf{}\\fancyfoot{}\\renewcommand{\\headrulewidth}{0pt}\\renewcommand{\\footrulewidth}{0pt}\\addtolength{\\oddsidemargin}{-0.6in}\\addtolength{\\evensidemargin}{-0.5in}\\addtolength{\\textwidth}{1.19in}\\addtolength{\\topmargin}{-.7in}\\addtolength{\\textheight}{1.4in}\\urlstyle{same}\\raggedbottom\\raggedright\\setlength{\\tabcolsep}{0in}\\titleformat{\\section}{\\vspace{-4pt}\\scshape\\raggedright\\large\\bfseries}{}{0em}{}[\\color{black}\\titlerule\\vspace{-5pt}]\\pdfgentounicode=1\\newcommand{\\resumeItem}[1]{\\item\\small{{#1\\vspace{-2pt}}}}\\newcommand{\\resumeSubheading}[4]{\\vspace{-2pt}\\item\\begin{tabular*}{1.0\\textwidth}[t]{l@{\\extracolsep{\\fill}}r}\\textbf{#1}&\\textbf{\\small#2}\\\\\\textit{\\small#3}&\\textit{\\small#4}\\\\\\end{tabular*}\\vspace{-7pt}}\\newcommand{\\resumeProjectHeading}[2]{\\item\\begin{tabular*}{1.001\\textwidth}{l@{\\extracolsep{\\fill}}r}\\small#1&\\textbf{\\small#2}\\\\\\end{tabular*}\\vspace{-7pt}}\\newcommand{\\resumeItemListStart}{\\begin{itemize}}\\newcommand{\\resumeItemListEnd}{\\end{itemize}\\vspace{-5pt}}\\newcommand{\\resumeSubHeadingListStart}{\\begin{itemize}[leftmargin=0.0in,label={}]}\\newcommand{\\resumeSubHeadingListEnd}{\\end{itemize}}\\begin{document}\\begin{center}{\\Huge\\scshape[USER_NAME]}\\\\\\vspace{1pt}\\small\\raisebox{-0.1\\height}\\faEnvelope\\href{mailto:[USER_EMAIL]}{[USER_EMAIL]}~\\raisebox{-0.1\\height}\\faPhone\\[USER_PHONE]~\\href{[USER_LINKEDIN]}{\\raisebox{-0.2\\height}\\faLinkedin\\underline{[USER_LINKEDIN_DISPLAY]}}~\\href{[USER_GITHUB]}{\\raisebox{-0.2\\height}\\faGithub\\underline{[USER_GITHUB_DISPLAY]}}\\vspace{-8pt}\\end{center}\\section{Professional Summary}[USER_SUMMARY]\\section{Technical Skills}\\begin{itemize}[leftmargin=0.15in,label={}]\\item\\textbf{Programming Languages}{:[USER_LANGUAGES]}\\item\\textbf{Tools}{:[USER_TOOLS]}\\end{itemize}\\section{Experience}\\resumeSubHeadingListStart\\resumeSubheading{[USER_JOB_TITLE]}{[USER_DATES]}{[USER_COMPANY]}{[USER_LOCATION]}\\resumeItemListStart\\resumeItem{[USER_RESPONSIBILITY_1]}\\resumeItem{[USER_RESPONSIBILITY_2]}\\resumeItemListEnd\\resumeSubHeadingListEnd\\section{Education}\\resumeSubHeadingListStart\\resumeSubheading{[USER_UNIVERSITY]}{[USER_GRADUATION]}{[USER_DEGREE]}{[USER_UNIVERSITY_LOCATION]}\\resumeSubHeadingListEnd\\end{document}
-```
-
-IMPORTANT: Generate this as ONE continuous line with NO spaces, line breaks, or whitespace characters!
-
-**DECISION MAKING:**
-- READ the user's message carefully
-- DETERMINE if they want resume creation/updates
-- If YES: Immediately call write_latex tool with structured, properly formatted LaTeX code
-- If NO: Provide helpful conversation and guidance
-
-**FORMATTING REMINDER:**
-When calling write_latex tool, provide the LaTeX code as a single continuous line:
-- NO line breaks anywhere
-- NO spaces between commands
-- NO indentation or whitespace
-- ALL LaTeX code concatenated into ONE line that can be written directly to a .tex file
-
-Remember: The goal is to produce a professional, ATS-friendly resume that compiles perfectly and matches the provided template structure exactly. Always prioritize proper formatting and structure over brevity. Let the user's request guide your decision to use tools."""
-
-        messages = [SystemMessage(content=system_prompt)]
+        messages, context_stats = prepare_chat(session_id, user_message)
         
-        for msg in conversation_history:
-            if msg['type'] == 'human':
-                messages.append(HumanMessage(content=msg['content']))
-            elif msg['type'] == 'ai':
-                messages.append(AIMessage(content=msg['content']))
+        logger.info("💬 Processing a %d character message", len(user_message), extra={'session_id': session_id})
+        logger.debug("User message: %s", user_message)
         
-        messages.append(HumanMessage(content=user_message))
+        with span('llm'), LLM_REQUEST_SECONDS.time(operation='chat', outcome='success'):
+            ai_response = llm_with_tools.invoke(messages)
         
-        print(f"\n💬 PROCESSING USER MESSAGE...")
-        print(f"📝 User message: '{user_message[:100]}...'")
-        print(f"📞 Using LLM with tools enabled...")
+        payload, queue_full = finish_chat('chat', session_id, user_message, ai_response, context_stats)
+        if queue_full:
+            return queue_full_response(queue_full, payload)
         
-
-
-        ai_response = llm_with_tools.invoke(messages)
-        response_content = ai_response.content
+        return jsonify(payload)
         
+    except Exception as e:
 
-        tool_calls_made = []
-        if hasattr(ai_response, 'tool_calls') and ai_response.tool_calls:
-            print(f"\n🤖 AI MADE {len(ai_response.tool_calls)} TOOL CALL(S)")
-            for i, tool_call in enumerate(ai_response.tool_calls):
-                print(f"📞 Tool Call #{i+1}: {tool_call['name']}")
-                if tool_call['name'] == 'write_latex':
-                    print("🎯 DETECTED: write_latex tool call - executing...")
-                    latex_code = tool_call['args']['latex_code']
-                    write_result = write_latex.invoke({'latex_code': latex_code})
-                    print(f"📋 TOOL RESULT: {write_result['message']}")
-                    tool_calls_made.append({
-                        'tool': 'write_latex',
-                        'result': write_result
-                    })
-                    
-
-
-                    if write_result['success']:
-                        print("🔄 PROCEEDING TO COMPILE LATEX...")
-                        compile_result = compile_latex(latex_code)
-                        print(f"📋 COMPILATION RESULT: {compile_result['message']}")
-                        tool_calls_made.append({
-                            'tool': 'compile_latex',
-                            'result': compile_result
-                        })
-                        
-                        if compile_result['success']:
-                            response_content += "\n\n✅ Resume updated and compiled successfully! Check the preview on the right."
-                        else:
-                            response_content += f"\n\n⚠️ Resume updated but compilation failed: {compile_result['message']}"
-                    else:
-                        response_content += f"\n\n❌ Failed to update resume: {write_result['message']}"
-        else:
-            print(f"\n💬 AI PROVIDED REGULAR RESPONSE (No tool calls)")
-            print(f"📝 Response Length: {len(response_content)} characters")
-            print(f"🗨️  Response Preview: {response_content[:150]}...")
+        error_msg = str(e)
+        logger.exception("❌ Error in chat endpoint: %s", e)
         
-        ai_response = response_content
+        if 'user_message' in locals() and 'session_id' in locals():
+            save_chat_error(session_id, user_message, error_msg)
         
-        # Save the conversation to memory 
 
-        try:
-
-            save_conversation_message(session_id, user_message, ai_response)
+        payload, status_code = chat_error_payload(error_msg)
+        return jsonify(payload), status_code
 
-        except Exception as save_error:
-            print(f"❌ Failed to save conversation: {save_error}")
-            
-        
-        return jsonify({
-            'response': ai_response,
-            'status': 'success',
-            'session_id': session_id,
-            'conversation_title': conversation_metadata[session_id]['title']
-        })
-        
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Like /chat, but streams the reply as Server-Sent Events while the LLM generates it"""
+    data = request.json or {}
+    user_message = data.get('message', '')
+    
+    if not user_message:
+        return jsonify({'error': 'No message provided'}), 400
+    
+    if not llm or not llm_with_tools:
+        return jsonify(LLM_NOT_CONFIGURED_PAYLOAD), 503
+    
+    # Settle the session before streaming starts; the cookie can't change afterwards
+    session_id = session.get('conversation_id')
+    if not session_id:
+        session_id = str(uuid.uuid4())
+        session['conversation_id'] = session_id
+    
+    try:
+        messages, context_stats = prepare_chat(session_id, user_message)
     except Exception as e:
-
-        error_msg = str(e)
-        print(f"❌ Error in chat endpoint: {e}")
-        
+        # Nothing has been streamed yet, so fail with the same JSON as /chat
+        logger.exception("❌ Error preparing chat stream: %s", e)
+        save_chat_error(session_id, user_message, str(e))
+        payload, status_code = chat_error_payload(str(e))
+        return jsonify(payload), status_code
+    # Headers go out before the LLM runs, so the full timing travels in the done event
+    trace = current_trace()
+    
+    def event_stream():
+        ai_response = None
         try:
-            if 'user_message' in locals() and 'session_id' in locals():
-                error_response = f"❌ Error: {error_msg}"
-                save_conversation_message(session_id, user_message, error_response)
-                print(f"💾 Saved error conversation to memory")
-        except Exception as save_error:
-            print(f"❌ Failed to save error conversation: {save_error}")
+            logger.info("💬 Streaming a response to a %d character message", len(user_message),
+                        extra={'session_id': session_id})
+            logger.debug("User message: %s", user_message)
+            
+            # Chunks add up to the full message, including any tool call
+            # arguments, which only become usable once the stream has ended
+            with span('llm'), LLM_REQUEST_SECONDS.time(operation='chat_stream', outcome='success'):
+                for chunk in llm_with_tools.stream(messages):
+                    ai_response = chunk if ai_response is None else ai_response + chunk
+                    if isinstance(chunk.content, str) and chunk.content:
+                        yield sse_event('token', {'text': chunk.content})
+            
+            if ai_response is None:
+                ai_response = AIMessage(content='')
+            payload, _ = finish_chat('chat_stream', session_id, user_message, ai_response, context_stats)
+            if trace is not None:
+                payload['server_timing'] = trace.server_timing()
+            yield sse_event('done', payload)
         
-
-        if "401" in error_msg or "invalid_api_key" in error_msg.lower() or "api_key" in error_msg.lower():
-            return jsonify({
-                'response': "❌ Invalid API key. Please check your GOOGLE_API_KEY in the .env file.\n\n" +
-                           "🔑 Make sure your API key is correct and active.\n" +
-                           "🔗 Get your API key from: https://aistudio.google.com/app/apikey",
-                'error': 'INVALID_API_KEY'
-            }), 401
-        elif "429" in error_msg or "rate_limit" in error_msg.lower():
-            return jsonify({
-                'response': "⏳ Rate limit exceeded. Please wait a moment and try again.",
-                'error': 'RATE_LIMIT'
-            }), 429
-        else:
-            return jsonify({
-                'response': f"❌ Error generating response: {error_msg}",
-                'error': 'API_ERROR'
-            }), 500
+        except Exception as e:
+            error_msg = str(e)
+            logger.exception("❌ Error in chat stream: %s", e, extra={'session_id': session_id})
+            save_chat_error(session_id, user_message, error_msg)
+            payload, _ = chat_error_payload(error_msg)
+            yield sse_event('error', payload)
+    
+    def traced_event_stream():
+        with activate(trace):
+            yield from event_stream()
+    
+    return Response(stream_with_context(traced_event_stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @app.route('/start_session', methods=['POST'])
 def start_session():
@@ -891,7 +1250,8 @@ def get_conversation_history():
 
     session_id = session.get('conversation_id')
     
-    if not session_id or session_id not in conversation_messages:
+    metadata = conversation_store.get_metadata(session_id) if session_id else None
+    if metadata is None:
 
         return jsonify({
             'messages': [],
@@ -899,35 +1259,34 @@ def get_conversation_history():
             'message': 'No active conversation'
         })
     
-    messages = conversation_messages[session_id]
+    messages = conversation_store.get_messages(session_id)
     
     return jsonify({
         'messages': messages,
         'session_id': session_id,
-        'metadata': conversation_metadata.get(session_id, {}),
+        'metadata': metadata,
         'status': 'success'
     })
 
 @app.route('/list_conversations', methods=['GET'])
 def list_conversations():
-    """List all conversation sessions"""
-    conversations = []
-    for session_id, metadata in conversation_metadata.items():
-
-        conversations.append({
-            'session_id': session_id,
-            'title': metadata['title'],
-            'created_at': metadata['created_at'],
-            'last_updated': metadata.get('last_updated', metadata['created_at']),
-            'message_count': metadata['message_count']
-        })
+    """List conversation sessions, most recently updated first, one page at a time"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    before = request.args.get('before')
     
-    conversations.sort(key=lambda x: x['last_updated'], reverse=True)
+    page, next_cursor = conversation_store.list_recent(limit, before)
+    conversations = [{
+        'session_id': metadata['session_id'],
+        'title': metadata['title'],
+        'created_at': metadata['created_at'],
+        'last_updated': metadata.get('last_updated', metadata['created_at']),
+        'message_count': metadata['message_count']
+    } for metadata in page]
     
-
     return jsonify({
         'conversations': conversations,
-        'total_count': len(conversations),
+        'total_count': conversation_store.count(),
+        'next_cursor': next_cursor,
         'status': 'success'
     })
 
@@ -942,7 +1301,8 @@ def switch_conversation():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id not in conversation_messages:
+    metadata = conversation_store.get_metadata(session_id) if session_id else None
+    if metadata is None:
 
         return jsonify({
             'error': 'Conversation not found',
@@ -954,7 +1314,7 @@ def switch_conversation():
     return jsonify({
         'session_id': session_id,
         'status': 'success',
-        'message': f'Switched to conversation: {conversation_metadata[session_id]["title"]}'
+        'message': f'Switched to conversation: {metadata["title"]}'
     })
 
 @app.route('/delete_conversation', methods=['DELETE'])
@@ -965,9 +1325,8 @@ def delete_conversation():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id in conversation_messages:
-        del conversation_messages[session_id]
-        del conversation_metadata[session_id]
+    if session_id and conversation_store.delete(session_id):
+        forget_session_files(session_id)
         
         if session.get('conversation_id') == session_id:
             session.pop('conversation_id', None)
@@ -988,42 +1347,22 @@ def compile_resume():
     """Compile LaTeX to PDF and return status"""
 
     try:
-        # Check if output.tex exists
-        if not os.path.exists('output.tex'):
-            return jsonify({
-                'success': False,
-                'message': 'output.tex file not found. Please ensure the LaTeX file exists.',
-                'status': 'error'
-            }), 404
-        
-        with open('output.tex', 'r', encoding='utf-8') as f:
-            latex_code = f.read()
+        session_id = session.get('conversation_id')
+        latex_code = read_session_source(session_id)
+
+        if latex_code is None:
+            return jsonify(SOURCE_NOT_FOUND_PAYLOAD), 404
         
-        result = compile_latex(latex_code)
+        try:
+            result = run_compile(latex_code, session_id)
+        except QueueFullError as e:
+            return queue_full_response(e, compile_busy_payload(e))
         
-        if result['success']:
-            return jsonify({
-                'success': True,
-                'message': result['message'],
-                'output_file': result.get('output_file'),
-                'pdf_generated': result.get('pdf_generated', False),
-                'compiler_used': result.get('compiler_used', 'unknown'),
-                'status': 'success'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'message': result['message'],
-                'pdf_generated': False,
-                'status': 'error'
-            }), 500
+        payload, status_code = compile_response_payload(result)
+        return jsonify(payload), status_code
             
     except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error compiling resume: {str(e)}',
-            'status': 'error'
-        }), 500
+        return jsonify(compile_error_payload(e)), 500
 
 @app.route('/generate_and_compile', methods=['POST'])
 def generate_and_compile():
@@ -1039,20 +1378,6 @@ def generate_and_compile():
                 'status': 'error'
             }), 400
         
-        # Enhanced system prompt for LaTeX generation
-        system_prompt = """You are an expert LaTeX resume builder. Generate clean, professional LaTeX code for resumes.
-
-Key requirements:
-1. Use the article document class with appropriate margins
-2. Include standard packages like geometry, enumitem, hyperref
-3. Create well-structured sections: Contact, Summary, Experience, Education, Skills
-4. Use professional formatting with consistent spacing
-5. Make the resume ATS-friendly with clear section headers
-6. Always provide complete, compilable LaTeX code
-7. Focus on clean, modern design
-
-When users ask for resume updates, modifications, or improvements, provide the complete LaTeX code."""
-        
         # Get or create conversation memory
         conversation_id = session.get('conversation_id')
         if not conversation_id:
@@ -1061,37 +1386,45 @@ When users ask for resume updates, modifications, or improvements, provide the c
         
         memory = get_or_create_conversation_memory(conversation_id)
         
-        # Prepare messages for the AI
-        messages = [SystemMessage(content=system_prompt)]
-        messages.extend(memory)
-        messages.append(HumanMessage(content=user_message))
+        # Prepare messages for the AI, fitted to the context budget
+        with span('prompt'):
+            messages, context_stats = build_chat_messages(memory, user_message, conversation_id, 'generate')
         
         # Get AI response with tool support
-        ai_response = llm_with_tools.invoke(messages)
+        with span('llm'), LLM_REQUEST_SECONDS.time(operation='generate', outcome='success'):
+            ai_response = llm_with_tools.invoke(messages)
+        record_llm_usage('generate', ai_response)
         response_content = ai_response.content
+        context_stats = with_token_usage(context_stats, ai_response)
         
         # Check if the AI made tool calls
         tool_calls_made = []
+        queue_full = None
+        document = None
         if hasattr(ai_response, 'tool_calls') and ai_response.tool_calls:
-            print(f"\n🤖 AI MADE {len(ai_response.tool_calls)} TOOL CALL(S)")
             for i, tool_call in enumerate(ai_response.tool_calls):
-                print(f"📞 Tool Call #{i+1}: {tool_call['name']}")
-                if tool_call['name'] == 'write_latex':
-                    print("🎯 DETECTED: write_latex tool call - executing...")
-                    # Execute the write_latex tool
-                    latex_code = tool_call['args']['latex_code']
-                    write_result = write_latex.invoke({'latex_code': latex_code})
-                    print(f"📋 TOOL RESULT: {write_result['message']}")
+                logger.info("📞 Tool call %d/%d: %s", i + 1, len(ai_response.tool_calls), tool_call['name'],
+                            extra={'session_id': conversation_id})
+                # Execute the resume tool (write_latex, update_resume_data or patch_resume_section)
+                write_result, latex_code = run_resume_tool(tool_call)
+                if write_result is not None:
+                    logger.info("📋 Tool result: %s", write_result['message'], extra={'session_id': conversation_id})
                     tool_calls_made.append({
-                        'tool': 'write_latex',
+                        'tool': tool_call['name'],
                         'result': write_result
                     })
                     
                     # If LaTeX was written successfully, also compile it
                     if write_result['success']:
-                        print("🔄 PROCEEDING TO COMPILE LATEX...")
-                        compile_result = compile_latex(latex_code)
-                        print(f"📋 COMPILATION RESULT: {compile_result['message']}")
+                        document = latex_code
+                        try:
+                            compile_result = run_compile(latex_code, conversation_id)
+                        except QueueFullError as e:
+                            queue_full = e
+                            response_content += f"\n\n⏳ Resume updated, but the compile server is busy. Please retry in about {e.retry_after}s."
+                            continue
+                        logger.info("📋 Compilation result: %s", compile_result['message'],
+                                    extra={'session_id': conversation_id})
                         tool_calls_made.append({
                             'tool': 'compile_latex',
                             'result': compile_result
@@ -1105,37 +1438,36 @@ When users ask for resume updates, modifications, or improvements, provide the c
                         response_content += f"\n\n❌ Failed to update resume: {write_result['message']}"
         
         # Save conversation
-        save_conversation_message(conversation_id, user_message, response_content)
+        save_conversation_message(conversation_id, user_message, response_content, document)
         
-        latex_code = None
-
-        if "\\documentclass" in response_content or "\\begin{document}" in response_content:
-
-            lines = response_content.split('\n')
-            latex_lines = []
-            in_code_block = False
-            
-            for line in lines:
-                if line.strip().startswith('```'):
-                    in_code_block = not in_code_block
-                    continue
-                
-                if in_code_block or "\\documentclass" in line or "\\begin{document}" in line or latex_lines:
-                    latex_lines.append(line)
-                    if "\\end{document}" in line:
-                        break
-            
-            if latex_lines:
-                latex_code = '\n'.join(latex_lines)
+        latex_code = extract_latex_from_response(response_content)
         
+        if queue_full:
+            return queue_full_response(queue_full, {
+                'success': False,
+                'message': response_content,
+                'retry_after': queue_full.retry_after,
+                'status': 'error'
+            })
+
         if latex_code:
-            compile_result = compile_latex(latex_code)
+            try:
+                compile_result = run_compile(latex_code, conversation_id)
+            except QueueFullError as e:
+                return queue_full_response(e, {
+                    'success': False,
+                    'message': response_content,
+                    'latex_generated': True,
+                    'retry_after': e.retry_after,
+                    'status': 'error'
+                })
             return jsonify({
                 'success': True,
                 'message': response_content,
                 'latex_generated': True,
                 'compilation_success': compile_result['success'],
                 'compilation_message': compile_result['message'],
+                'context_stats': context_stats,
                 'status': 'success'
             })
         else:
@@ -1143,6 +1475,7 @@ When users ask for resume updates, modifications, or improvements, provide the c
                 'success': True,
                 'message': response_content,
                 'latex_generated': False,
+                'context_stats': context_stats,
                 'status': 'success'
             })
             
@@ -1153,24 +1486,121 @@ When users ask for resume updates, modifications, or improvements, provide the c
             'status': 'error'
         }), 500
 
+def find_session_pdf():
+    """Locate the PDF to serve: an explicit ?artifact=, else the session's latest, else the shared output.pdf"""
+    workspace = workspaces.get(session.get('conversation_id'))
+    artifact_id = request.args.get('artifact')
+    if artifact_id:
+        return workspace.find_artifact(artifact_id)
+
+    pdf_file = workspace.find_artifact()
+    if pdf_file:
+        return pdf_file
+    return os.path.abspath('output.pdf') if os.path.exists('output.pdf') else None
+
+@app.route('/resume_data', methods=['GET'])
+def get_resume_data():
+    """Return the current conversation's structured resume data"""
+    data = workspaces.get(session.get('conversation_id')).read_data()
+    if data is None:
+        return jsonify({
+            'error': 'No structured resume data yet',
+            'status': 'error'
+        }), 404
+    
+    return jsonify({
+        'resume_data': data,
+        'status': 'success'
+    })
+
+@app.route('/documents', methods=['GET'])
+def list_documents():
+    """List the stored resume versions of the current conversation"""
+    history = document_store.get(session.get('conversation_id'))
+    return jsonify({
+        'versions': history.list(),
+        'latest_version': history.latest_version(),
+        'status': 'success'
+    })
+
+@app.route('/documents/<int:version>', methods=['GET'])
+def get_document(version):
+    """Return one stored resume version of the current conversation"""
+    latex_code = document_store.get(session.get('conversation_id')).get(version)
+    if latex_code is None:
+        return jsonify({
+            'error': 'Document version not found',
+            'status': 'error'
+        }), 404
+    
+    return jsonify({
+        'version': version,
+        'latex_code': latex_code,
+        'status': 'success'
+    })
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Status of a background compile job"""
+    job = compile_scheduler.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found', 'status': 'error'}), 404
+    response = jsonify(job.to_dict())
+    if job.trace is not None and job.status != CompileJob.QUEUED:
+        # The compile's own breakdown (queue wait, pdflatex, cleanup) for devtools
+        response.headers['Server-Timing'] = job.trace.server_timing(total=False)
+    return response
+
+@app.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Server-Sent Events stream that fires 'completed' once the compile job finishes"""
+    job = compile_scheduler.get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found', 'status': 'error'}), 404
+
+    def event_stream():
+        yield sse_event('status', job.to_dict())
+
+        current = job
+        while True:
+            # Wake up regularly so proxies don't drop an idle connection
+            if not current.wait_until_finished(SSE_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+                continue
+            if current.superseded_by is not None:
+                # A newer compile for this session took over; follow it
+                current = current.superseded_by
+                yield sse_event('status', current.to_dict())
+                continue
+            yield sse_event('completed', current.to_dict())
+            return
+
+    return Response(stream_with_context(event_stream()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @app.route('/output.pdf')
 def serve_pdf():
     """Serve the PDF file with proper headers"""
-    if os.path.exists('output.pdf'):
-        return send_file('output.pdf', 
+    pdf_file = find_session_pdf()
+    if pdf_file:
+        return send_file(pdf_file, 
                         as_attachment=False, 
                         mimetype='application/pdf',
-                        download_name='resume.pdf')
+                        download_name='resume.pdf',
+                        max_age=0)
     else:
-        return "<h1>PDF not found</h1><p>The output.pdf file doesn't exist in the current directory.</p>", 404
+        return "<h1>PDF not found</h1><p>No compiled resume exists for this conversation yet.</p>", 404
 
 @app.route('/download')
 def download_pdf():
     """Download the PDF file"""
-    if os.path.exists('output.pdf'):
-        return send_file('output.pdf', as_attachment=True, download_name='resume.pdf')
+    pdf_file = find_session_pdf()
+    if pdf_file:
+        return send_file(pdf_file, as_attachment=True, download_name='resume.pdf')
     else:
-        return "<h1>PDF not found</h1><p>The output.pdf file doesn't exist in the current directory.</p>", 404
+        return "<h1>PDF not found</h1><p>No compiled resume exists for this conversation yet.</p>", 404
 
 @app.route('/test_tool', methods=['POST'])
 def test_tool():
@@ -1186,8 +1616,7 @@ def test_tool():
 
         test_message = "Create my resume now with this info: John Doe, john@email.com, 123-456-7890, Software Developer at ABC Corp, BS Computer Science, Python and JavaScript skills."
         
-        print(f"\n🧪 TESTING LATEX GENERATION...")
-        print(f"📝 Test message: {test_message[:100]}...")
+        logger.info("🧪 Testing LaTeX generation")
         
 
         resume_keywords = [
@@ -1198,31 +1627,25 @@ def test_tool():
         ]
         
         should_generate_latex = any(keyword in test_message.lower() for keyword in resume_keywords)
-        print(f"🎯 Keyword detection result: {should_generate_latex}")
+        logger.info("🎯 Keyword detection result: %s", should_generate_latex)
         
         if should_generate_latex:
 
 
-            latex_generation_prompt = """You are a LaTeX resume expert. Generate complete, professional LaTeX code for a resume.
-
-IMPORTANT: Return ONLY the LaTeX code, starting with \\documentclass and ending with \\end{document}. Do not include any explanations or markdown formatting.
-
-Generate LaTeX code for: John Doe, john@email.com, 123-456-7890, Software Developer at ABC Corp, BS Computer Science, Python and JavaScript skills."""
-            
-            messages = [HumanMessage(content=latex_generation_prompt)]
+            messages = [HumanMessage(content=prompts.get('test_latex').text)]
             
-            response = llm.invoke(messages)
+            with LLM_REQUEST_SECONDS.time(operation='test', outcome='success'):
+                response = llm.invoke(messages)
+            record_llm_usage('test', response)
 
             latex_code = response.content.strip()
             
-            print(f"📄 Generated LaTeX length: {len(latex_code)} characters")
-
-            print(f"📝 LaTeX preview: {latex_code[:200]}...")
+            logger.info("📄 Generated %d characters of LaTeX", len(latex_code))
             
 
             write_result = write_latex(latex_code)
 
-            print(f"💾 File write result: {write_result['success']}")
+            logger.info("💾 File write result: %s", write_result['success'])
             
             return jsonify({
                 'success': True,
@@ -1245,12 +1668,56 @@ Generate LaTeX code for: John Doe, john@email.com, 123-456-7890, Software Develo
         
     except Exception as e:
 
-        print(f"❌ Test error: {str(e)}")
+        logger.exception("❌ Test error: %s", e)
         return jsonify({
             'success': False,
             'message': f'Test failed: {str(e)}'
         }), 500
 
+@app.route('/health', methods=['GET'])
+def health():
+    """Report whether the LLM and the LaTeX compiler are usable"""
+    compiler = get_compiler()
+    return jsonify({
+        'status': 'ok' if compiler and llm_with_tools else 'degraded',
+        'llm_configured': llm_with_tools is not None,
+        'latex_compiler': compiler.to_dict() if compiler else None,
+        'compile_queue': compile_scheduler.stats(),
+        'latex_formats': latex_formats.stats(),
+        'pdf_cache': pdf_cache.stats()
+    })
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Request, LLM, tool and compile metrics in the Prometheus text format"""
+    return Response(registry.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/compile_stats', methods=['GET'])
+def compile_stats():
+    """Queue depth, wait time and run time of the compile worker pool"""
+    return jsonify({
+        'status': 'success',
+        'compile_queue': compile_scheduler.stats(),
+        'latex_formats': latex_formats.stats()
+    })
+
+@app.route('/cache_stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters and size of the compiled PDF and LLM response caches"""
+    return jsonify({
+        'status': 'success',
+        'pdf_cache': pdf_cache.stats(),
+        'llm_cache': llm_response_cache.stats() if llm_response_cache is not None else None
+    })
+
+@app.route('/prompt_stats', methods=['GET'])
+def prompt_stats():
+    """Loaded system prompt versions with their hash and token estimate"""
+    return jsonify({
+        'status': 'success',
+        **prompts.stats()
+    })
+
 @app.route('/debug_memory', methods=['GET'])
 def debug_memory():
 
@@ -1261,18 +1728,18 @@ def debug_memory():
         
         debug_info = {
             'current_session_id': session_id,
-            'total_conversations': len(conversation_metadata),
-            'conversation_metadata': conversation_metadata,
+            'total_conversations': conversation_store.count(),
+            'conversation_metadata': {m.pop('session_id'): m for m in conversation_store.list_metadata()},
             'current_conversation': None
         }
         
-        if session_id and session_id in conversation_messages:
+        if session_id and session_id in conversation_store:
 
-            messages = conversation_messages[session_id]
+            messages = conversation_store.get_messages(session_id)
             debug_info['current_conversation'] = {
                 'session_id': session_id,
                 'message_count': len(messages),
-                'metadata': conversation_metadata.get(session_id, {}),
+                'metadata': conversation_store.get_metadata(session_id) or {},
                 'last_5_messages': messages[-5:] if len(messages) >= 5 else messages,
                 'message_sizes': [
                     {
@@ -1336,4 +1803,4 @@ if __name__ == '__main__':
         print("⚠️  LaTeX not found - PDF compilation will not work until LaTeX is installed")
     print("Press Ctrl+C to stop the server\n")
     
-    app.run(debug=True, host='0.0.0.0', port=5001) 
+    app.run(debug=True, host='0.0.0.0', port=5001, threaded=True) 
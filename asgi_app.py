@@ -0,0 +1,292 @@
+import asyncio
+import functools
+import logging
+import os
+import time
+import uuid
+from typing import Optional
+
+from a2wsgi import WSGIMiddleware
+from itsdangerous import BadSignature
+from langchain_core.messages import AIMessage
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+
+import app_backend
+from app_backend import (
+    COMPILE_WAIT_TIMEOUT, LLM_NOT_CONFIGURED_PAYLOAD, SOURCE_NOT_FOUND_PAYLOAD, SSE_KEEPALIVE_SECONDS, TRACED_ENDPOINTS,
+    chat_error_payload, compile_busy_payload, compile_error_payload, compile_job_result, compile_response_payload,
+    compile_scheduler, finish_chat, prepare_chat, read_session_source, request_session_id, save_chat_error, sse_event
+)
+from compile_scheduler import QueueFullError
+from metrics import HTTP_REQUESTS, HTTP_REQUEST_SECONDS, LLM_REQUEST_SECONDS, session_activity
+from tracing import activate, current_trace, finish_trace, span, start_trace
+
+
+logger = logging.getLogger(__name__)
+
+# Async serving mode: uvicorn asgi_app:app
+#
+# The endpoints that spend their time waiting (/chat and /chat/stream on the
+# LLM, /compile_resume and the job event stream on the compile queue) are
+# coroutines here, so a request waiting on Gemini or pdflatex holds no
+# thread and one process can keep hundreds of chats in flight. Everything
+# else is the Flask app from app_backend.py, mounted as WSGI on a small thread
+# pool; both halves share its session cookie, stores and compile workers.
+# pdflatex keeps running on the bounded compile worker pool, which is what
+# caps TeX's CPU use; the async handlers only await the job.
+
+# Threads serving the Flask routes (history, PDFs, stats, ...)
+ASGI_WSGI_THREADS = int(os.getenv('ASGI_WSGI_THREADS', '16'))
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+flask_app = app_backend.app
+
+
+# SESSION COOKIE
+
+
+def load_session(request: Request) -> dict:
+    """Contents of the Flask session cookie, so sync and async routes share conversations"""
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    try:
+        return dict(serializer.loads(cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds())))
+    except BadSignature:
+        return {}
+
+
+def save_session(response: Response, data: Optional[dict]):
+    """Set the Flask session cookie to data (nothing to do for None)"""
+    if data is None:
+        return
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    samesite = flask_app.config['SESSION_COOKIE_SAMESITE']
+    response.set_cookie(
+        flask_app.config['SESSION_COOKIE_NAME'], serializer.dumps(data),
+        path=flask_app.config['SESSION_COOKIE_PATH'] or '/',
+        domain=flask_app.config['SESSION_COOKIE_DOMAIN'] or None,
+        secure=flask_app.config['SESSION_COOKIE_SECURE'],
+        httponly=flask_app.config['SESSION_COOKIE_HTTPONLY'],
+        samesite=samesite.lower() if samesite else None
+    )
+
+
+def chat_session(request: Request) -> tuple:
+    """(conversation ID, session data to save); the data is None unless a new conversation was started"""
+    data = load_session(request)
+    if data.get('conversation_id'):
+        return data['conversation_id'], None
+    data['conversation_id'] = str(uuid.uuid4())
+    return data['conversation_id'], data
+
+
+async def read_json(request: Request) -> dict:
+    try:
+        data = await request.json()
+    except ValueError:
+        return {}
+    return data if isinstance(data, dict) else {}
+
+
+def endpoint(name: str, rule: str):
+    """Give an async handler what the Flask app's before/after_request hooks do: metrics and Server-Timing"""
+    def decorate(handler):
+        @functools.wraps(handler)
+        async def wrapper(request: Request):
+            started = time.perf_counter()
+            # Each request is its own task with its own copy of the context
+            if name in TRACED_ENDPOINTS:
+                start_trace(name)
+            response = await handler(request)
+
+            HTTP_REQUEST_SECONDS.observe(time.perf_counter() - started, route=rule, method=request.method)
+            HTTP_REQUESTS.inc(route=rule, method=request.method, status=response.status_code)
+            session_id = getattr(request.state, 'session_id', None)
+            session_activity.touch(session_id or load_session(request).get('conversation_id'))
+
+            trace = finish_trace()
+            if trace is not None:
+                response.headers['Server-Timing'] = trace.server_timing()
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("⏱️ %s %s: %s", request.method, rule, response.headers['Server-Timing'],
+                                 extra={'trace': trace.to_dict()})
+            return response
+        return wrapper
+    return decorate
+
+
+# ROUTES
+
+
+@endpoint('chat', '/chat')
+async def chat(request: Request):
+    """/chat with the LLM call awaited instead of blocking a thread"""
+    user_message = (await read_json(request)).get('message', '')
+    if not user_message:
+        return JSONResponse({'error': 'No message provided'}, status_code=400)
+    if not app_backend.llm or not app_backend.llm_with_tools:
+        return JSONResponse(LLM_NOT_CONFIGURED_PAYLOAD, status_code=503)
+
+    session_id, new_session = chat_session(request)
+    request.state.session_id = session_id
+    request_session_id.set(session_id)
+    try:
+        # Store and workspace access is short but blocking, so it runs on a worker thread
+        messages, context_stats = await asyncio.to_thread(prepare_chat, session_id, user_message)
+
+        logger.info("💬 Processing a %d character message", len(user_message), extra={'session_id': session_id})
+        logger.debug("User message: %s", user_message)
+
+        with span('llm'), LLM_REQUEST_SECONDS.time(operation='chat', outcome='success'):
+            ai_response = await app_backend.llm_with_tools.ainvoke(messages)
+
+        payload, queue_full = await asyncio.to_thread(finish_chat, 'chat', session_id, user_message, ai_response,
+                                                      context_stats)
+        response = JSONResponse(payload, status_code=429 if queue_full else 200)
+        if queue_full:
+            response.headers['Retry-After'] = str(queue_full.retry_after)
+
+    except Exception as e:
+        logger.exception("❌ Error in chat endpoint: %s", e)
+        await asyncio.to_thread(save_chat_error, session_id, user_message, str(e))
+        payload, status_code = chat_error_payload(str(e))
+        response = JSONResponse(payload, status_code=status_code)
+
+    save_session(response, new_session)
+    return response
+
+
+@endpoint('chat_stream', '/chat/stream')
+async def chat_stream(request: Request):
+    """/chat/stream with the reply streamed from the LLM's async iterator"""
+    user_message = (await read_json(request)).get('message', '')
+    if not user_message:
+        return JSONResponse({'error': 'No message provided'}, status_code=400)
+    if not app_backend.llm or not app_backend.llm_with_tools:
+        return JSONResponse(LLM_NOT_CONFIGURED_PAYLOAD, status_code=503)
+
+    session_id, new_session = chat_session(request)
+    request.state.session_id = session_id
+    request_session_id.set(session_id)
+    try:
+        messages, context_stats = await asyncio.to_thread(prepare_chat, session_id, user_message)
+    except Exception as e:
+        logger.exception("❌ Error preparing chat stream: %s", e)
+        await asyncio.to_thread(save_chat_error, session_id, user_message, str(e))
+        payload, status_code = chat_error_payload(str(e))
+        response = JSONResponse(payload, status_code=status_code)
+        save_session(response, new_session)
+        return response
+    # Headers go out before the LLM runs, so the full timing travels in the done event
+    trace = current_trace()
+
+    async def event_stream():
+        # The body is sent from another task, which needs the session and trace again
+        request_session_id.set(session_id)
+        with activate(trace):
+            ai_response = None
+            try:
+                logger.info("💬 Streaming a response to a %d character message", len(user_message),
+                            extra={'session_id': session_id})
+                logger.debug("User message: %s", user_message)
+
+                with span('llm'), LLM_REQUEST_SECONDS.time(operation='chat_stream', outcome='success'):
+                    async for chunk in app_backend.llm_with_tools.astream(messages):
+                        ai_response = chunk if ai_response is None else ai_response + chunk
+                        if isinstance(chunk.content, str) and chunk.content:
+                            yield sse_event('token', {'text': chunk.content})
+
+                if ai_response is None:
+                    ai_response = AIMessage(content='')
+                payload, _ = await asyncio.to_thread(finish_chat, 'chat_stream', session_id, user_message,
+                                                     ai_response, context_stats)
+                if trace is not None:
+                    payload['server_timing'] = trace.server_timing()
+                yield sse_event('done', payload)
+
+            except Exception as e:
+                error_msg = str(e)
+                logger.exception("❌ Error in chat stream: %s", e, extra={'session_id': session_id})
+                await asyncio.to_thread(save_chat_error, session_id, user_message, error_msg)
+                payload, _ = chat_error_payload(error_msg)
+                yield sse_event('error', payload)
+
+    response = StreamingResponse(event_stream(), media_type='text/event-stream', headers=SSE_HEADERS)
+    save_session(response, new_session)
+    return response
+
+
+@endpoint('compile_resume', '/compile_resume')
+async def compile_resume(request: Request):
+    """/compile_resume awaiting the compile job instead of blocking a thread on it"""
+    try:
+        session_id = load_session(request).get('conversation_id')
+        request.state.session_id = session_id
+        latex_code = await asyncio.to_thread(read_session_source, session_id)
+
+        if latex_code is None:
+            return JSONResponse(SOURCE_NOT_FOUND_PAYLOAD, status_code=404)
+
+        try:
+            job = compile_scheduler.submit(latex_code, session_id)
+        except QueueFullError as e:
+            return JSONResponse(compile_busy_payload(e), status_code=429, headers={'Retry-After': str(e.retry_after)})
+
+        result = compile_job_result(job, await job.wait_async(COMPILE_WAIT_TIMEOUT))
+        payload, status_code = compile_response_payload(result)
+        return JSONResponse(payload, status_code=status_code)
+
+    except Exception as e:
+        return JSONResponse(compile_error_payload(e), status_code=500)
+
+
+@endpoint('job_events', '/jobs/<job_id>/events')
+async def job_events(request: Request):
+    """Server-Sent Events stream that fires 'completed' once the compile job finishes"""
+    job = compile_scheduler.get_job(request.path_params['job_id'])
+    if not job:
+        return JSONResponse({'error': 'Job not found', 'status': 'error'}, status_code=404)
+
+    async def event_stream():
+        yield sse_event('status', job.to_dict())
+
+        current = job
+        while True:
+            # Wake up regularly so proxies don't drop an idle connection
+            if not await current.wait_until_finished_async(SSE_KEEPALIVE_SECONDS):
+                yield ": keepalive\n\n"
+                continue
+            if current.superseded_by is not None:
+                # A newer compile for this session took over; follow it
+                current = current.superseded_by
+                yield sse_event('status', current.to_dict())
+                continue
+            yield sse_event('completed', current.to_dict())
+            return
+
+    return StreamingResponse(event_stream(), media_type='text/event-stream', headers=SSE_HEADERS)
+
+
+app = Starlette(routes=[
+    Route('/chat', chat, methods=['POST']),
+    Route('/chat/stream', chat_stream, methods=['POST']),
+    Route('/compile_resume', compile_resume, methods=['POST']),
+    Route('/jobs/{job_id}/events', job_events, methods=['GET']),
+    # Everything else is served by the Flask app
+    Mount('/', app=WSGIMiddleware(flask_app, workers=ASGI_WSGI_THREADS)),
+])
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🚀 Starting AI Resume Builder (async mode)")
+    print("\n🌐 Open your browser and go to: http://localhost:5001")
+    print("Press Ctrl+C to stop the server\n")
+    uvicorn.run(app, host='0.0.0.0', port=5001)
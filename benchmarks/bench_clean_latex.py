@@ -0,0 +1,116 @@
+"""Microbenchmark for clean_latex_code over 10 KB - 1 MB inputs.
+
+Run from the repository root:
+
+    python benchmarks/bench_clean_latex.py
+
+Prints the time per call and per KB for each input size, for the current
+implementation and the previous split/replace/re.sub one, on two bodies:
+"typical" repeats a rendered resume, "dense" packs every construct the
+cleanup rewrites into a few hundred bytes. A flat us/KB column means the
+cost grows linearly with the input.
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latex_cleanup import clean_latex_code  # noqa: E402
+from resume_data import normalize_resume_data  # noqa: E402
+from resume_template import RESUME_PREAMBLE, render_resume  # noqa: E402
+
+SIZES_KB = [10, 100, 1000]
+
+SAMPLE_RESUME = normalize_resume_data({
+    'header': {'name': 'Jane Doe', 'email': 'jane@example.com', 'github': 'https://github.com/jane'},
+    'summary': 'Backend engineer focused on latency and reliability.',
+    'skills': [{'category': 'Languages', 'items': ['Python', 'Go', 'SQL']}],
+    'experience': [{'title': 'Senior Engineer', 'company': 'Acme', 'location': 'Remote', 'dates': '2021 -- 2024',
+                    'bullets': ['Cut p99 latency by 40%', 'Led the storage migration', 'Mentored four engineers']}],
+    'projects': [{'name': 'Tracer', 'technologies': 'Rust', 'date': '2023', 'bullets': ['Sampling profiler']}],
+    'education': [{'institution': 'State University', 'degree': 'BS Computer Science', 'dates': '2017'}],
+})
+_rendered = render_resume(SAMPLE_RESUME)
+TYPICAL_CHUNK = (_rendered[_rendered.index('\\begin{document}') + len('\\begin{document}'):_rendered.index('\\end{document}')]
+                 + "\\href{[LINKEDIN_URL]}{[LINKEDIN_DISPLAY]}\n")
+
+# Everything the cleanup touches: placeholders, empty items and five-argument subheadings
+DENSE_CHUNK = (
+    "\\section{Experience}\\resumeSubHeadingListStart"
+    "\\resumeSubheading{Engineer}{2020 -- 2024}{Company}{City}{extra}"
+    "\\resumeItemListStart\\resumeItem{Built [USER_GITHUB_URL] tooling}\\resumeItem{ }"
+    "\\resumeItem{Cut latency by 40\\%}\\resumeItemListEnd\\resumeSubHeadingListEnd\n"
+    "\\href{[LINKEDIN_URL]}{\\underline{[LINKEDIN_DISPLAY]}} plain text between sections\n"
+)
+
+
+def legacy_clean_latex_code(raw_latex: str) -> str:
+    """The previous implementation, kept for comparison"""
+    lines = raw_latex.split('\n')
+    latex_start_idx = -1
+    for i, line in enumerate(lines):
+        if line.strip().startswith('\\documentclass'):
+            latex_start_idx = i
+            break
+    if latex_start_idx == -1:
+        return raw_latex
+    cleaned_latex = '\n'.join(lines[latex_start_idx:])
+    if '\\end{document}' in cleaned_latex:
+        end_doc_pos = cleaned_latex.find('\\end{document}') + len('\\end{document}')
+        cleaned_latex = cleaned_latex[:end_doc_pos]
+    replacements = {
+        '[LINKEDIN_URL]': 'https://linkedin.com/in/yourprofile',
+        '[LINKEDIN_DISPLAY]': 'yourprofile',
+        '[GITHUB_URL]': 'https://github.com/yourprofile',
+        '[GITHUB_DISPLAY]': 'yourprofile',
+        '[USER_LINKEDIN_URL]': 'https://linkedin.com/in/yourprofile',
+        '[USER_LINKEDIN_DISPLAY]': 'yourprofile',
+        '[USER_GITHUB_URL]': 'https://github.com/yourprofile',
+        '[USER_GITHUB_DISPLAY]': 'yourprofile',
+    }
+    for placeholder, replacement in replacements.items():
+        cleaned_latex = cleaned_latex.replace(placeholder, replacement)
+    cleaned_latex = re.sub(r'\\resumeItem\{\s*\}', '', cleaned_latex)
+    cleaned_latex = re.sub(r'\\resumeItem\{\s+\}', '', cleaned_latex)
+    cleaned_latex = re.sub(
+        r'(\\resumeSubheading\s*\{[^}]+\}\s*\{[^}]+\}\s*\{[^}]+\}\s*\{[^}]+\})\s*\{[^}]*\}',
+        r'\1',
+        cleaned_latex
+    )
+    return cleaned_latex
+
+
+def make_input(size_kb: int, chunk: str) -> str:
+    head = "Here is your resume:\n```latex\n" + RESUME_PREAMBLE + "\\begin{document}\n"
+    tail = "\\end{document}\n```\nLet me know if you want changes."
+    repeats = max(1, (size_kb * 1024 - len(head) - len(tail)) // len(chunk))
+    return head + chunk * repeats + tail
+
+
+def time_call(function, text: str) -> float:
+    """Best per-call time in seconds"""
+    number = max(1, 200 // max(1, len(text) // 10240))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return min(timeit.repeat(lambda: function(text), number=number, repeat=5)) / number
+
+
+def main():
+    print(f"{'body':>8} {'input':>8} {'new (ms)':>10} {'new us/KB':>10} {'old (ms)':>10} {'old us/KB':>10} {'speedup':>8}")
+    for body, chunk in (('typical', TYPICAL_CHUNK), ('dense', DENSE_CHUNK)):
+        for size_kb in SIZES_KB:
+            text = make_input(size_kb, chunk)
+            with contextlib.redirect_stdout(io.StringIO()):
+                assert clean_latex_code(text) == legacy_clean_latex_code(text), "outputs differ"
+            kb = len(text) / 1024
+            new = time_call(clean_latex_code, text)
+            old = time_call(legacy_clean_latex_code, text)
+            print(f"{body:>8} {kb:>6.0f}KB {new * 1e3:>10.3f} {new * 1e6 / kb:>10.2f} "
+                  f"{old * 1e3:>10.3f} {old * 1e6 / kb:>10.2f} {old / new:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
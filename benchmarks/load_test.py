@@ -0,0 +1,240 @@
+"""End-to-end load test for /chat, /compile_resume and /list_conversations.
+
+Run from the repository root:
+
+    python benchmarks/load_test.py --concurrency 8 --requests 200
+
+Without --url the app is started in-process with the offline fake LLM
+(LLM_PROVIDER=fake, see fake_llm.py), so no network or API key is needed;
+FAKE_LLM_LATENCY_MS sets the simulated model latency. --asgi serves it
+with uvicorn in the async mode (asgi_app.py) instead of the threaded WSGI
+server. With --url an already running server is driven instead.
+
+Every worker thread is one user with its own session cookie. Each user
+first sends one chat message so it has a resume to compile, then every
+endpoint is driven in turn at the given concurrency. Throughput and
+p50/p95/p99 latencies are printed and saved as JSON (benchmarks/results/
+by default); --compare prints the change against an earlier results file.
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+ENDPOINTS = ['chat', 'compile_resume', 'list_conversations']
+
+
+class Client:
+    """One simulated user: a cookie jar (so its own session) and JSON requests"""
+
+    def __init__(self, base_url: str, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+
+    def request(self, method: str, path: str, payload=None) -> int:
+        data = json.dumps(payload).encode('utf-8') if payload is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json'} if data else {})
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+
+def endpoint_call(endpoint: str, client: Client, number: int, same_message: bool) -> int:
+    if endpoint == 'chat':
+        message = "Update my resume with a new project" if same_message else \
+            f"Update my resume: add project number {number} to the projects section"
+        return client.request('POST', '/chat', {'message': message})
+    if endpoint == 'compile_resume':
+        return client.request('POST', '/compile_resume', {})
+    if endpoint == 'list_conversations':
+        return client.request('GET', '/list_conversations')
+    raise ValueError(f"unknown endpoint {endpoint}")
+
+
+def percentile(sorted_values: list, p: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def run_endpoint(endpoint: str, clients: list, total: int, same_message: bool) -> dict:
+    """Send total requests to endpoint, spread over the clients running in parallel"""
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker(client):
+        while True:
+            with lock:
+                number = next(counter, None)
+            if number is None:
+                return
+            started = time.perf_counter()
+            try:
+                status = endpoint_call(endpoint, client, number, same_message)
+            except Exception as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = sum(count for status, count in statuses.items() if status.isdigit() and int(status) < 400)
+    return {
+        'requests': len(latencies),
+        'ok': ok,
+        'errors': len(latencies) - ok,
+        'statuses': statuses,
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else 0.0,
+    }
+
+
+def start_local_server(asgi: bool = False) -> str:
+    """Serve the app on a free local port with the fake LLM; returns its URL"""
+    os.environ.setdefault('LLM_PROVIDER', 'fake')
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    sys.path.insert(0, ROOT)
+    if asgi:
+        import uvicorn
+        import asgi_app
+
+        sock = socket.socket()
+        sock.bind(('127.0.0.1', 0))
+        server = uvicorn.Server(uvicorn.Config(asgi_app.app, log_level='warning', backlog=4096))
+        threading.Thread(target=server.run, kwargs={'sockets': [sock]}, name='load-test-server', daemon=True).start()
+        while not server.started:
+            time.sleep(0.05)
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+    from werkzeug.serving import make_server
+    import app_backend
+
+    server = make_server('127.0.0.1', 0, app_backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, name='load-test-server', daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def print_results(results: dict):
+    print(f"{'endpoint':>20} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for endpoint, stats in results.items():
+        print(f"{endpoint:>20} {stats['requests']:>6} {stats['errors']:>6} {stats['throughput_rps']:>8.2f} "
+              f"{stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} {stats['p99_ms']:>9.2f} {stats['max_ms']:>9.2f}")
+
+
+def print_comparison(previous: dict, current: dict):
+    print(f"\nChange against {previous.get('timestamp', '?')} ({previous.get('git_commit') or 'unknown commit'}):")
+    print(f"{'endpoint':>20} {'rps':>18} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+    for endpoint, stats in current['results'].items():
+        old = previous.get('results', {}).get(endpoint)
+        if not old:
+            continue
+        cells = []
+        for field in ('throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            change = (stats[field] - old[field]) / old[field] * 100 if old[field] else 0.0
+            cells.append(f"{old[field]:.1f}->{stats[field]:.1f} ({change:+.0f}%)")
+        print(f"{endpoint:>20} " + ' '.join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', help="server to test (default: start the app in-process with the fake LLM)")
+    parser.add_argument('--asgi', action='store_true', help="serve the in-process app in the async mode (needs uvicorn)")
+    parser.add_argument('--concurrency', type=int, default=8, help="parallel users (default 8)")
+    parser.add_argument('--requests', type=int, default=200, help="requests per endpoint (default 200)")
+    parser.add_argument('--endpoints', default=','.join(ENDPOINTS), help="comma-separated subset of " + ', '.join(ENDPOINTS))
+    parser.add_argument('--same-message', action='store_true',
+                        help="send one fixed chat message, so generated documents repeat and hit the compile cache")
+    parser.add_argument('--timeout', type=float, default=180, help="per-request timeout in seconds")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/load-<timestamp>.json)")
+    parser.add_argument('--compare', help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    endpoints = [name.strip() for name in args.endpoints.split(',') if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    base_url = args.url or start_local_server(args.asgi)
+    clients = [Client(base_url, args.timeout) for _ in range(args.concurrency)]
+    print(f"🔥 Warming up {len(clients)} sessions against {base_url}")
+    for number, client in enumerate(clients):
+        endpoint_call('chat', client, number, args.same_message)
+
+    results = {}
+    for endpoint in endpoints:
+        print(f"🚀 /{endpoint}: {args.requests} requests at concurrency {args.concurrency}")
+        results[endpoint] = run_endpoint(endpoint, clients, args.requests, args.same_message)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'git_commit': git_commit(),
+        'python': platform.python_version(),
+        'config': {
+            'target': args.url or ('in-process asgi' if args.asgi else 'in-process'),
+            'llm_provider': os.getenv('LLM_PROVIDER', ''),
+            'fake_llm_latency_ms': float(os.getenv('FAKE_LLM_LATENCY_MS', '200')) if not args.url else None,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'same_message': args.same_message,
+        },
+        'results': results,
+    }
+
+    print()
+    print_results(results)
+    output = args.output or os.path.join(RESULTS_DIR, f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Results saved to {output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            print_comparison(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
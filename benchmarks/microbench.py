@@ -0,0 +1,332 @@
+"""Microbenchmarks for the backend's pure-Python hot paths, with a baseline check.
+
+Run from the repository root:
+
+    python benchmarks/microbench.py                  # compare against benchmarks/baseline.json
+    python benchmarks/microbench.py --save-baseline  # record a new baseline on this machine
+                                                     # (also --update-baseline; do this on a first run)
+    python benchmarks/microbench.py --full           # also list_conversations with 1M sessions
+
+Needs neither network nor TeX: the app is imported with the fake LLM and a
+throwaway workspace directory. Each case reports the median per-call time
+over several repeats (the spread between the best and the median repeat
+shows how stable it was) and the peak memory of one call, measured
+separately with tracemalloc. A case whose median is slower, or whose peak
+memory is larger, than the baseline by more than --threshold is measured
+again (--confirm times); only a case that regresses on every run is
+reported, and then the exit status is 1.
+
+Timings only compare within one machine. Every repeat of a case is timed
+right after a fixed calibration loop, and cases are compared by their
+median ratio to it, which absorbs a uniformly faster or slower host and
+drift in CPU speed during a run (the baseline column shows the baseline's
+time at the current speed). When the baseline was recorded on another
+machine or Python version, time changes are only reported and memory alone
+can fail the run: record a baseline with --update-baseline on the first
+run on a machine before relying on the exit status.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(ROOT, 'benchmarks', 'baseline.json')
+
+# The app must not reach for the network, TeX or the real workspace
+os.environ['LLM_PROVIDER'] = 'fake'
+os.environ.setdefault('LOG_LEVEL', 'ERROR')
+os.environ['LATEX_PRECOMPILED_FORMAT'] = '0'
+os.environ['CONVERSATION_STORE'] = 'memory'
+os.environ['NITI_WORKSPACE_DIR'] = tempfile.mkdtemp(prefix='niti_microbench_')
+sys.path.insert(0, ROOT)
+
+import app_backend  # noqa: E402
+from context_builder import build_context  # noqa: E402
+from conversation_store import InMemoryConversationStore, DEFAULT_PAGE_SIZE  # noqa: E402
+from latex_cleanup import clean_latex_code, extract_latex_from_response  # noqa: E402
+from prompt_registry import prompts  # noqa: E402
+from resume_data import normalize_resume_data  # noqa: E402
+from resume_template import render_resume  # noqa: E402
+
+MAX_MESSAGES = 100
+REPEATS = 11
+MIN_REPEAT_SECONDS = 0.2
+CALIBRATION_SECONDS = 0.05
+
+RESUME = render_resume(normalize_resume_data({
+    'header': {'name': 'Jane Doe', 'email': 'jane@example.com', 'github': 'https://github.com/jane'},
+    'summary': 'Backend engineer focused on latency and reliability.',
+    'skills': [{'category': 'Languages', 'items': ['Python', 'Go', 'SQL']}],
+    'experience': [{'title': 'Senior Engineer', 'company': 'Acme', 'location': 'Remote', 'dates': '2021 -- 2024',
+                    'bullets': ['Cut p99 latency by 40%', 'Led the storage migration', 'Mentored four engineers']}],
+    'projects': [{'name': 'Tracer', 'technologies': 'Rust', 'date': '2023', 'bullets': ['Sampling profiler']}],
+    'education': [{'institution': 'State University', 'degree': 'BS Computer Science', 'dates': '2017'}],
+}))
+REPLY = f"Here is your updated resume:\n```latex\n{RESUME}\n```\nLet me know if you want any changes."
+
+
+def message(kind: str, content: str) -> dict:
+    return {'type': kind, 'content': content, 'timestamp': '2025-01-01T00:00:00', 'original_length': len(content)}
+
+
+def chat_history(count: int) -> list:
+    """Alternating turns; every fourth AI reply carries a full LaTeX draft"""
+    history = []
+    for i in range(count // 2):
+        history.append(message('human', f"Please add bullet {i} about the migration project and tighten the summary."))
+        history.append(message('ai', REPLY if i % 4 == 0 else f"Done, I added bullet {i} and shortened the summary."))
+    return history
+
+
+# Each builder returns (function to time, description); setup happens in the builder
+
+def bench_clean_typical():
+    return lambda: clean_latex_code(REPLY), f"rendered resume in a chat reply ({len(REPLY) // 1024} KB)"
+
+
+def bench_clean_adversarial_brackets():
+    text = "\\documentclass{article}\\begin{document}" + "[LINKEDIN_" * 20000 + "\\end{document}"
+    return lambda: clean_latex_code(text), f"unterminated placeholder prefixes ({len(text) // 1024} KB)"
+
+
+def bench_clean_adversarial_subheadings():
+    # Four-argument prefixes that never get their fifth argument: worst case for the subheading pattern
+    text = "\\documentclass{article}\\begin{document}" + "\\resumeSubheading{a}{b}{c}{d" * 5000 + "\\end{document}"
+    return lambda: clean_latex_code(text), f"unclosed subheading arguments ({len(text) // 1024} KB)"
+
+
+def bench_clean_no_document():
+    text = "No LaTeX in this reply, only prose. " * 30000
+    return lambda: clean_latex_code(text), f"1 MB without \\documentclass"
+
+
+def bench_save_message_at_cap():
+    session_id = 'bench-save'
+    app_backend.conversation_store.append_messages(session_id, chat_history(MAX_MESSAGES), MAX_MESSAGES)
+    human = "Please add a bullet about the billing service and its 2M daily requests."
+    ai = "Done, I added the billing service bullet under Acme."
+    return (lambda: app_backend.save_conversation_message(session_id, human, ai),
+            f"text turn into a full {MAX_MESSAGES}-message conversation (trims 2)")
+
+
+def bench_get_memory():
+    session_id = 'bench-memory'
+    app_backend.conversation_store.append_messages(session_id, chat_history(MAX_MESSAGES), MAX_MESSAGES)
+    return lambda: app_backend.get_or_create_conversation_memory(session_id), f"{MAX_MESSAGES} stored messages"
+
+
+def make_list_bench(sessions: int):
+    def bench():
+        store = InMemoryConversationStore(max_sessions=sessions + 1)
+        rng = random.Random(sessions)
+        for i in range(sessions):
+            store.append_messages(f"s{i}", [message('human', 'hi')], MAX_MESSAGES, title=f"Conversation {i}")
+            # Spread last_updated so the order isn't insertion order
+            store._sessions[f"s{i}"]['metadata']['last_updated'] = f"2025-01-{rng.randint(1, 28):02d}T{i % 24:02d}:00:00"
+            store._recent.update(f"s{i}", store._sessions[f"s{i}"]['metadata']['last_updated'])
+        first_page, cursor = store.list_recent(DEFAULT_PAGE_SIZE)
+
+        def run():
+            store.list_recent(DEFAULT_PAGE_SIZE)
+            store.list_recent(DEFAULT_PAGE_SIZE, cursor)
+            store.count()
+        return run, f"first and second page of {sessions:,} sessions"
+    return bench
+
+
+def bench_history_conversion():
+    history = chat_history(MAX_MESSAGES)
+    return (lambda: build_context(prompts.get('chat').message, history, "Shorten the summary.", RESUME),
+            f"{MAX_MESSAGES}-message history to LangChain messages")
+
+
+def bench_extract_typical():
+    return lambda: extract_latex_from_response(REPLY), "fenced resume in a chat reply"
+
+
+def bench_extract_unterminated():
+    text = "Here you go:\n\\documentclass{article}\n" + "\\item a line of resume text\n" * 20000
+    return lambda: extract_latex_from_response(text), f"no \\end{{document}} ({len(text) // 1024} KB)"
+
+
+CASES = [
+    ('clean_latex_code/typical', bench_clean_typical),
+    ('clean_latex_code/brackets', bench_clean_adversarial_brackets),
+    ('clean_latex_code/subheadings', bench_clean_adversarial_subheadings),
+    ('clean_latex_code/no_document', bench_clean_no_document),
+    ('save_conversation_message/at_cap', bench_save_message_at_cap),
+    ('get_or_create_conversation_memory', bench_get_memory),
+    ('list_conversations/10k', make_list_bench(10_000)),
+    ('list_conversations/100k', make_list_bench(100_000)),
+    ('history_conversion/100_messages', bench_history_conversion),
+    ('extract_latex/typical', bench_extract_typical),
+    ('extract_latex/unterminated', bench_extract_unterminated),
+]
+FULL_CASES = [
+    ('list_conversations/1m', make_list_bench(1_000_000)),
+]
+
+
+def _calibration_loop():
+    """A fixed pure-Python workload, the yardstick for this host's current speed"""
+    counts = {}
+    for i in range(2000):
+        word = f"item{i % 97}"
+        counts[word] = counts.get(word, 0) + len(word.upper())
+    return sorted(counts.items())
+
+
+def _timer(function, seconds: float) -> tuple:
+    """(timeit.Timer, calls per repeat) so one repeat takes about seconds"""
+    function()  # warm caches and lazy imports
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    # autorange stops at 0.2s; scale so each repeat is long enough to be stable
+    elapsed = timer.timeit(number)
+    return timer, max(1, int(number * seconds / elapsed)) if elapsed else number
+
+
+def measure(function) -> dict:
+    """Best and median per-call time over REPEATS repeats, the peak bytes of one call, and the
+    median ratio to the calibration loop, which is timed right before each repeat so both see
+    the same CPU speed"""
+    timer, number = _timer(function, MIN_REPEAT_SECONDS)
+    calibration, calibration_number = _timer(_calibration_loop, CALIBRATION_SECONDS)
+    times, calibrations, ratios = [], [], []
+    for _ in range(REPEATS):
+        calibrations.append(calibration.timeit(calibration_number) / calibration_number)
+        times.append(timer.timeit(number) / number)
+        ratios.append(times[-1] / calibrations[-1])
+    times.sort()
+    calibrations.sort()
+    ratios.sort()
+
+    gc.collect()
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    middle = REPEATS // 2
+    return {'time_us': round(times[0] * 1e6, 3), 'median_us': round(times[middle] * 1e6, 3),
+            'peak_kb': round(peak / 1024, 1), 'calibration_us': round(calibrations[middle] * 1e6, 3),
+            'ratio': round(ratios[middle], 6)}
+
+
+def host() -> dict:
+    return {
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPUs)",
+    }
+
+
+def expected_us(result: dict, old: dict) -> float:
+    """The baseline entry's time at the CPU speed result was measured at"""
+    if result.get('ratio') and old.get('ratio'):
+        return old['ratio'] * result['calibration_us']
+    return old.get('median_us') or old['time_us']
+
+
+def changes(result: dict, old: dict) -> tuple:
+    """Relative (time, memory) change against a baseline entry. Time compares median ratios to
+    the calibration loop (medians, which a single lucky or unlucky repeat can't move the way it
+    moves the best time), or plain medians for a baseline recorded without them"""
+    if result.get('ratio') and old.get('ratio'):
+        change = result['ratio'] / old['ratio'] - 1
+    else:
+        old_time = expected_us(result, old)
+        change = (result['median_us'] - old_time) / old_time if old_time else 0.0
+    memory_change = (result['peak_kb'] - old['peak_kb']) / old['peak_kb'] if old['peak_kb'] else 0.0
+    return change, memory_change
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="baseline file (default benchmarks/baseline.json)")
+    parser.add_argument('--save-baseline', '--update-baseline', action='store_true',
+                        help="write the results as the new baseline (needed once per machine)")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="relative slowdown or memory growth flagged as a regression (default 0.25)")
+    parser.add_argument('--confirm', type=int, default=2,
+                        help="reruns of a case that looks regressed before it is reported (default 2)")
+    parser.add_argument('--full', action='store_true', help="include list_conversations with 1M sessions (slow, ~1 GB)")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this text")
+    parser.add_argument('--output', help="also write the results as JSON to this file")
+    args = parser.parse_args()
+
+    baseline = {}
+    baseline_report = {}
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline_report = json.load(f)
+        baseline = baseline_report.get('results', {})
+    other_host = bool(baseline) and any(baseline_report.get(key) != value for key, value in host().items())
+    if other_host:
+        print(f"⚠️ The baseline is from {baseline_report.get('machine')}, Python {baseline_report.get('python')}; "
+              f"time changes are informational here. Run with --update-baseline to gate on this machine.")
+
+    results = {}
+    regressions = []
+    print(f"{'case':<36} {'median us':>11} {'spread':>7} {'peak KB':>9} {'baseline':>11} {'change':>8}")
+    for name, builder in CASES + (FULL_CASES if args.full else []):
+        if args.filter not in name:
+            continue
+        function, description = builder()
+        result = measure(function)
+        old = baseline.get(name)
+        reruns = 0
+        if old:
+            change, memory_change = changes(result, old)
+            # A slow run can be machine noise; only a case that stays slow on every rerun counts
+            while (change > args.threshold or memory_change > args.threshold) and reruns < args.confirm:
+                reruns += 1
+                rerun = measure(function)
+                # Keep the fastest run relative to its calibration, and the smallest peak of any run
+                peak_kb = min(result['peak_kb'], rerun['peak_kb'])
+                if changes(rerun, old)[0] < change:
+                    result = rerun
+                result['peak_kb'] = peak_kb
+                change, memory_change = changes(result, old)
+        result['description'] = description
+        results[name] = result
+
+        spread = (result['median_us'] - result['time_us']) / result['time_us'] * 100 if result['time_us'] else 0.0
+        line = f"{name:<36} {result['median_us']:>11.2f} {spread:>6.1f}% {result['peak_kb']:>9.1f}"
+        if old:
+            flag = ''
+            time_regressed = change > args.threshold and not other_host
+            if time_regressed or memory_change > args.threshold:
+                regressions.append(name)
+                flag = '  ⚠️ REGRESSION' + (' (memory)' if memory_change > args.threshold else '')
+                flag += f" on {reruns + 1} runs" if reruns else ''
+            elif change > args.threshold:
+                flag = "  (slower, other host)"
+            elif reruns:
+                flag = f"  (within threshold on rerun {reruns})"
+            line += f" {expected_us(result, old):>11.2f} {change * 100:>+7.1f}%{flag}"
+        print(line)
+
+    report = dict(host(), results=results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Baseline saved to {args.baseline}")
+    elif not baseline:
+        print(f"\nℹ️ No baseline at {args.baseline}; run with --update-baseline to record one")
+
+    if regressions:
+        print(f"\n⚠️ {len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
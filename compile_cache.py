@@ -0,0 +1,152 @@
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+
+# Content-addressed store of compiled PDFs. The key is a hash of the
+# normalized LaTeX source plus the compiler version, so re-compiling an
+# unchanged document (refresh clicks, identical LLM output) is a file copy
+# instead of a pdflatex run.
+
+PDF_CACHE_DIR = os.getenv('PDF_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'niti_ai_pdf_cache')
+PDF_CACHE_MAX_BYTES = int(float(os.getenv('PDF_CACHE_MAX_MB', '200')) * 1024 * 1024)
+PDF_CACHE_MAX_ENTRIES = int(os.getenv('PDF_CACHE_MAX_ENTRIES', '500'))
+
+_TRAILING_WHITESPACE = re.compile(r'[ \t]+$', re.MULTILINE)
+
+
+def normalize_latex_source(latex_code: str) -> str:
+    """Drop differences TeX itself ignores: line endings and trailing spaces"""
+    normalized = latex_code.replace('\r\n', '\n').replace('\r', '\n')
+    normalized = _TRAILING_WHITESPACE.sub('', normalized)
+    return normalized.strip('\n')
+
+
+class PDFCompileCache:
+    """On-disk PDF cache with LRU eviction by total size and entry count"""
+
+    def __init__(self, root: str = PDF_CACHE_DIR, max_bytes: int = PDF_CACHE_MAX_BYTES,
+                 max_entries: int = PDF_CACHE_MAX_ENTRIES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> size in bytes, least recently used first
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.root, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self):
+        """Rebuild the LRU order from file mtimes left by a previous process"""
+        entries = []
+        for name in os.listdir(self.root):
+            if not name.endswith('.pdf'):
+                continue
+            path = os.path.join(self.root, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, name[:-len('.pdf')], stat.st_size))
+
+        for _, key, size in sorted(entries):
+            self._entries[key] = size
+            self._total_bytes += size
+        self._evict()
+
+    @staticmethod
+    def key_for(latex_code: str, compiler_version: str) -> str:
+        digest = hashlib.sha256()
+        digest.update(compiler_version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(normalize_latex_source(latex_code).encode('utf-8'))
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.root, f"{key}.pdf")
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached PDF path for key, or None on a miss"""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+
+            path = self.path_for(key)
+            if not os.path.exists(path):
+                # Removed behind our back; treat as a miss
+                self._total_bytes -= self._entries.pop(key)
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+        try:
+            # Persist recency so the LRU order survives restarts
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def lost(self, key: str):
+        """Count a hit whose file was evicted before the caller could use it as a miss"""
+        with self._lock:
+            self.hits -= 1
+            self.misses += 1
+            if key in self._entries and not os.path.exists(self.path_for(key)):
+                self._total_bytes -= self._entries.pop(key)
+
+    def put(self, key: str, pdf_file: str) -> str:
+        """Copy a freshly compiled PDF into the cache"""
+        path = self.path_for(key)
+        tmp_file = f"{path}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(pdf_file, tmp_file)
+        os.replace(tmp_file, path)
+        size = os.path.getsize(path)
+
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._entries.pop(key)
+            self._entries[key] = size
+            self._total_bytes += size
+            self._evict()
+        return path
+
+    def _evict(self):
+        """Drop least recently used entries until both limits hold (lock held)"""
+        while self._entries and (self._total_bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            key, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self.path_for(key))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'entries': len(self._entries),
+                'size_bytes': self._total_bytes,
+                'max_bytes': self.max_bytes,
+                'max_entries': self.max_entries
+            }
+
+
+pdf_cache = PDFCompileCache()
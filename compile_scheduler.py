@@ -0,0 +1,357 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from metrics import COMPILE_SECONDS, COMPILE_WAIT_SECONDS, compile_outcome
+from tracing import SERVER_TIMING_ENABLED, Trace, activate
+
+
+logger = logging.getLogger(__name__)
+
+# Bounded pdflatex worker pool. Requests hand their compile to a fixed set of
+# worker threads through a bounded queue instead of spawning TeX inline, so a
+# burst of users can't start an unbounded number of TeX processes. A newer
+# compile for the same session replaces one that is still waiting, and a full
+# queue is reported to the caller (HTTP 429) instead of piling up.
+# A failed compile that asks for an LLM repair is handed to a separate small
+# repair pool, so a slow network call never holds a pdflatex worker; the
+# repaired source is queued as a new job that supersedes the failed one.
+
+COMPILE_WORKERS = int(os.getenv('COMPILE_WORKERS', '0')) or (os.cpu_count() or 2)
+COMPILE_QUEUE_SIZE = int(os.getenv('COMPILE_QUEUE_SIZE', '0')) or COMPILE_WORKERS * 4
+JOB_HISTORY_SIZE = int(os.getenv('COMPILE_JOB_HISTORY', '1000'))
+COMPILE_REPAIR_WORKERS = int(os.getenv('COMPILE_REPAIR_WORKERS', '2'))
+
+# Result fields that are safe to hand back to the browser
+PUBLIC_RESULT_FIELDS = ['success', 'message', 'pdf_generated', 'artifact_id', 'cache_hit', 'compilation_error']
+
+
+class QueueFullError(Exception):
+    """Raised by submit() when the compile queue is at capacity"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Compile queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class CompileJob:
+    """A single queued compile and, once finished, its result"""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    REPAIRING = 'repairing'
+    DONE = 'done'
+    SUPERSEDED = 'superseded'
+
+    def __init__(self, session_id: Optional[str], latex_code: str, options: Optional[dict] = None):
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.latex_code = latex_code
+        # Extra keyword arguments for the compile function
+        self.options = dict(options or {})
+        self.status = self.QUEUED
+        self.result = None
+        self.superseded_by = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Queue wait, pdflatex and cleanup spans, for Server-Timing
+        self.trace = Trace('compile') if SERVER_TIMING_ENABLED else None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._callback_lock = threading.Lock()
+
+    def wait(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """Block until the job (or the newer job that replaced it) finishes"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not job._done.wait(remaining):
+                return None
+            if job.status != self.SUPERSEDED:
+                return job.result
+            job = job.superseded_by
+
+    def latest(self) -> 'CompileJob':
+        """The job that replaced this one, if any, else this job"""
+        job = self
+        while job.superseded_by is not None:
+            job = job.superseded_by
+        return job
+
+    def wait_until_finished(self, timeout: Optional[float] = None) -> bool:
+        """Wait for this job alone (not its replacement); True once it has finished"""
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, callback: Callable[[], None]):
+        """Call callback() once this job finishes (from the finishing thread), or right away if it has"""
+        with self._callback_lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_done_callback(self, callback: Callable[[], None]):
+        """Forget a callback registered with add_done_callback() that hasn't run yet"""
+        with self._callback_lock:
+            try:
+                self._callbacks.remove(callback)
+            except ValueError:
+                pass
+
+    async def wait_until_finished_async(self, timeout: Optional[float] = None) -> bool:
+        """wait_until_finished() for asyncio code: suspends the task instead of blocking a thread"""
+        if self._done.is_set():
+            return True
+        loop = asyncio.get_running_loop()
+        finished = asyncio.Event()
+
+        def wake():
+            if not loop.is_closed():
+                loop.call_soon_threadsafe(finished.set)
+
+        self.add_done_callback(wake)
+        try:
+            await asyncio.wait_for(finished.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            # After a timeout or a cancelled wait (the client went away) the
+            # callback would otherwise stay on the job until it finishes
+            if not finished.is_set():
+                self.remove_done_callback(wake)
+
+    async def wait_async(self, timeout: Optional[float] = None) -> Optional[dict]:
+        """wait() for asyncio code"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        job = self
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not await job.wait_until_finished_async(remaining):
+                return None
+            if job.status != self.SUPERSEDED:
+                return job.result
+            job = job.superseded_by
+
+    def to_dict(self) -> dict:
+        """Status snapshot for the job API (no server paths or source)"""
+        result = None
+        if self.result is not None:
+            result = {k: self.result[k] for k in PUBLIC_RESULT_FIELDS if k in self.result}
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'superseded_by': self.superseded_by.id if self.superseded_by else None,
+            'result': result
+        }
+
+    def _finish(self, status: str, result: Optional[dict] = None):
+        self.status = status
+        self.result = result
+        self.finished_at = time.time()
+        # Drop the source once it can no longer be compiled
+        self.latex_code = None
+        with self._callback_lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+class CompileScheduler:
+    """Fixed-size worker pool with a bounded, per-session coalescing queue.
+
+    When a result has needs_repair set, repair_fn(job, result) runs on the
+    repair pool; it returns (latex_code, options) for the follow-up compile,
+    or None to finish the job with the failed result.
+    """
+
+    def __init__(self, compile_fn: Callable[..., dict],
+                 workers: int = COMPILE_WORKERS, max_queue: int = COMPILE_QUEUE_SIZE,
+                 repair_fn: Optional[Callable[[CompileJob, dict], Optional[tuple]]] = None,
+                 repair_workers: int = COMPILE_REPAIR_WORKERS):
+        self.compile_fn = compile_fn
+        self.workers = workers
+        self.max_queue = max_queue
+        self.repair_fn = repair_fn
+        self._repair_pool = ThreadPoolExecutor(repair_workers, thread_name_prefix='compile-repair') if repair_fn else None
+
+        self._pending = deque()
+        self._pending_by_session = {}
+        self._repairing_by_session = {}
+        self._jobs = OrderedDict()  # recent jobs by ID, for status lookups
+        self._running = 0
+        self._repairing = 0
+        self._cond = threading.Condition()
+
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.repaired = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self.run_time_total = 0.0
+        self.run_time_max = 0.0
+
+        for i in range(workers):
+            thread = threading.Thread(target=self._worker, name=f"compile-worker-{i}", daemon=True)
+            thread.start()
+
+    def submit(self, latex_code: str, session_id: Optional[str] = None, options: Optional[dict] = None) -> CompileJob:
+        """Queue a compile; raises QueueFullError when there is no room"""
+        job = CompileJob(session_id, latex_code, options)
+
+        with self._cond:
+            stale = self._pending_by_session.get(session_id) if session_id else None
+
+            if stale is None and len(self._pending) >= self.max_queue:
+                self.rejected += 1
+                raise QueueFullError(self._retry_after())
+
+            if stale is not None:
+                # The session's queued compile is out of date; take its slot
+                self._pending.remove(stale)
+                stale.superseded_by = job
+                stale._finish(CompileJob.SUPERSEDED)
+                self.coalesced += 1
+
+            repairing = self._repairing_by_session.get(session_id) if session_id else None
+            if repairing is not None:
+                # The repair would bring back older source; this job replaces it
+                repairing.superseded_by = job
+
+            self._enqueue(job)
+
+        return job
+
+    def _enqueue(self, job: CompileJob):
+        """Append a job to the queue (lock held)"""
+        self._pending.append(job)
+        if job.session_id:
+            self._pending_by_session[job.session_id] = job
+        self._jobs[job.id] = job
+        while len(self._jobs) > JOB_HISTORY_SIZE:
+            self._jobs.popitem(last=False)
+        self.submitted += 1
+        self._cond.notify()
+
+    def get_job(self, job_id: str) -> Optional[CompileJob]:
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def _retry_after(self) -> int:
+        """Rough seconds until a queue slot frees up (lock held)"""
+        avg_run = self.run_time_total / self.completed if self.completed else 2.0
+        return max(1, int(avg_run * (len(self._pending) + self._running) / self.workers) + 1)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                job = self._pending.popleft()
+                if self._pending_by_session.get(job.session_id) is job:
+                    del self._pending_by_session[job.session_id]
+                self._running += 1
+
+            job.status = CompileJob.RUNNING
+            job.started_at = time.time()
+            if job.trace:
+                job.trace.add('queue', job.started_at - job.submitted_at, start=job.trace.started)
+            try:
+                with activate(job.trace):
+                    result = self.compile_fn(job.latex_code, job.session_id, **job.options)
+            except Exception as e:
+                result = {
+                    "success": False,
+                    "message": f"❌ An unexpected error occurred: {str(e)}",
+                    "pdf_generated": False
+                }
+
+            wait_time = job.started_at - job.submitted_at
+            run_time = time.time() - job.started_at
+            repair = self._repair_pool is not None and result.get('needs_repair')
+            if repair:
+                with self._cond:
+                    job.status = CompileJob.REPAIRING
+                    self._repairing += 1
+                    if job.session_id:
+                        self._repairing_by_session[job.session_id] = job
+                        # A compile queued while this one ran already replaces it
+                        job.superseded_by = self._pending_by_session.get(job.session_id)
+                self._repair_pool.submit(self._repair, job, result)
+            else:
+                job._finish(CompileJob.DONE, result)
+
+            COMPILE_WAIT_SECONDS.observe(wait_time)
+            COMPILE_SECONDS.observe(run_time, outcome=compile_outcome(result))
+            with self._cond:
+                self._running -= 1
+                self.completed += 1
+                self.wait_time_total += wait_time
+                self.wait_time_max = max(self.wait_time_max, wait_time)
+                self.run_time_total += run_time
+                self.run_time_max = max(self.run_time_max, run_time)
+
+    def _repair(self, job: CompileJob, result: dict):
+        """Run repair_fn for a failed job and queue the repaired source in its place"""
+        followup = None
+        with self._cond:
+            newer = job.superseded_by
+        if newer is None:
+            # No newer compile for the session came in, so the repair is still wanted
+            try:
+                with activate(job.trace):
+                    followup = self.repair_fn(job, result)
+            except Exception as e:
+                logger.warning("⚠️ Compile repair failed: %s", e)
+
+        with self._cond:
+            self._repairing -= 1
+            if self._repairing_by_session.get(job.session_id) is job:
+                del self._repairing_by_session[job.session_id]
+            successor = job.superseded_by
+            if successor is None and followup is not None and len(self._pending) < self.max_queue:
+                latex_code, options = followup
+                successor = CompileJob(job.session_id, latex_code, options)
+                # One trace for the whole chain: first run, repair, repaired run
+                successor.trace = job.trace
+                self._enqueue(successor)
+                self.repaired += 1
+                job.superseded_by = successor
+        if successor is not None:
+            job._finish(CompileJob.SUPERSEDED)
+        else:
+            job._finish(CompileJob.DONE, result)
+
+    def stats(self) -> dict:
+        with self._cond:
+            completed = self.completed
+            return {
+                'workers': self.workers,
+                'max_queue': self.max_queue,
+                'queue_depth': len(self._pending),
+                'running': self._running,
+                'repairing': self._repairing,
+                'submitted': self.submitted,
+                'completed': completed,
+                'rejected': self.rejected,
+                'coalesced': self.coalesced,
+                'repaired': self.repaired,
+                'wait_time_avg_ms': round(self.wait_time_total / completed * 1000, 2) if completed else 0.0,
+                'wait_time_max_ms': round(self.wait_time_max * 1000, 2),
+                'run_time_avg_ms': round(self.run_time_total / completed * 1000, 2) if completed else 0.0,
+                'run_time_max_ms': round(self.run_time_max * 1000, 2)
+            }
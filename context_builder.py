@@ -0,0 +1,107 @@
+import os
+import re
+from typing import Optional
+
+from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+
+
+# Fits stored chat history into a token budget before it is sent to the LLM.
+# The newest messages are replayed verbatim; older ones have their LaTeX
+# drafts stripped (the current document is attached once instead) and the
+# oldest are dropped once the budget runs out.
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv('CONTEXT_TOKEN_BUDGET', '16000'))
+CONTEXT_RECENT_MESSAGES = int(os.getenv('CONTEXT_RECENT_MESSAGES', '6'))
+
+# Rough but dependency-free; provider tokenizers would cost a network round trip
+CHARS_PER_TOKEN = 4
+
+OMITTED_DRAFT = "[Earlier LaTeX draft omitted; superseded by the current resume]"
+
+_LATEX_DOCUMENT = re.compile(
+    r"```[a-zA-Z]*[^`]*?\\(?:documentclass|begin\{document\}).*?(?:```|\Z)"
+    r"|\\documentclass.*?(?:\\end\{document\}|\Z)",
+    re.DOTALL
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1 if text else 0
+
+
+def strip_latex_drafts(text: str) -> str:
+    """Replace every embedded LaTeX document in text with a short marker"""
+    return _LATEX_DOCUMENT.sub(OMITTED_DRAFT, text)
+
+
+def _to_message(msg_type: str, content: str):
+    return HumanMessage(content=content) if msg_type == 'human' else AIMessage(content=content)
+
+
+def build_context(system_prompt, history: list, user_message: str,
+                  latest_document: Optional[str] = None,
+                  budget: int = CONTEXT_TOKEN_BUDGET,
+                  recent_messages: int = CONTEXT_RECENT_MESSAGES,
+                  document_heading: str = "CURRENT RESUME (latest LaTeX source)") -> tuple:
+    """Build the LangChain message list for one chat turn.
+
+    system_prompt is the prompt text or a prebuilt SystemMessage, which is
+    reused as is when no document is attached. Returns (messages, stats);
+    stats reports the estimated prompt size and what was kept, compacted or
+    dropped to get there.
+    """
+    system_message = system_prompt if isinstance(system_prompt, SystemMessage) else None
+    if system_message is not None:
+        system_prompt = system_message.content
+    history = [m for m in history if m.get('type') in ('human', 'ai')]
+    full_tokens = (estimate_tokens(system_prompt) + estimate_tokens(user_message)
+                   + sum(estimate_tokens(m['content']) for m in history))
+
+    used = estimate_tokens(system_prompt) + estimate_tokens(user_message)
+
+    system_content = system_prompt
+    document_tokens = 0
+    if latest_document:
+        document_section = f"\n\n{document_heading}:\n{latest_document}"
+        if used + estimate_tokens(document_section) <= budget:
+            system_content += document_section
+            system_message = None
+            document_tokens = estimate_tokens(document_section)
+            used += document_tokens
+
+    # Walk back from the newest message until the budget runs out
+    kept = []
+    compacted = 0
+    for age, msg in enumerate(reversed(history)):
+        content = msg['content']
+        if age >= recent_messages:
+            content = strip_latex_drafts(content)
+        tokens = estimate_tokens(content)
+        if used + tokens > budget:
+            break
+        if content != msg['content']:
+            compacted += 1
+        kept.append((msg['type'], content))
+        used += tokens
+
+    # Start the replayed history on a user turn
+    while kept and kept[-1][0] != 'human':
+        used -= estimate_tokens(kept.pop()[1])
+
+    messages = [system_message or SystemMessage(content=system_content)]
+    messages.extend(_to_message(msg_type, content) for msg_type, content in reversed(kept))
+    messages.append(HumanMessage(content=user_message))
+
+    stats = {
+        'prompt_tokens': used,
+        'full_history_tokens': full_tokens,
+        'saved_tokens': max(0, full_tokens - used),
+        'budget': budget,
+        'history_messages': len(history),
+        'included_messages': len(kept),
+        'compacted_messages': compacted,
+        'dropped_messages': len(history) - len(kept),
+        'document_included': bool(document_tokens),
+        'document_tokens': document_tokens
+    }
+    return messages, stats
@@ -0,0 +1,520 @@
+import bisect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Pluggable conversation storage. Replaces the process-global
+# conversation_messages / conversation_metadata dicts with either a bounded
+# in-memory LRU (evicts idle sessions after a TTL) or a SQLite database that
+# survives restarts and can be shared by several gunicorn workers.
+
+DEFAULT_TITLE = 'New Conversation'
+
+# Message fields that get their own column in SQLite; anything else is kept as JSON
+_MESSAGE_COLUMNS = ('type', 'content', 'timestamp')
+
+# Page size bounds for list_recent()
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# How often the SQLite store looks for idle conversations, and how many it drops per transaction
+SQLITE_SWEEP_SECONDS = 300
+SQLITE_SWEEP_BATCH = 500
+
+
+def new_metadata() -> dict:
+    return {
+        'created_at': datetime.now().isoformat(),
+        'title': DEFAULT_TITLE,
+        'message_count': 0
+    }
+
+
+def recency_key(metadata: dict) -> str:
+    """When a conversation was last active (ISO timestamps sort as strings)"""
+    return metadata.get('last_updated') or metadata['created_at']
+
+
+def encode_cursor(metadata: dict) -> str:
+    return f"{recency_key(metadata)}|{metadata['session_id']}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    """(recency, session_id) from a cursor, or None if it is missing or malformed"""
+    if not cursor or '|' not in cursor:
+        return None
+    recency, _, session_id = cursor.partition('|')
+    return recency, session_id
+
+
+class RecencyIndex:
+    """Session IDs kept sorted by (recency, session_id), updated one entry at a time"""
+
+    def __init__(self):
+        self._keys = []   # sorted (recency, session_id) tuples, oldest first
+        self._by_session = {}
+
+    def update(self, session_id: str, recency: str):
+        self.discard(session_id)
+        key = (recency, session_id)
+        bisect.insort(self._keys, key)
+        self._by_session[session_id] = key
+
+    def discard(self, session_id: str):
+        key = self._by_session.pop(session_id, None)
+        if key is not None:
+            del self._keys[bisect.bisect_left(self._keys, key)]
+
+    def page(self, limit: int, before: Optional[tuple] = None) -> list:
+        """Up to limit session IDs, most recent first, strictly older than before"""
+        end = bisect.bisect_left(self._keys, before) if before else len(self._keys)
+        return [session_id for _, session_id in reversed(self._keys[max(0, end - limit):end])]
+
+
+class ConversationStore:
+    """Interface shared by the storage backends"""
+
+    def ensure(self, session_id: str) -> dict:
+        """Create the conversation if needed and return its metadata"""
+        raise NotImplementedError
+
+    def exists(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def get_messages(self, session_id: str) -> list:
+        """Stored messages, oldest first ([] for unknown sessions)"""
+        raise NotImplementedError
+
+    def get_metadata(self, session_id: str) -> Optional[dict]:
+        raise NotImplementedError
+
+    def append_messages(self, session_id: str, messages: list, max_messages: int,
+                        title: Optional[str] = None) -> int:
+        """Append messages, keep only the newest max_messages and bump the metadata.
+
+        title replaces the default 'New Conversation' title, if still set.
+        Returns the number of messages kept.
+        """
+        raise NotImplementedError
+
+    def delete(self, session_id: str) -> bool:
+        raise NotImplementedError
+
+    def list_metadata(self) -> list:
+        """Metadata of every conversation, each with its session_id"""
+        raise NotImplementedError
+
+    def list_recent(self, limit: int = DEFAULT_PAGE_SIZE, before: Optional[str] = None) -> tuple:
+        """One page of conversations, most recently updated first.
+
+        before is the next_cursor of the previous page. Returns
+        (metadata list, next_cursor), next_cursor being None on the last page.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # Fetch one extra row to learn whether another page exists
+        page = self._page(limit + 1, decode_cursor(before))
+        if len(page) > limit:
+            page = page[:limit]
+            return page, encode_cursor(page[-1])
+        return page, None
+
+    def _page(self, limit: int, before: Optional[tuple]) -> list:
+        raise NotImplementedError
+
+    def count(self) -> int:
+        raise NotImplementedError
+
+    def __contains__(self, session_id) -> bool:
+        return self.exists(session_id)
+
+
+class _EvictionReportingLock:
+    """The store's lock; on release, passes the sessions evicted meanwhile to on_evict.
+
+    A plain class rather than a @contextmanager: it wraps every store call,
+    and a generator per call doubled the cost of the cheap ones.
+    """
+
+    def __init__(self, store: 'InMemoryConversationStore'):
+        self.store = store
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.lock.acquire()
+
+    def __exit__(self, *exc_info):
+        store = self.store
+        evicted = store._evicted
+        if evicted:
+            store._evicted = []
+        self.lock.release()
+        if evicted and store.on_evict:
+            report_evictions(store.on_evict, evicted)
+
+
+def report_evictions(on_evict: Callable[[str], None], session_ids: list):
+    for session_id in session_ids:
+        try:
+            on_evict(session_id)
+        except Exception as e:
+            logger.warning("⚠️ Cleanup of evicted conversation %s failed: %s", session_id, e)
+
+
+class InMemoryConversationStore(ConversationStore):
+    """Process-local store with LRU eviction and an idle TTL.
+
+    on_evict(session_id) is called for every evicted session, after the
+    store's lock is released, so the caller can drop what else it keeps
+    for that conversation (workspace files, document history).
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: Optional[float] = None,
+                 on_evict: Optional[Callable[[str], None]] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.evictions = 0
+        self._sessions = OrderedDict()  # session_id -> entry, least recently used first
+        self._recent = RecencyIndex()
+        self._evicted = []              # evicted session IDs not yet passed to on_evict
+        self._lock = _EvictionReportingLock(self)
+
+    def _evict(self):
+        """Drop expired and over-capacity sessions (lock held)"""
+        if self.ttl_seconds:
+            cutoff = time.monotonic() - self.ttl_seconds
+            while self._sessions:
+                oldest = next(iter(self._sessions.values()))
+                if oldest['touched'] >= cutoff:
+                    break
+                self._drop_oldest()
+
+        while len(self._sessions) > self.max_sessions:
+            self._drop_oldest()
+
+    def _drop_oldest(self):
+        session_id, _ = self._sessions.popitem(last=False)
+        self._recent.discard(session_id)
+        self._evicted.append(session_id)
+        self.evictions += 1
+
+    def _get(self, session_id: str) -> Optional[dict]:
+        """Look up a live entry and mark it recently used (lock held)"""
+        self._evict()
+        entry = self._sessions.get(session_id)
+        if entry is not None:
+            entry['touched'] = time.monotonic()
+            self._sessions.move_to_end(session_id)
+        return entry
+
+    def _get_or_create(self, session_id: str) -> dict:
+        entry = self._get(session_id)
+        if entry is None:
+            entry = {'messages': [], 'metadata': new_metadata(), 'touched': time.monotonic()}
+            self._sessions[session_id] = entry
+            self._recent.update(session_id, recency_key(entry['metadata']))
+            self._evict()
+        return entry
+
+    def ensure(self, session_id: str) -> dict:
+        with self._lock:
+            return dict(self._get_or_create(session_id)['metadata'])
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._get(session_id) is not None
+
+    def get_messages(self, session_id: str) -> list:
+        with self._lock:
+            entry = self._get(session_id)
+            return list(entry['messages']) if entry else []
+
+    def get_metadata(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            entry = self._get(session_id)
+            return dict(entry['metadata']) if entry else None
+
+    def append_messages(self, session_id: str, messages: list, max_messages: int,
+                        title: Optional[str] = None) -> int:
+        with self._lock:
+            entry = self._get_or_create(session_id)
+            stored = entry['messages']
+            stored.extend(messages)
+            if len(stored) > max_messages:
+                del stored[:len(stored) - max_messages]
+
+            metadata = entry['metadata']
+            metadata['message_count'] += len(messages)
+            metadata['last_updated'] = datetime.now().isoformat()
+            if title and metadata['title'] == DEFAULT_TITLE:
+                metadata['title'] = title
+            self._recent.update(session_id, recency_key(metadata))
+            return len(stored)
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            self._recent.discard(session_id)
+            return self._sessions.pop(session_id, None) is not None
+
+    def list_metadata(self) -> list:
+        with self._lock:
+            self._evict()
+            return [dict(entry['metadata'], session_id=session_id)
+                    for session_id, entry in self._sessions.items()]
+
+    def _page(self, limit: int, before: Optional[tuple]) -> list:
+        with self._lock:
+            self._evict()
+            return [dict(self._sessions[session_id]['metadata'], session_id=session_id)
+                    for session_id in self._recent.page(limit, before)]
+
+    def count(self) -> int:
+        with self._lock:
+            self._evict()
+            return len(self._sessions)
+
+
+class SQLiteConversationStore(ConversationStore):
+    """Durable store; safe to share between threads and worker processes.
+
+    With ttl_seconds, conversations idle that long are deleted by a sweep
+    that runs from the write paths at most every sweep_interval seconds,
+    and on_evict(session_id) is called for each one, like the in-memory
+    store does on eviction.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversations (
+            session_id TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            created_at TEXT NOT NULL,
+            last_updated TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS idx_conversations_recency
+            ON conversations (COALESCE(last_updated, created_at), session_id);
+        CREATE TABLE IF NOT EXISTS messages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session_id TEXT NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT NOT NULL,
+            timestamp TEXT NOT NULL,
+            extra TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_messages_session_id
+            ON messages (session_id, id);
+    """
+
+    def __init__(self, path: str, ttl_seconds: Optional[float] = None,
+                 on_evict: Optional[Callable[[str], None]] = None, sweep_interval: float = SQLITE_SWEEP_SECONDS):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.on_evict = on_evict
+        self.sweep_interval = sweep_interval
+        self.evictions = 0
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread; WAL lets readers and a writer overlap"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _metadata_from_row(row) -> dict:
+        metadata = {
+            'created_at': row['created_at'],
+            'title': row['title'],
+            'message_count': row['message_count']
+        }
+        if row['last_updated']:
+            metadata['last_updated'] = row['last_updated']
+        return metadata
+
+    def _insert_conversation(self, conn, session_id: str):
+        metadata = new_metadata()
+        conn.execute(
+            'INSERT OR IGNORE INTO conversations (session_id, title, created_at, message_count) VALUES (?, ?, ?, 0)',
+            (session_id, metadata['title'], metadata['created_at'])
+        )
+
+    def _maybe_sweep(self):
+        """Run sweep() if it is due and no other thread in this process is running it"""
+        if not self.ttl_seconds or time.monotonic() < self._next_sweep:
+            return
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = time.monotonic() + self.sweep_interval
+            self.sweep()
+        except sqlite3.Error as e:
+            logger.warning("⚠️ Sweeping idle conversations failed: %s", e)
+        finally:
+            self._sweep_lock.release()
+
+    def sweep(self) -> int:
+        """Delete conversations idle longer than the TTL; returns how many were deleted"""
+        cutoff = (datetime.now() - timedelta(seconds=self.ttl_seconds)).isoformat()
+        conn = self._connect()
+        evicted = []
+        while True:
+            # Oldest first along idx_conversations_recency
+            rows = conn.execute(
+                """SELECT session_id FROM conversations WHERE COALESCE(last_updated, created_at) < ?
+                   ORDER BY COALESCE(last_updated, created_at), session_id LIMIT ?""",
+                (cutoff, SQLITE_SWEEP_BATCH)
+            ).fetchall()
+            batch = []
+            with conn:
+                for row in rows:
+                    # Recheck the cutoff: the conversation may have been used since the SELECT,
+                    # and another worker process may be sweeping too
+                    deleted = conn.execute(
+                        'DELETE FROM conversations WHERE session_id = ? AND COALESCE(last_updated, created_at) < ?',
+                        (row['session_id'], cutoff)
+                    ).rowcount
+                    if deleted:
+                        conn.execute('DELETE FROM messages WHERE session_id = ?', (row['session_id'],))
+                        batch.append(row['session_id'])
+            evicted.extend(batch)
+            if len(rows) < SQLITE_SWEEP_BATCH:
+                break
+
+        if evicted:
+            self.evictions += len(evicted)
+            logger.info("🧹 Deleted %d conversations idle for more than %.0fh", len(evicted), self.ttl_seconds / 3600)
+            if self.on_evict:
+                report_evictions(self.on_evict, evicted)
+        return len(evicted)
+
+    def ensure(self, session_id: str) -> dict:
+        self._maybe_sweep()
+        conn = self._connect()
+        with conn:
+            self._insert_conversation(conn, session_id)
+        return self.get_metadata(session_id)
+
+    def exists(self, session_id: str) -> bool:
+        row = self._connect().execute(
+            'SELECT 1 FROM conversations WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return row is not None
+
+    def get_messages(self, session_id: str) -> list:
+        rows = self._connect().execute(
+            'SELECT type, content, timestamp, extra FROM messages WHERE session_id = ? ORDER BY id',
+            (session_id,)
+        ).fetchall()
+        messages = []
+        for row in rows:
+            message = json.loads(row['extra']) if row['extra'] else {}
+            message.update(type=row['type'], content=row['content'], timestamp=row['timestamp'])
+            messages.append(message)
+        return messages
+
+    def get_metadata(self, session_id: str) -> Optional[dict]:
+        row = self._connect().execute(
+            'SELECT * FROM conversations WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        return self._metadata_from_row(row) if row else None
+
+    def append_messages(self, session_id: str, messages: list, max_messages: int,
+                        title: Optional[str] = None) -> int:
+        self._maybe_sweep()
+        conn = self._connect()
+        with conn:
+            self._insert_conversation(conn, session_id)
+            conn.executemany(
+                'INSERT INTO messages (session_id, type, content, timestamp, extra) VALUES (?, ?, ?, ?, ?)',
+                [
+                    (session_id, m['type'], m['content'], m['timestamp'],
+                     json.dumps({k: v for k, v in m.items() if k not in _MESSAGE_COLUMNS}))
+                    for m in messages
+                ]
+            )
+            conn.execute(
+                """DELETE FROM messages WHERE session_id = ? AND id NOT IN (
+                       SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?)""",
+                (session_id, session_id, max_messages)
+            )
+            conn.execute(
+                """UPDATE conversations
+                   SET message_count = message_count + ?,
+                       last_updated = ?,
+                       title = CASE WHEN ? IS NOT NULL AND title = ? THEN ? ELSE title END
+                   WHERE session_id = ?""",
+                (len(messages), datetime.now().isoformat(), title, DEFAULT_TITLE, title, session_id)
+            )
+            kept = conn.execute(
+                'SELECT COUNT(*) FROM messages WHERE session_id = ?', (session_id,)
+            ).fetchone()[0]
+        return kept
+
+    def delete(self, session_id: str) -> bool:
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM messages WHERE session_id = ?', (session_id,))
+            deleted = conn.execute('DELETE FROM conversations WHERE session_id = ?', (session_id,)).rowcount
+        return deleted > 0
+
+    def list_metadata(self) -> list:
+        rows = self._connect().execute('SELECT * FROM conversations').fetchall()
+        return [dict(self._metadata_from_row(row), session_id=row['session_id']) for row in rows]
+
+    def _page(self, limit: int, before: Optional[tuple]) -> list:
+        # Walks idx_conversations_recency backwards; no sort, no full scan
+        query = 'SELECT * FROM conversations'
+        params = []
+        if before:
+            # Row-value form of (recency, session_id) < cursor that SQLite can seek on
+            recency, session_id = before
+            query += (' WHERE COALESCE(last_updated, created_at) <= ?'
+                      ' AND (COALESCE(last_updated, created_at) < ? OR session_id < ?)')
+            params.extend([recency, recency, session_id])
+        query += ' ORDER BY COALESCE(last_updated, created_at) DESC, session_id DESC LIMIT ?'
+        params.append(limit)
+        rows = self._connect().execute(query, params).fetchall()
+        return [dict(self._metadata_from_row(row), session_id=row['session_id']) for row in rows]
+
+    def count(self) -> int:
+        return self._connect().execute('SELECT COUNT(*) FROM conversations').fetchone()[0]
+
+
+def create_conversation_store(on_evict: Optional[Callable[[str], None]] = None) -> ConversationStore:
+    """Build the backend selected by CONVERSATION_STORE (memory or sqlite).
+
+    on_evict is called with each session the store evicts (in memory) or
+    deletes after its idle TTL (SQLite).
+    """
+    backend = os.getenv('CONVERSATION_STORE', 'memory').lower()
+
+    if backend == 'sqlite':
+        path = os.getenv('CONVERSATION_DB_PATH', 'conversations.db')
+        ttl_hours = float(os.getenv('CONVERSATION_DB_TTL_HOURS', '720'))
+        logger.info("💾 Using SQLite conversation store: %s (%sh idle TTL)", os.path.abspath(path), ttl_hours)
+        return SQLiteConversationStore(path, ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None,
+                                       on_evict=on_evict)
+
+    max_sessions = int(os.getenv('CONVERSATION_MAX_SESSIONS', '1000'))
+    ttl_hours = float(os.getenv('CONVERSATION_TTL_HOURS', '24'))
+    logger.info("💾 Using in-memory conversation store (max %d sessions, %sh idle TTL)", max_sessions, ttl_hours)
+    return InMemoryConversationStore(max_sessions=max_sessions, ttl_seconds=ttl_hours * 3600 if ttl_hours > 0 else None,
+                                     on_evict=on_evict)
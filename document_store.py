@@ -0,0 +1,220 @@
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional
+
+from compile_cache import normalize_latex_source
+from workspace import workspaces
+
+
+logger = logging.getLogger(__name__)
+
+# Versioned LaTeX documents per conversation. Every distinct resume source is
+# stored once (keyed by content hash) as a delta against the previous
+# version, with a full snapshot every few versions to keep reconstruction
+# cheap. Conversation messages keep a small reference instead of the source.
+# Versions are appended to versions.jsonl in the session workspace.
+
+DOCUMENT_SNAPSHOT_INTERVAL = int(os.getenv('DOCUMENT_SNAPSHOT_INTERVAL', '10'))
+DOCUMENT_CACHE_SESSIONS = int(os.getenv('DOCUMENT_CACHE_SESSIONS', '256'))
+
+VERSIONS_FILE = 'versions.jsonl'
+
+# Diff units: lines, and within a line every LaTeX command. The model emits
+# whole resumes on one line, so plain line diffs would store everything.
+_SEGMENT_BOUNDARY = re.compile(r'(?<=\n)|(?=\\)')
+
+# Complete LaTeX documents embedded in chat text, fenced or bare
+_EMBEDDED_DOCUMENT = re.compile(
+    r"```(?:latex|tex)?[ \t]*\n?(\\documentclass.*?\\end\{document\})\s*```"
+    r"|(\\documentclass.*?\\end\{document\})",
+    re.DOTALL
+)
+
+
+def split_segments(text: str) -> list:
+    return [segment for segment in _SEGMENT_BOUNDARY.split(text) if segment]
+
+
+def make_delta(old_segments: list, new_segments: list) -> list:
+    """Ops rebuilding new from old: [start, end] copies old segments, a string is inserted text"""
+    ops = []
+    matcher = difflib.SequenceMatcher(None, old_segments, new_segments, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            ops.append([i1, i2])
+        elif j2 > j1:
+            ops.append(''.join(new_segments[j1:j2]))
+    return ops
+
+
+def apply_delta(old_segments: list, ops: list) -> str:
+    parts = []
+    for op in ops:
+        if isinstance(op, str):
+            parts.append(op)
+        else:
+            parts.extend(old_segments[op[0]:op[1]])
+    return ''.join(parts)
+
+
+def content_hash(latex_code: str) -> str:
+    return hashlib.sha256(normalize_latex_source(latex_code).encode('utf-8')).hexdigest()
+
+
+class DocumentHistory:
+    """All stored versions of one conversation's resume"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._versions = []   # records in version order; version N is _versions[N - 1]
+        self._by_hash = {}
+        self._latest_text = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        good_end = 0   # byte offset just past the last intact record
+        terminated = True
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A torn final line from a crash; everything before it is intact
+                    break
+                self._versions.append(record)
+                self._by_hash[record['hash']] = record
+                good_end += len(line)
+                terminated = line.endswith(b'\n')
+            size = f.seek(0, os.SEEK_END)
+
+        # Cut the torn line (or end the last record's line) so the next add()
+        # starts on a line of its own instead of being merged into the damage
+        if good_end < size:
+            logger.warning("⚠️ Dropping %d bytes of a torn record at the end of %s", size - good_end, self.path)
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_end)
+        if not terminated:
+            with open(self.path, 'ab') as f:
+                f.write(b'\n')
+
+    def add(self, latex_code: str) -> dict:
+        """Store latex_code unless an identical version exists; returns that version's reference"""
+        digest = content_hash(latex_code)
+        with self._lock:
+            existing = self._by_hash.get(digest)
+            if existing is not None:
+                return self._reference(existing)
+
+            version = len(self._versions) + 1
+            record = {
+                'version': version,
+                'hash': digest,
+                'created_at': datetime.now().isoformat(),
+                'size': len(latex_code)
+            }
+            if self._versions and (version - 1) % DOCUMENT_SNAPSHOT_INTERVAL:
+                previous = self._latest_text
+                if previous is None:
+                    previous = self._text(len(self._versions))
+                record['delta'] = make_delta(split_segments(previous), split_segments(latex_code))
+            else:
+                record['text'] = latex_code
+
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(record) + '\n')
+            self._versions.append(record)
+            self._by_hash[digest] = record
+            self._latest_text = latex_code
+            return self._reference(record)
+
+    def get(self, version: int) -> Optional[str]:
+        """Full source of a version, or None if it doesn't exist"""
+        with self._lock:
+            if not 1 <= version <= len(self._versions):
+                return None
+            return self._text(version)
+
+    def _text(self, version: int) -> str:
+        """Rebuild a version from the nearest snapshot before it (lock held)"""
+        base = version
+        while 'text' not in self._versions[base - 1]:
+            base -= 1
+
+        text = self._versions[base - 1]['text']
+        for record in self._versions[base:version]:
+            text = apply_delta(split_segments(text), record['delta'])
+        return text
+
+    def latest_version(self) -> Optional[int]:
+        with self._lock:
+            return len(self._versions) or None
+
+    def list(self) -> list:
+        with self._lock:
+            return [dict(self._reference(record),
+                         created_at=record['created_at'],
+                         size=record['size'],
+                         stored_as='snapshot' if 'text' in record else 'delta')
+                    for record in self._versions]
+
+    @staticmethod
+    def _reference(record: dict) -> dict:
+        return {'version': record['version'], 'hash': record['hash']}
+
+
+class DocumentStore:
+    """Loads DocumentHistory objects on demand, keeping the most recently used in memory"""
+
+    def __init__(self, max_sessions: int = DOCUMENT_CACHE_SESSIONS):
+        self.max_sessions = max_sessions
+        self._histories = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id: Optional[str]) -> DocumentHistory:
+        workspace = workspaces.get(session_id)
+        with self._lock:
+            history = self._histories.get(workspace.session_id)
+            if history is None:
+                history = DocumentHistory(os.path.join(workspace.path, VERSIONS_FILE))
+                self._histories[workspace.session_id] = history
+                while len(self._histories) > self.max_sessions:
+                    self._histories.popitem(last=False)
+            else:
+                self._histories.move_to_end(workspace.session_id)
+            return history
+
+    def forget(self, session_id: str):
+        """Drop a session's cached history (its file goes with the workspace)"""
+        with self._lock:
+            self._histories.pop(session_id, None)
+
+    def externalize(self, session_id: Optional[str], text: str) -> tuple:
+        """Move complete LaTeX documents out of chat text into the version store.
+
+        Returns the text with each document replaced by a short marker, and
+        the reference of the last document found (or None).
+        """
+        reference = None
+        history = None
+
+        def replace(match):
+            nonlocal reference, history
+            if history is None:
+                history = self.get(session_id)
+            reference = history.add(match.group(1) or match.group(2))
+            return f"[LaTeX document v{reference['version']}]"
+
+        return _EMBEDDED_DOCUMENT.sub(replace, text), reference
+
+
+document_store = DocumentStore()
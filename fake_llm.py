@@ -0,0 +1,131 @@
+import asyncio
+import json
+import os
+import random
+import re
+import time
+import uuid
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from resume_data import normalize_resume_data
+from resume_template import render_resume
+
+
+# Offline stand-in for the Gemini/Groq chat models (LLM_PROVIDER=fake), for
+# load tests and local development without network access or API keys. It
+# answers after a configurable delay with canned text and, when write_latex
+# is bound and the message asks for a resume change, a write_latex tool call
+# with a rendered resume that mentions the message (so distinct messages
+# produce distinct documents and miss the compile cache).
+
+FAKE_LLM_LATENCY_MS = float(os.getenv('FAKE_LLM_LATENCY_MS', '200'))
+FAKE_LLM_JITTER_MS = float(os.getenv('FAKE_LLM_JITTER_MS', '50'))
+# 'auto' (when the message looks like a resume request), 'always' or 'never'
+FAKE_LLM_TOOL_CALLS = os.getenv('FAKE_LLM_TOOL_CALLS', 'auto').lower()
+
+RESUME_REQUEST = re.compile(r'\b(resume|cv|create|add|update|change|rewrite|remove)\b', re.IGNORECASE)
+_REPAIR_EXCERPT = re.compile(r'\nExcerpt:\n(.*)\Z', re.DOTALL)
+
+SAMPLE_RESUME = {
+    'header': {'name': 'Jane Doe', 'email': 'jane@example.com', 'phone': '555-0100',
+               'github': 'https://github.com/janedoe', 'location': 'Remote'},
+    'skills': [{'category': 'Languages', 'items': ['Python', 'Go', 'SQL']},
+               {'category': 'Tools', 'items': ['Docker', 'PostgreSQL', 'Git']}],
+    'experience': [{'title': 'Software Engineer', 'company': 'Acme Corp', 'location': 'Remote',
+                    'dates': '2021 -- Present',
+                    'bullets': ['Built the billing service handling 2M requests a day',
+                                'Cut p95 API latency by 40% with query and cache tuning']}],
+    'projects': [{'name': 'Tracer', 'technologies': 'Rust', 'date': '2023',
+                  'bullets': ['Sampling profiler for long-running services']}],
+    'education': [{'institution': 'State University', 'degree': 'BS Computer Science', 'dates': '2017 -- 2021'}],
+}
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with canned, templated replies and simulated latency"""
+
+    latency_ms: float = FAKE_LLM_LATENCY_MS
+    jitter_ms: float = FAKE_LLM_JITTER_MS
+    tool_calls: str = FAKE_LLM_TOOL_CALLS
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake-chat'
+
+    def bind_tools(self, tools, **kwargs: Any):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools], **kwargs)
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)) / 1000
+
+    def _reply(self, messages: List[BaseMessage], tools: Optional[list]) -> AIMessage:
+        prompt = next((m.content for m in reversed(messages) if isinstance(m, HumanMessage)), '')
+        prompt = prompt if isinstance(prompt, str) else str(prompt)
+        tool_names = {tool['function']['name'] for tool in tools or []}
+
+        wants_tool = self.tool_calls == 'always' or (self.tool_calls == 'auto' and RESUME_REQUEST.search(prompt))
+        if 'write_latex' in tool_names and wants_tool:
+            data = dict(SAMPLE_RESUME, summary=f"Resume drafted for: {prompt[:200]}")
+            content = "I've updated your resume with the details you gave me."
+            tool_calls = [{'name': 'write_latex', 'args': {'latex_code': render_resume(normalize_resume_data(data))},
+                           'id': f"call_{uuid.uuid4().hex[:12]}"}]
+        else:
+            # LaTeX repair requests get their excerpt back unchanged
+            excerpt = _REPAIR_EXCERPT.search(prompt)
+            content = excerpt.group(1) if excerpt else f"Happy to help with that. You said: {prompt[:200]}"
+            tool_calls = []
+
+        output = content + ''.join(json.dumps(call['args']) for call in tool_calls)
+        prompt_text = ''.join(m.content if isinstance(m.content, str) else str(m.content) for m in messages)
+        usage = {'input_tokens': _estimate_tokens(prompt_text), 'output_tokens': _estimate_tokens(output)}
+        usage['total_tokens'] = usage['input_tokens'] + usage['output_tokens']
+        return AIMessage(content=content, tool_calls=tool_calls, usage_metadata=usage)
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                  run_manager=None, **kwargs: Any) -> ChatResult:
+        time.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, kwargs.get('tools')))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                         run_manager=None, **kwargs: Any) -> ChatResult:
+        # Waits without holding a thread, like a real provider's async client
+        await asyncio.sleep(self._delay())
+        return ChatResult(generations=[ChatGeneration(message=self._reply(messages, kwargs.get('tools')))])
+
+    def _chunks(self, messages: List[BaseMessage], tools: Optional[list]) -> tuple:
+        """(pause before each chunk, chunks) of a streamed reply"""
+        message = self._reply(messages, tools)
+        words = re.findall(r'\S+\s*', message.content) or ['']
+        chunks = [AIMessageChunk(content=word) for word in words]
+        chunks.extend(AIMessageChunk(content='', tool_call_chunks=[
+            {'name': call['name'], 'args': json.dumps(call['args']), 'id': call['id'], 'index': index}
+        ]) for index, call in enumerate(message.tool_calls))
+        # The delay is spread over the chunks, like tokens arriving over time
+        pause = self._delay() / len(chunks)
+        chunks.append(AIMessageChunk(content='', usage_metadata=message.usage_metadata))
+        return pause, chunks
+
+    def _stream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        pause, chunks = self._chunks(messages, kwargs.get('tools'))
+        for chunk in chunks:
+            if chunk.usage_metadata is None:
+                time.sleep(pause)
+            yield ChatGenerationChunk(message=chunk)
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None,
+                       run_manager=None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        pause, chunks = self._chunks(messages, kwargs.get('tools'))
+        for chunk in chunks:
+            if chunk.usage_metadata is None:
+                await asyncio.sleep(pause)
+            yield ChatGenerationChunk(message=chunk)
@@ -0,0 +1,92 @@
+import logging
+import re
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Cleanup of LaTeX as the LLM returns it: drop any chatter around the
+# document, fill in the link placeholders the template uses and remove
+# empty or malformed template items. The document is located without
+# splitting it into lines and each rewrite is one precompiled scan, so the
+# cost stays linear in the input size (see benchmarks/bench_clean_latex.py).
+
+PLACEHOLDER_REPLACEMENTS = {
+    '[LINKEDIN_URL]': 'https://linkedin.com/in/yourprofile',
+    '[LINKEDIN_DISPLAY]': 'yourprofile',
+    '[GITHUB_URL]': 'https://github.com/yourprofile',
+    '[GITHUB_DISPLAY]': 'yourprofile',
+    '[USER_LINKEDIN_URL]': 'https://linkedin.com/in/yourprofile',
+    '[USER_LINKEDIN_DISPLAY]': 'yourprofile',
+    '[USER_GITHUB_URL]': 'https://github.com/yourprofile',
+    '[USER_GITHUB_DISPLAY]': 'yourprofile',
+}
+
+_DOCUMENT_START = re.compile(r'^[^\S\n]*\\documentclass', re.MULTILINE)
+_DOCUMENT_END = '\\end{document}'
+
+# Each pattern starts with a literal ("[" or "\resume"), which lets the regex
+# engine jump straight to candidate positions. A single alternation of all
+# rewrites has no common literal prefix and measured several times slower.
+_PLACEHOLDER = re.compile(
+    r'\[(?:' + '|'.join(re.escape(placeholder[1:-1]) for placeholder in PLACEHOLDER_REPLACEMENTS) + r')\]'
+)
+# Empty \resumeItem{}. The blank-only pass after it catches an outer item left
+# holding only whitespace once an inner empty one is removed, so it only has
+# work to do when the first pass removed something.
+_EMPTY_ITEM = re.compile(r'\\resumeItem\{\s*\}')
+_BLANK_ITEM = re.compile(r'\\resumeItem\{\s+\}')
+# A \resumeSubheading with a fifth argument (group 1 keeps the first four)
+_SUBHEADING_FIFTH_ARG = re.compile(
+    r'(\\resumeSubheading\s*\{[^}]+\}\s*\{[^}]+\}\s*\{[^}]+\}\s*\{[^}]+\})\s*\{[^}]*\}'
+)
+
+
+def _placeholder(match) -> str:
+    return PLACEHOLDER_REPLACEMENTS[match.group(0)]
+
+
+def clean_latex_code(raw_latex: str) -> str:
+    """Clean up LaTeX code generated by LLM to ensure it compiles properly"""
+    start = _DOCUMENT_START.search(raw_latex)
+    if not start:
+        logger.warning("❌ No \\documentclass found in generated LaTeX!")
+        return raw_latex
+
+    # Keep from the \documentclass line through the first \end{document}
+    end = raw_latex.find(_DOCUMENT_END, start.start())
+    end = len(raw_latex) if end < 0 else end + len(_DOCUMENT_END)
+
+    cleaned_latex, placeholders = _PLACEHOLDER.subn(_placeholder, raw_latex[start.start():end])
+    # Items go before subheadings: dropping an item can complete a subheading's fifth argument
+    cleaned_latex, empty_items = _EMPTY_ITEM.subn('', cleaned_latex)
+    blank_items = 0
+    if empty_items:
+        cleaned_latex, blank_items = _BLANK_ITEM.subn('', cleaned_latex)
+    cleaned_latex, subheadings = _SUBHEADING_FIFTH_ARG.subn(r'\1', cleaned_latex)
+    rewrites = empty_items + blank_items + subheadings
+    logger.info("🧹 LaTeX cleaned: %d leading and %d trailing characters dropped, %d placeholders filled, %d items fixed",
+                start.start(), len(raw_latex) - end, placeholders, rewrites)
+    return cleaned_latex
+
+
+def extract_latex_from_response(response: str) -> Optional[str]:
+    """LaTeX written inline in a chat reply: fenced code blocks and anything
+    from \\documentclass or \\begin{document} through \\end{document}, or None
+    """
+    if "\\documentclass" not in response and "\\begin{document}" not in response:
+        return None
+
+    latex_lines = []
+    in_code_block = False
+    for line in response.split('\n'):
+        if line.strip().startswith('```'):
+            in_code_block = not in_code_block
+            continue
+
+        if in_code_block or "\\documentclass" in line or "\\begin{document}" in line or latex_lines:
+            latex_lines.append(line)
+            if _DOCUMENT_END in line:
+                break
+
+    return '\n'.join(latex_lines) if latex_lines else None
@@ -0,0 +1,129 @@
+import os
+import shutil
+import subprocess
+import threading
+from typing import Optional
+
+
+# One-time pdflatex discovery. The working binary and its version are
+# resolved once (at startup) and reused, so a compile is exactly one process
+# spawn instead of walking a list of candidates that mostly don't exist.
+
+COMPILER_ENV_VARS = ['PDFLATEX_PATH', 'LATEX_COMPILER']
+
+COMPILER_NAMES = ['pdflatex', 'miktex-pdflatex']
+
+KNOWN_COMPILER_PATHS = [
+    r"C:\Program Files\MiKTeX\miktex\bin\x64\miktex-pdflatex.exe",
+    r"C:\Program Files\MiKTeX\miktex\bin\x64\pdflatex.exe",
+    os.path.expandvars(r"%LOCALAPPDATA%\Programs\MiKTeX\miktex\bin\x64\miktex-pdflatex.exe"),
+    os.path.expandvars(r"%LOCALAPPDATA%\Programs\MiKTeX\miktex\bin\x64\pdflatex.exe"),
+    r"C:\texlive\2024\bin\windows\pdflatex.exe",
+    r"C:\texlive\2023\bin\windows\pdflatex.exe",
+    r"C:\texlive\2024\bin\win32\pdflatex.exe",
+    r"C:\texlive\2023\bin\win32\pdflatex.exe",
+    "/Library/TeX/texbin/pdflatex",
+    "/usr/local/texlive/bin/x86_64-linux/pdflatex",
+    "/usr/bin/pdflatex",
+]
+
+
+class CompilerInfo:
+    """A pdflatex binary that answered --version"""
+
+    def __init__(self, path: str, version: str, source: str):
+        self.path = path
+        self.version = version
+        self.source = source
+
+    @property
+    def is_miktex(self) -> bool:
+        return 'miktex' in self.version.lower() or 'miktex' in self.path.lower()
+
+    def base_args(self) -> list:
+        """Command prefix for a non-interactive compile"""
+        args = [self.path]
+        if self.is_miktex:
+            # MiKTeX-only flag; TeX Live's pdflatex rejects it
+            args.append("--disable-installer")
+        args.append("-interaction=nonstopmode")
+        return args
+
+    def to_dict(self) -> dict:
+        return {
+            'path': self.path,
+            'version': self.version,
+            'source': self.source,
+            'miktex': self.is_miktex
+        }
+
+
+_compiler = None
+_discovered = False
+_discovery_lock = threading.Lock()
+
+
+def _candidates():
+    """(path, source) pairs in priority order, without duplicates"""
+    seen = set()
+
+    for var in COMPILER_ENV_VARS:
+        value = os.getenv(var)
+        if value:
+            resolved = shutil.which(value) or value
+            if resolved not in seen:
+                seen.add(resolved)
+                yield resolved, f"env:{var}"
+
+    for name in COMPILER_NAMES:
+        resolved = shutil.which(name)
+        if resolved and resolved not in seen:
+            seen.add(resolved)
+            yield resolved, "PATH"
+
+    for path in KNOWN_COMPILER_PATHS:
+        if path not in seen and os.path.isfile(path):
+            seen.add(path)
+            yield path, "known-path"
+
+
+def _probe(path: str) -> Optional[str]:
+    """Return the version banner of path, or None if it doesn't run"""
+    try:
+        result = subprocess.run(
+            [path, "--version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            timeout=10
+        )
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.split('\n')[0].strip() if result.stdout else "Unknown version"
+
+
+def discover_compiler(force: bool = False) -> Optional[CompilerInfo]:
+    """Resolve the pdflatex binary once and memoize it (force=True re-probes)"""
+    global _compiler, _discovered
+
+    with _discovery_lock:
+        if _discovered and not force:
+            return _compiler
+
+        _compiler = None
+        for path, source in _candidates():
+            version = _probe(path)
+            if version:
+                _compiler = CompilerInfo(path, version, source)
+                break
+        _discovered = True
+        return _compiler
+
+
+def get_compiler() -> Optional[CompilerInfo]:
+    """The memoized compiler, discovering it on first use"""
+    if _discovered:
+        return _compiler
+    return discover_compiler()
@@ -0,0 +1,240 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+from typing import Optional
+
+from latex_compiler import CompilerInfo
+
+
+logger = logging.getLogger(__name__)
+
+# Precompiled TeX formats for recurring preambles. Loading fontawesome5,
+# babel, hyperref, titlesec, ... dominates a resume compile, so once a
+# preamble has been seen a few times its state is dumped to a .fmt file
+# (pdflatex -ini with mylatexformat) and later compiles load that instead of
+# re-reading every package. Anything that can't use a format compiles normally.
+
+LATEX_FORMAT_ENABLED = os.getenv('LATEX_PRECOMPILED_FORMAT', '1').lower() not in ('0', 'false', 'no')
+LATEX_FORMAT_DIR = os.getenv('LATEX_FORMAT_DIR') or os.path.join(tempfile.gettempdir(), 'niti_ai_formats')
+LATEX_FORMAT_MIN_USES = int(os.getenv('LATEX_FORMAT_MIN_USES', '2'))
+LATEX_FORMAT_MAX = int(os.getenv('LATEX_FORMAT_MAX', '20'))
+
+# Use counts are only kept for this many distinct preambles at a time
+MAX_TRACKED_PREAMBLES = 1000
+
+_BEGIN_DOCUMENT = re.compile(r'\\begin\s*\{document\}')
+_COMMENT = re.compile(r'(?<!\\)%[^\n]*')
+_WHITESPACE = re.compile(r'\s+')
+
+# pdfTeX state that lives outside the format (the glyph-to-unicode table),
+# so it has to run again after the format is loaded
+_RUNTIME_COMMANDS = re.compile(r'\\input\s*\{glyphtounicode\}|\\pdfgentounicode\s*=\s*\d')
+
+# pdfTeX / MiKTeX messages for a format that could not be loaded or used
+_FORMAT_ERRORS = re.compile(
+    r"can't find the format"
+    r"|Fatal format file error"
+    r"|made by different executable version"
+    r"|memory dump file"
+    r"|^l\.\d+ .*\\endofdump",
+    re.MULTILINE | re.IGNORECASE
+)
+
+
+def split_preamble(latex_code: str) -> Optional[tuple]:
+    """(preamble, body) split at \\begin{document}, or None without one"""
+    match = _BEGIN_DOCUMENT.search(latex_code)
+    if not match:
+        return None
+    return latex_code[:match.start()], latex_code[match.start():]
+
+
+def format_load_failed(output: str) -> bool:
+    """Whether a failed compile's output or log shows the format itself didn't work"""
+    return bool(_FORMAT_ERRORS.search(output or ''))
+
+
+def preamble_key(preamble: str, compiler_version: str) -> str:
+    """Hash of the preamble ignoring comments and whitespace, tied to the compiler build"""
+    canonical = _WHITESPACE.sub('', _COMMENT.sub('', preamble))
+    digest = hashlib.sha256()
+    digest.update(compiler_version.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(canonical.encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+class PreambleFormat:
+    """A dumped format that can stand in for one preamble"""
+
+    def __init__(self, key: str, directory: str):
+        self.key = key
+        self.name = f"resume-{key}"
+        self.directory = directory
+
+    @property
+    def path(self) -> str:
+        return os.path.join(self.directory, f"{self.name}.fmt")
+
+    def args(self) -> list:
+        # A full path works with both TeX Live and MiKTeX (which ignores TEXFORMATS)
+        return [f"-fmt={self.path}"]
+
+    def rewrite(self, latex_code: str) -> str:
+        """Source for compiling against this format.
+
+        mylatexformat skips the preamble up to \\endofdump, so only the
+        commands that must run at runtime are placed after it. Nothing adds
+        a line, so log line numbers still point into the original source.
+        """
+        preamble, body = split_preamble(latex_code)
+        runtime = ''.join(match.group(0) for match in _RUNTIME_COMMANDS.finditer(preamble))
+        return f"{preamble}\\endofdump{runtime}{body}"
+
+
+class FormatCache:
+    """Tracks preamble usage, dumps formats in the background and hands out ready ones"""
+
+    def __init__(self, directory: str = LATEX_FORMAT_DIR, min_uses: int = LATEX_FORMAT_MIN_USES,
+                 max_formats: int = LATEX_FORMAT_MAX, enabled: bool = LATEX_FORMAT_ENABLED):
+        self.directory = directory
+        self.min_uses = min_uses
+        self.max_formats = max_formats
+        self.enabled = enabled
+        self.hits = 0
+        self.fallbacks = 0
+        self._uses = {}
+        self._ready = {}       # key -> PreambleFormat
+        self._building = set()
+        self._failed = set()
+        self._lock = threading.Lock()
+
+        if self.enabled:
+            os.makedirs(self.directory, exist_ok=True)
+            for name in os.listdir(self.directory):
+                if name.startswith('resume-') and name.endswith('.fmt'):
+                    key = name[len('resume-'):-len('.fmt')]
+                    self._ready[key] = PreambleFormat(key, self.directory)
+
+    def lookup(self, latex_code: str, compiler: CompilerInfo) -> Optional[PreambleFormat]:
+        """The ready format for this source's preamble, if any.
+
+        Also counts the preamble's use and starts dumping a format for it
+        once it has been seen min_uses times.
+        """
+        if not self.enabled:
+            return None
+        parts = split_preamble(latex_code)
+        if parts is None:
+            return None
+        key = preamble_key(parts[0], compiler.version)
+
+        with self._lock:
+            fmt = self._ready.get(key)
+            if fmt is not None:
+                self.hits += 1
+                return fmt
+            if key in self._building or key in self._failed:
+                return None
+            if len(self._uses) >= MAX_TRACKED_PREAMBLES and key not in self._uses:
+                self._uses.clear()
+            self._uses[key] = self._uses.get(key, 0) + 1
+            if self._uses[key] < self.min_uses:
+                return None
+            self._building.add(key)
+
+        self._start_build(key, parts[0], compiler)
+        return None
+
+    def prepare(self, preamble: str, compiler: CompilerInfo):
+        """Dump a format for a known preamble ahead of its first compile"""
+        if not self.enabled:
+            return
+        key = preamble_key(preamble, compiler.version)
+        with self._lock:
+            if key in self._ready or key in self._building or key in self._failed:
+                return
+            self._building.add(key)
+        self._start_build(key, preamble, compiler)
+
+    def _start_build(self, key: str, preamble: str, compiler: CompilerInfo):
+        threading.Thread(target=self._build, args=(key, preamble, compiler),
+                         name=f"latex-format-{key[:8]}", daemon=True).start()
+
+    def report_failure(self, fmt: PreambleFormat):
+        """fmt could not be loaded or used for a compile; stop using it"""
+        with self._lock:
+            self.fallbacks += 1
+            self._ready.pop(fmt.key, None)
+            self._failed.add(fmt.key)
+        try:
+            os.remove(fmt.path)
+        except OSError:
+            pass
+
+    def _build(self, key: str, preamble: str, compiler: CompilerInfo):
+        fmt = PreambleFormat(key, self.directory)
+        build_dir = tempfile.mkdtemp(prefix='fmt-', dir=self.directory)
+        try:
+            dump_source = _RUNTIME_COMMANDS.sub('', preamble) + "\n\\begin{document}\n\\end{document}\n"
+            with open(os.path.join(build_dir, 'preamble.tex'), 'w', encoding='utf-8') as f:
+                f.write(dump_source)
+
+            args = [compiler.path, "-ini", f"-jobname={fmt.name}", "-interaction=nonstopmode"]
+            if compiler.is_miktex:
+                args.append("--disable-installer")
+            args += ["&pdflatex", "mylatexformat.ltx", "preamble.tex"]
+
+            logger.info("🧱 Dumping TeX format %s...", fmt.name)
+            result = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                    text=True, timeout=120, cwd=build_dir)
+            built = os.path.join(build_dir, f"{fmt.name}.fmt")
+            if result.returncode != 0 or not os.path.exists(built):
+                logger.warning("⚠️ Could not dump TeX format %s (return code %s); compiling this preamble normally",
+                               fmt.name, result.returncode)
+                with self._lock:
+                    self._failed.add(key)
+                return
+
+            os.replace(built, fmt.path)
+            with self._lock:
+                self._ready[key] = fmt
+                self._evict()
+            logger.info("✅ TeX format ready: %s", fmt.path)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            logger.warning("⚠️ Could not dump TeX format %s: %s", fmt.name, e)
+            with self._lock:
+                self._failed.add(key)
+        finally:
+            with self._lock:
+                self._building.discard(key)
+            shutil.rmtree(build_dir, ignore_errors=True)
+
+    def _evict(self):
+        """Keep at most max_formats on disk, dropping the oldest files (lock held)"""
+        while len(self._ready) > self.max_formats:
+            oldest = min(self._ready.values(), key=lambda f: os.path.getmtime(f.path) if os.path.exists(f.path) else 0)
+            del self._ready[oldest.key]
+            try:
+                os.remove(oldest.path)
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'ready': len(self._ready),
+                'building': len(self._building),
+                'failed': len(self._failed),
+                'hits': self.hits,
+                'fallbacks': self.fallbacks
+            }
+
+
+latex_formats = FormatCache()
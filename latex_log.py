@@ -0,0 +1,207 @@
+import difflib
+import os
+import re
+from typing import Optional
+
+from resume_template import RESUME_PREAMBLE
+from latex_validator import defined_macros
+
+
+# Structured errors from a pdflatex log, plus the cheap local fixes for the
+# ones with a mechanical cause. Whatever is left is handed to the LLM as a
+# small excerpt around the error (see excerpt_bounds).
+
+MAX_LOG_ERRORS = 10
+
+# (pattern on the "! ..." line, error type); the first match wins
+_ERROR_TYPES = [
+    (re.compile(r'Undefined control sequence'), 'undefined_macro'),
+    (re.compile(r"LaTeX Error: File `([^']+)' not found"), 'missing_file'),
+    (re.compile(r'LaTeX Error: Environment (\S+) undefined'), 'undefined_environment'),
+    (re.compile(r'LaTeX Error: \\begin\{([^}]*)\} on input line \d+ ended by \\end\{[^}]*\}'), 'environment_mismatch'),
+    (re.compile(r'Lonely \\item'), 'lonely_item'),
+    (re.compile(r'Misplaced alignment tab character'), 'misplaced_alignment'),
+    (re.compile(r'Missing \$ inserted'), 'missing_dollar'),
+    (re.compile(r"Missing \} inserted|Extra \}|Too many \}'s|Missing \{ inserted"), 'brace'),
+    (re.compile(r'Runaway argument|File ended while scanning'), 'runaway_argument'),
+    (re.compile(r'Emergency stop|Fatal error'), 'fatal'),
+]
+_ERROR_LINE = re.compile(r'^! (.*)$', re.MULTILINE)
+_USEPACKAGE = re.compile(r'\\usepackage\s*(\[[^\]]*\])?\s*\{([^{}]*)\}([ \t]*\n?)')
+_LINE_CONTEXT = re.compile(r'^l\.(\d+) ?(.*)$', re.MULTILINE)
+_TRAILING_MACRO = re.compile(r'\\([a-zA-Z@]+)\s*$')
+
+# Commands the template uses in the body; candidates when a macro name is misspelled
+COMMON_COMMANDS = {
+    'textbf', 'textit', 'emph', 'underline', 'href', 'url', 'item', 'section',
+    'small', 'large', 'Large', 'Huge', 'scshape', 'vspace', 'hspace', 'raisebox',
+    'height', 'textwidth', 'faEnvelope', 'faPhone', 'faLinkedin', 'faGithub',
+    'faGlobe', 'faMapMarker', 'newline', 'linebreak', 'textbar', 'quad', 'hfill'
+}
+KNOWN_COMMANDS = set(re.findall(r'\\([a-zA-Z@]+)', RESUME_PREAMBLE)) | COMMON_COMMANDS
+KNOWN_ENVIRONMENTS = {'itemize', 'enumerate', 'description', 'center', 'tabular', 'tabular*', 'minipage', 'multicols'}
+
+# Math and arguments where _ and ^ are legal
+_TEXT_SAFE = re.compile(
+    r'\$[^$]*\$'
+    r'|\\\(.*?\\\)'
+    r'|\\(?:href|url|label|ref|input|include|includegraphics)\s*(?:\[[^\]]*\])?\s*\{[^{}]*\}'
+    r'|\\.'
+    r'|[_^]',
+    re.DOTALL
+)
+
+
+def read_log(job_dir: str, fallback: str = '') -> str:
+    """The job's output.log, or fallback (the captured stdout) when there is none"""
+    try:
+        with open(os.path.join(job_dir, 'output.log'), 'r', encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return fallback
+
+
+def parse_log(log_text: str) -> list:
+    """Errors from a TeX log as dicts with type, message, line, macro and context.
+
+    context is the source text TeX had read when it stopped (the "l.N"
+    line), macro the offending control sequence, file or environment.
+    """
+    errors = []
+    seen = set()
+    for match in _ERROR_LINE.finditer(log_text or ''):
+        message = match.group(1).strip()
+        error_type, macro = 'other', None
+        for pattern, name in _ERROR_TYPES:
+            found = pattern.search(message)
+            if found:
+                error_type = name
+                macro = found.group(1) if found.groups() else None
+                break
+
+        line, context = None, ''
+        # The "l.N" line follows within the next few lines of the error
+        location = _LINE_CONTEXT.search(log_text, match.end(), match.end() + 1000)
+        if location and not _ERROR_LINE.search(log_text, match.end(), location.start()):
+            line = int(location.group(1))
+            context = location.group(2).lstrip('.').strip()
+        if error_type == 'undefined_macro' and context:
+            trailing = _TRAILING_MACRO.search(context)
+            macro = trailing.group(1) if trailing else None
+
+        if error_type == 'fatal' and errors:
+            continue
+        key = (error_type, line, macro, context)
+        if key in seen:
+            continue
+        seen.add(key)
+        errors.append({'type': error_type, 'message': message, 'line': line, 'macro': macro, 'context': context})
+        if len(errors) >= MAX_LOG_ERRORS:
+            break
+    return errors
+
+
+def describe_error(error: dict) -> str:
+    where = f"line {error['line']}: " if error.get('line') else ''
+    detail = f" ({error['macro']})" if error.get('macro') else ''
+    return f"{where}{error['message']}{detail}"
+
+
+def _escape_text_specials(latex_code: str) -> str:
+    """Escape _ and ^ in the document body outside math and URL/label arguments"""
+    begin = latex_code.find('\\begin{document}')
+    if begin < 0:
+        return latex_code
+
+    def escape(match):
+        token = match.group(0)
+        if token == '_':
+            return '\\_'
+        if token == '^':
+            return '\\^{}'
+        return token
+
+    return latex_code[:begin] + _TEXT_SAFE.sub(escape, latex_code[begin:])
+
+
+def _remove_package(latex_code: str, package: str) -> str:
+    def drop(match):
+        names = [name.strip() for name in match.group(2).split(',')]
+        if package not in names:
+            return match.group(0)
+        kept = [name for name in names if name != package]
+        return f"\\usepackage{match.group(1) or ''}{{{','.join(kept)}}}{match.group(3)}" if kept else ''
+
+    return _USEPACKAGE.sub(drop, latex_code)
+
+
+def local_fixes(latex_code: str, errors: list) -> tuple:
+    """Apply the mechanical fixes the errors call for; returns (latex_code, notes)"""
+    notes = []
+    known = KNOWN_COMMANDS | defined_macros(latex_code)
+    for error in errors:
+        error_type, macro = error['type'], error.get('macro')
+
+        if error_type == 'missing_dollar':
+            fixed = _escape_text_specials(latex_code)
+            if fixed != latex_code:
+                latex_code = fixed
+                notes.append("escaped _ and ^ in text")
+
+        elif error_type == 'undefined_macro' and macro:
+            match = difflib.get_close_matches(macro, known - {macro}, n=1, cutoff=0.75)
+            if match:
+                latex_code = re.sub(r'\\' + re.escape(macro) + r'(?![a-zA-Z@])',
+                                    lambda m: '\\' + match[0], latex_code)
+                notes.append(f"replaced \\{macro} with \\{match[0]}")
+
+        elif error_type == 'undefined_environment' and macro:
+            match = difflib.get_close_matches(macro, KNOWN_ENVIRONMENTS, n=1, cutoff=0.75)
+            if match:
+                latex_code = re.sub(r'\\(begin|end)\s*\{' + re.escape(macro) + r'\}',
+                                    lambda m: f"\\{m.group(1)}{{{match[0]}}}", latex_code)
+                notes.append(f"replaced environment {macro} with {match[0]}")
+
+        elif error_type == 'missing_file' and macro and macro.endswith('.sty'):
+            package = macro[:-len('.sty')]
+            fixed = _remove_package(latex_code, package)
+            if fixed != latex_code:
+                latex_code = fixed
+                notes.append(f"removed the unavailable package {package}")
+
+    return latex_code, list(dict.fromkeys(notes))
+
+
+def excerpt_bounds(latex_code: str, error: dict, size: int) -> Optional[tuple]:
+    """(start, end) of about size characters of latex_code around error, or None if it can't be placed.
+
+    The error is placed by its line number and the text TeX had read
+    (needed for one-line documents); the bounds are moved to the start of
+    a control sequence so the excerpt doesn't begin or end mid-command.
+    """
+    if not error.get('line'):
+        return None
+    lines = latex_code.split('\n')
+    if error['line'] > len(lines):
+        return None
+    line_start = sum(len(line) + 1 for line in lines[:error['line'] - 1])
+    line_text = lines[error['line'] - 1]
+
+    position = line_start
+    context = error.get('context') or ''
+    for length in (40, 20, 10):
+        tail = context[-length:]
+        found = line_text.rfind(tail) if tail else -1
+        if found >= 0:
+            position = line_start + found + len(tail)
+            break
+
+    start = max(0, position - size // 2)
+    end = min(len(latex_code), start + size)
+    if start > 0:
+        backslash = latex_code.rfind('\\', 0, start)
+        start = backslash if backslash >= 0 and start - backslash < 200 else start
+    if end < len(latex_code):
+        backslash = latex_code.find('\\', end)
+        end = backslash if 0 <= backslash and backslash - end < 200 else end
+    return start, end
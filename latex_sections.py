@@ -0,0 +1,121 @@
+import re
+from typing import Optional
+
+
+# Section-level view of a resume's LaTeX. Splits the document body into the
+# heading block and one block per \section{...} (together with the
+# %-----------NAME----------- marker comment in front of it, if any), so a
+# single section can be replaced without resending the whole document.
+
+HEADING_SECTION = 'heading'
+HEADING_ALIASES = {'heading', 'header', 'contact', 'contact info', 'name'}
+
+_BEGIN_DOCUMENT = re.compile(r'\\begin\s*\{document\}')
+_END_DOCUMENT = re.compile(r'\\end\s*\{document\}')
+# A \section header, optionally preceded by its marker comment line
+_SECTION_START = re.compile(
+    r'(?:^[ \t]*%-{3,}[^\n]*-{3,}[ \t]*\n[ \t]*)?\\section\*?\s*\{([^{}]*)\}',
+    re.MULTILINE
+)
+_SECTION_HEADER = re.compile(r'^\s*(?:%[^\n]*\n\s*)?\\section\*?\s*\{[^{}]*\}')
+
+
+class SectionError(ValueError):
+    """The section can't be found or the replacement doesn't fit"""
+
+
+class Section:
+    def __init__(self, name: str, start: int, end: int):
+        self.name = name
+        self.start = start
+        self.end = end
+
+
+def find_sections(latex_code: str) -> list:
+    """Heading block plus one Section per \\section, in document order"""
+    begin = _BEGIN_DOCUMENT.search(latex_code)
+    end = _END_DOCUMENT.search(latex_code)
+    if not begin or not end or end.start() < begin.end():
+        raise SectionError("the document has no \\begin{document} ... \\end{document} body")
+
+    body_start, body_end = begin.end(), end.start()
+    starts = [(match.start(), match.group(1).strip())
+              for match in _SECTION_START.finditer(latex_code, body_start, body_end)]
+
+    sections = [Section(HEADING_SECTION, body_start, starts[0][0] if starts else body_end)]
+    for i, (start, name) in enumerate(starts):
+        stop = starts[i + 1][0] if i + 1 < len(starts) else body_end
+        sections.append(Section(name, start, stop))
+    return sections
+
+
+def _key(name: str) -> str:
+    return re.sub(r'[^a-z0-9]+', ' ', name.lower()).strip()
+
+
+def locate_section(sections: list, name: str) -> Optional[Section]:
+    """Match a section by exact title, then by a unique partial title ("skills" -> "Technical Skills")"""
+    key = _key(name)
+    if key in HEADING_ALIASES:
+        return sections[0]
+
+    named = sections[1:]
+    exact = [s for s in named if _key(s.name) == key]
+    if exact:
+        return exact[0]
+    partial = [s for s in named if key and (key in _key(s.name) or _key(s.name) in key)]
+    return partial[0] if len(partial) == 1 else None
+
+
+def _braces_balanced(text: str) -> bool:
+    depth = 0
+    for match in re.finditer(r'\\.|[{}]', text, re.DOTALL):
+        token = match.group(0)
+        if token == '{':
+            depth += 1
+        elif token == '}':
+            depth -= 1
+            if depth < 0:
+                return False
+    return depth == 0
+
+
+def patch_section(latex_code: str, name: str, new_content: str) -> str:
+    """Replace one section of latex_code and return the new document.
+
+    new_content may include the \\section{...} header or just the section
+    body (the existing header is kept). An empty new_content removes the
+    section; a name that doesn't exist yet is appended before
+    \\end{document} if new_content brings its own \\section header.
+    """
+    if not _braces_balanced(new_content):
+        raise SectionError("new_content has unbalanced braces")
+
+    sections = find_sections(latex_code)
+    section = locate_section(sections, name)
+    new_block = new_content.strip()
+
+    if section is None:
+        if not _SECTION_HEADER.match(new_block):
+            available = ', '.join([HEADING_SECTION] + [s.name for s in sections[1:]])
+            raise SectionError(f"no section matches '{name}'; available sections: {available}")
+        insert_at = sections[-1].end
+        return f"{latex_code[:insert_at].rstrip()}\n\n{new_block}\n\n{latex_code[insert_at:].lstrip()}"
+
+    old_block = latex_code[section.start:section.end]
+    if new_block and section.name != HEADING_SECTION and not _SECTION_HEADER.match(new_block):
+        header = _SECTION_HEADER.match(old_block)
+        new_block = f"{header.group(0).strip()}\n{new_block}"
+
+    # Keep the whitespace that separated the old block from what follows
+    trailing = old_block[len(old_block.rstrip()):]
+    if section.name == HEADING_SECTION:
+        leading = old_block[:len(old_block) - len(old_block.lstrip())]
+        return latex_code[:section.start] + leading + new_block + (trailing or '\n') + latex_code[section.end:]
+    if not new_block:
+        return latex_code[:section.start] + latex_code[section.end:]
+    return latex_code[:section.start] + new_block + (trailing or '\n') + latex_code[section.end:]
+
+
+def section_names(latex_code: str) -> list:
+    return [s.name for s in find_sections(latex_code)]
@@ -0,0 +1,314 @@
+import re
+from collections import OrderedDict
+
+from resume_template import RESUME_PREAMBLE
+
+
+# Static checks run on LLM-written LaTeX before it is handed to pdflatex.
+# One linear scan over the source tracks braces, environments and the
+# template's list macros; problems with an obvious fix (unescaped & % #,
+# unclosed lists, a missing \end{document}, a miscased template macro) are
+# repaired in place, anything else is reported so the compile can be skipped.
+# Math and \verb|...| are exempt from the & # escaping.
+
+# Token order matters: environments and control words before bare symbols
+_TOKEN = re.compile(
+    r'\\(begin|end)\s*\{([^{}]*)\}'
+    r'|\\([a-zA-Z@]+)\*?'
+    r'|\\.'
+    r'|%[^\n]*'
+    r'|\$\$?'
+    r'|[{}&#]',
+    re.DOTALL
+)
+# Math delimiters: opener -> closer; & and # are not escaped in math
+MATH_DELIMITERS = {'$': '$', '$$': '$$', '\\(': '\\)', '\\[': '\\]'}
+_DEFINED_NAME = re.compile(r'\s*\*?\s*\{?\s*\\([a-zA-Z@]+)')
+_MARKER_COMMENT = re.compile(r'%-{3,}[A-Za-z &]*-{3,}')
+
+DEFINING_COMMANDS = {'newcommand', 'renewcommand', 'providecommand', 'DeclareRobustCommand', 'def', 'let'}
+# Macros whose first argument is a URL, where & % # are legal
+URL_COMMANDS = {'href', 'url'}
+# Environments where & separates columns
+ALIGNMENT_ENVIRONMENTS = {
+    'tabular', 'tabular*', 'tabularx', 'array', 'longtable', 'align', 'align*',
+    'alignat', 'eqnarray', 'matrix', 'pmatrix', 'bmatrix', 'cases', 'split'
+}
+LIST_ENVIRONMENTS = {'itemize', 'enumerate', 'description'}
+# The template's list macros open and close itemize environments
+LIST_MACROS = {
+    'resumeItemListStart': 'resumeItemListEnd',
+    'resumeSubHeadingListStart': 'resumeSubHeadingListEnd',
+}
+LIST_MACRO_ENDS = {end: start for start, end in LIST_MACROS.items()}
+# Macros that expand to \item and so only work inside a list
+ITEM_COMMANDS = {'item', 'resumeItem', 'resumeSubheading', 'resumeProjectHeading'}
+
+# The template's own macros are all named \resume...
+CUSTOM_MACRO_PREFIX = 'resume'
+
+MAX_REPORTED_ERRORS = 5
+
+
+def defined_macros(latex_code: str) -> set:
+    """Names defined with \\newcommand, \\def, ... anywhere in latex_code"""
+    names = set()
+    for match in re.finditer(r'\\(' + '|'.join(DEFINING_COMMANDS) + r')(?![a-zA-Z])', latex_code):
+        name = _DEFINED_NAME.match(latex_code, match.end())
+        if name:
+            names.add(name.group(1))
+    return names
+
+
+TEMPLATE_MACROS = defined_macros(RESUME_PREAMBLE)
+
+
+def _context(text: str, pos: int) -> str:
+    snippet = text[max(0, pos - 25):pos + 25].replace('\n', ' ')
+    return f"...{snippet}..."
+
+
+def _skip_group(text: str, pos: int) -> int:
+    """End of the brace group starting at or after pos (whitespace allowed before it), or pos"""
+    start = pos
+    while start < len(text) and text[start] in ' \t':
+        start += 1
+    if start >= len(text) or text[start] != '{':
+        return pos
+    depth = 0
+    i = start
+    while i < len(text):
+        char = text[i]
+        if char == '\\':
+            i += 2
+            continue
+        if char == '{':
+            depth += 1
+        elif char == '}':
+            depth -= 1
+            if depth == 0:
+                return i + 1
+        i += 1
+    return pos
+
+
+def _closer(entry) -> str:
+    kind, name, _ = entry
+    return f"\\{LIST_MACROS[name]}" if kind == 'macro' else f"\\end{{{name}}}"
+
+
+def _is_list(entry) -> bool:
+    kind, name, _ = entry
+    return kind == 'macro' or name in LIST_ENVIRONMENTS
+
+
+def validate_latex(latex_code: str, repair: bool = True) -> dict:
+    """Check latex_code in one pass.
+
+    Returns a dict with 'valid' (no errors left), 'latex_code' (repaired
+    when repair is True, otherwise unchanged), 'errors' and 'repairs'.
+    """
+    errors = []
+    repairs = OrderedDict()
+    edits = []   # (position, characters to drop, text to insert)
+
+    def fix(pos, drop, insert, note):
+        edits.append((pos, drop, insert))
+        repairs[note] = repairs.get(note, 0) + 1
+
+    text = latex_code
+    defined = defined_macros(text)
+    braces = []
+    environments = []   # (kind, name, position); kind is 'env' or 'macro'
+    in_body = False
+    saw_documentclass = False
+    body_defines = False
+    end_document = None
+    math = None   # closing delimiter of the math mode we're in
+
+    def close_lists(pos, note):
+        while environments and _is_list(environments[-1]):
+            fix(pos, 0, _closer(environments.pop()), note)
+
+    pos = 0
+    while True:
+        match = _TOKEN.search(text, pos)
+        if not match:
+            break
+        token = match.group(0)
+        start = match.start()
+        pos = match.end()
+
+        if match.group(1):
+            if not in_body and match.group(2).strip() != 'document':
+                # Preamble definitions open and close environments on purpose
+                continue
+            action, name = match.group(1), match.group(2).strip()
+            if name == 'document':
+                if action == 'begin':
+                    in_body = True
+                else:
+                    end_document = start
+                    close_lists(start, "closed an unfinished list before \\end{document}")
+                    while environments:
+                        fix(start, 0, _closer(environments.pop()), "closed an unfinished environment before \\end{document}")
+                    break
+                continue
+            if action == 'begin':
+                environments.append(('env', name, start))
+                continue
+            if environments and environments[-1][:2] == ('env', name):
+                environments.pop()
+            elif any(entry[:2] == ('env', name) for entry in environments):
+                while environments[-1][:2] != ('env', name):
+                    entry = environments.pop()
+                    if _is_list(entry):
+                        fix(start, 0, _closer(entry), f"closed an unfinished list before \\end{{{name}}}")
+                    else:
+                        errors.append(f"\\begin{{{entry[1]}}} is never closed before \\end{{{name}}}: {_context(text, entry[2])}")
+                environments.pop()
+            elif name in LIST_ENVIRONMENTS:
+                fix(start, pos - start, '', f"removed a stray \\end{{{name}}}")
+            else:
+                errors.append(f"\\end{{{name}}} without a matching \\begin: {_context(text, start)}")
+            continue
+
+        command = match.group(3)
+        if command:
+            if command == 'verb':
+                # \verb|...| is literal: skip to its closing delimiter on the same line
+                line_end = text.find('\n', pos)
+                end = text.find(text[pos:pos + 1], pos + 1, len(text) if line_end == -1 else line_end)
+                if pos < len(text) and end != -1:
+                    pos = end + 1
+            elif command == 'documentclass':
+                saw_documentclass = True
+            elif command in DEFINING_COMMANDS:
+                body_defines = body_defines or in_body
+            elif command in URL_COMMANDS:
+                pos = _skip_group(text, pos)
+            elif in_body:
+                if command not in defined and (command in TEMPLATE_MACROS or command.startswith(CUSTOM_MACRO_PREFIX)):
+                    known = {name.lower(): name for name in defined}
+                    if command.lower() in known:
+                        fix(start + 1, len(command), known[command.lower()],
+                            f"corrected \\{command} to \\{known[command.lower()]}")
+                        command = known[command.lower()]
+                    elif command in TEMPLATE_MACROS:
+                        errors.append(f"\\{command} is used but its \\newcommand is missing from the preamble")
+                    else:
+                        errors.append(f"undefined macro \\{command}: {_context(text, start)}")
+
+                if command in LIST_MACROS:
+                    environments.append(('macro', command, start))
+                elif command in LIST_MACRO_ENDS:
+                    opener = LIST_MACRO_ENDS[command]
+                    if environments and environments[-1][:2] == ('macro', opener):
+                        environments.pop()
+                    elif any(entry[:2] == ('macro', opener) for entry in environments):
+                        while environments[-1][:2] != ('macro', opener):
+                            entry = environments.pop()
+                            if _is_list(entry):
+                                fix(start, 0, _closer(entry), f"closed an unfinished list before \\{command}")
+                            else:
+                                errors.append(f"\\begin{{{entry[1]}}} is never closed before \\{command}: {_context(text, entry[2])}")
+                        environments.pop()
+                    else:
+                        fix(start, pos - start, '', f"removed a stray \\{command}")
+                elif command == 'section':
+                    close_lists(start, "closed an unfinished list before the next \\section")
+                elif command in ITEM_COMMANDS and not any(_is_list(entry) for entry in environments):
+                    errors.append(f"\\{command} outside a list: {_context(text, start)}")
+            continue
+
+        if token == '{':
+            braces.append(start)
+        elif token == '}':
+            if braces:
+                braces.pop()
+            else:
+                errors.append(f"unmatched '}}': {_context(text, start)}")
+        elif token.startswith('%'):
+            after_number = start > 0 and text[start - 1].isdigit()
+            if in_body and after_number:
+                # "improved by 30%": the rest of a one-line document would be a comment
+                fix(start, 0, '\\', "escaped '%'")
+                pos = start + 1
+            elif '\\end{document}' in token:
+                marker = _MARKER_COMMENT.match(token)
+                if marker:
+                    fix(start + marker.end(), 0, '\n', "ended a section marker comment that hid the rest of its line")
+                else:
+                    fix(start, 0, '\\', "escaped '%'")
+                pos = start + (marker.end() if marker else 1)
+        elif token == '&':
+            # & is legal in math (aligned, array, ...) and in alignment environments
+            if in_body and math is None and not any(entry[0] == 'env' and entry[1] in ALIGNMENT_ENVIRONMENTS for entry in environments):
+                fix(start, 0, '\\', "escaped '&'")
+        elif token == '#':
+            if in_body and math is None and not (body_defines and text[pos:pos + 1].isdigit()):
+                fix(start, 0, '\\', "escaped '#'")
+        elif math is None:
+            if token in MATH_DELIMITERS:
+                math = MATH_DELIMITERS[token]
+        elif token == math:
+            math = None
+
+    if not saw_documentclass:
+        errors.append("no \\documentclass")
+    if not in_body:
+        errors.append("no \\begin{document}")
+    elif end_document is None:
+        tail = len(text)
+        close_lists(tail, "closed an unfinished list before \\end{document}")
+        while environments:
+            fix(tail, 0, _closer(environments.pop()), "closed an unfinished environment before \\end{document}")
+        fix(tail, 0, '\n\\end{document}', "added the missing \\end{document}")
+    for brace in braces:
+        errors.append(f"unclosed '{{': {_context(text, brace)}")
+
+    if repair and edits:
+        parts = []
+        last = 0
+        for position, drop, insert in sorted(edits, key=lambda edit: edit[0]):
+            parts.append(text[last:position])
+            parts.append(insert)
+            last = position + drop
+        parts.append(text[last:])
+        text = ''.join(parts)
+
+    errors = list(OrderedDict.fromkeys(errors))
+    if len(errors) > MAX_REPORTED_ERRORS:
+        errors = errors[:MAX_REPORTED_ERRORS] + [f"... and {len(errors) - MAX_REPORTED_ERRORS} more"]
+
+    return {
+        'valid': not errors,
+        'latex_code': text if repair else latex_code,
+        'errors': errors,
+        'repairs': [note if count == 1 else f"{note} (x{count})" for note, count in repairs.items()]
+    }
+
+
+# (description, body, body after validation); run with python latex_validator.py
+CHECKS = [
+    ("& in text is escaped", "R&D team", "R\\&D team"),
+    ("& in a tabular is kept", "\\begin{tabular}{ll}a & b\\end{tabular}", "\\begin{tabular}{ll}a & b\\end{tabular}"),
+    ("% after a number is escaped", "cut costs by 30% a year", "cut costs by 30\\% a year"),
+    ("& in inline math is kept", "$\\begin{aligned} a &= b \\end{aligned}$ R&D",
+     "$\\begin{aligned} a &= b \\end{aligned}$ R\\&D"),
+    ("& in \\(...\\) math is kept", "\\(\\begin{aligned} x &= 1 \\end{aligned}\\) R&D",
+     "\\(\\begin{aligned} x &= 1 \\end{aligned}\\) R\\&D"),
+    ("\\verb content is literal", "\\verb|a&b 50%#{| then R&D", "\\verb|a&b 50%#{| then R\\&D"),
+]
+
+
+if __name__ == '__main__':
+    preamble = "\\documentclass{article}\n\\begin{document}\n"
+    failed = 0
+    for description, body, expected in CHECKS:
+        result = validate_latex(preamble + body + "\n\\end{document}")
+        got = result['latex_code'][len(preamble):-len("\n\\end{document}")]
+        ok = result['valid'] and got == expected
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {description}" + ('' if ok else f": got {got!r}, errors {result['errors']}"))
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,311 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Iterator, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, messages_from_dict, messages_to_dict
+
+
+# Exact-match cache of LLM responses. Resent messages, double-clicked Send
+# and new conversations opened with the same template starter all produce a
+# prompt that was already answered; those are served from an in-memory LRU
+# (and optionally a SQLite tier shared across restarts) instead of a new
+# provider round trip. Cached tool calls come back as a normal AIMessage,
+# so write_latex and the compile run exactly as for a fresh answer.
+
+LLM_CACHE_ENABLED = os.getenv('LLM_CACHE', '1') != '0'
+LLM_CACHE_SIZE = int(os.getenv('LLM_CACHE_SIZE', '256'))
+LLM_CACHE_TTL_SECONDS = float(os.getenv('LLM_CACHE_TTL_SECONDS', '3600'))
+LLM_CACHE_DB = os.getenv('LLM_CACHE_DB', '')   # SQLite file for the second tier; empty disables it
+# Above this temperature answers are meant to vary, so they are never cached
+LLM_CACHE_MAX_TEMPERATURE = float(os.getenv('LLM_CACHE_MAX_TEMPERATURE', '0.7'))
+
+# How long a request waits for an identical one already in flight
+INFLIGHT_WAIT_SECONDS = 60
+
+
+def _normalize(content) -> str:
+    text = content if isinstance(content, str) else json.dumps(content, sort_keys=True)
+    return text.replace('\r\n', '\n').strip()
+
+
+def _canonical(message) -> list:
+    # Registry prompts (prompt_registry.py) carry their content hash in the id
+    if message.type == 'system' and (message.id or '').startswith('prompt-'):
+        return [message.type, message.id, []]
+    return [message.type, _normalize(message.content), getattr(message, 'tool_calls', None) or []]
+
+
+def cache_key(model_name: str, temperature: Optional[float], tools, messages: list) -> str:
+    """Hash of the model settings, bound tools and messages (system prompt, history, user message)"""
+    payload = json.dumps({
+        'model': model_name,
+        'temperature': temperature,
+        'tools': sorted(tools or []),
+        'messages': [_canonical(message) for message in messages],
+    }, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class SQLiteResponseTier:
+    """Cached responses in SQLite, so they survive restarts and are shared between processes"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            response TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        );
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[tuple]:
+        row = self._connect().execute(
+            'SELECT response, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, key: str, response: dict, expires_at: float):
+        with self._connect() as conn:
+            conn.execute('INSERT OR REPLACE INTO llm_cache (key, response, expires_at) VALUES (?, ?, ?)',
+                         (key, json.dumps(response, ensure_ascii=False), expires_at))
+            conn.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (time.time(),))
+
+
+class LLMResponseCache:
+    """In-memory LRU of serialized responses with a TTL, backed by an optional SQLite tier"""
+
+    def __init__(self, max_entries: int = LLM_CACHE_SIZE, ttl_seconds: float = LLM_CACHE_TTL_SECONDS,
+                 db_path: str = LLM_CACHE_DB, max_temperature: float = LLM_CACHE_MAX_TEMPERATURE):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_temperature = max_temperature
+        self.disk = SQLiteResponseTier(db_path) if db_path else None
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._entries = OrderedDict()   # key -> (expires_at, serialized AIMessage)
+        self._inflight = {}             # key -> Event set when its first request finishes
+        self._lock = threading.Lock()
+
+    def cacheable(self, temperature: Optional[float]) -> bool:
+        return temperature is None or temperature <= self.max_temperature
+
+    def get(self, key: str) -> Optional[AIMessage]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return messages_from_dict([entry[1]])[0]
+            if entry:
+                del self._entries[key]
+
+        stored = self.disk.get(key) if self.disk else None
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._remember(key, stored[0], stored[1])
+        return messages_from_dict([stored[0]])[0]
+
+    def _remember(self, key: str, response: dict, expires_at: float):
+        """Add to the LRU (lock held)"""
+        self._entries[key] = (expires_at, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def put(self, key: str, response):
+        """Store a response unless it is empty (nothing said, no tool called)"""
+        tool_calls = getattr(response, 'tool_calls', None) or []
+        if not response.content and not tool_calls:
+            return
+        # No usage_metadata: a hit spends no provider tokens and must not be counted as if it did
+        message = AIMessage(content=response.content, tool_calls=tool_calls)
+        serialized = messages_to_dict([message])[0]
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._remember(key, serialized, expires_at)
+        if self.disk:
+            self.disk.put(key, serialized, expires_at)
+
+    def claim(self, key: str) -> Optional[threading.Event]:
+        """Register the caller as computing key; returns the Event to wait on if someone already is"""
+        with self._lock:
+            event = self._inflight.get(key)
+            if event is None:
+                self._inflight[key] = threading.Event()
+            return event
+
+    def release(self, key: str):
+        with self._lock:
+            event = self._inflight.pop(key, None)
+        if event:
+            event.set()
+
+    def wrap(self, model, model_name: str, temperature: Optional[float], tools=()):
+        """model behind the cache, or model itself when it can't be cached"""
+        if model is None:
+            return None
+        if not self.cacheable(temperature):
+            return model
+        return CachedModel(self, model, model_name, temperature, tools)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'sqlite': self.disk.path if self.disk else None,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'bypassed': self.bypassed,
+                'hit_ratio': round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+
+class CachedModel:
+    """Chat model (or tool-bound one) whose invoke() and stream() consult the response cache first"""
+
+    def __init__(self, cache: LLMResponseCache, model, model_name: str, temperature: Optional[float], tools=()):
+        self.cache = cache
+        self.model = model
+        self.model_name = model_name
+        self.temperature = temperature
+        self.tools = [getattr(tool, 'name', str(tool)) for tool in tools]
+
+    def _key(self, messages: list) -> str:
+        return cache_key(self.model_name, self.temperature, self.tools, messages)
+
+    def _bypass(self, args: tuple, kwargs: dict) -> bool:
+        """Count and report calls with per-call options (stop words, config), which aren't part of the key"""
+        if args or kwargs:
+            with self.cache._lock:
+                self.cache.bypassed += 1
+            return True
+        return False
+
+    def invoke(self, messages: list, *args, **kwargs):
+        if self._bypass(args, kwargs):
+            return self.model.invoke(messages, *args, **kwargs)
+        key = self._key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self.cache.claim(key)
+        if inflight is not None:
+            # An identical request (a double-clicked Send) is already asking; reuse its answer
+            inflight.wait(INFLIGHT_WAIT_SECONDS)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            return self.model.invoke(messages)
+        try:
+            response = self.model.invoke(messages)
+            self.cache.put(key, response)
+            return response
+        finally:
+            self.cache.release(key)
+
+    async def ainvoke(self, messages: list, *args, **kwargs):
+        if self._bypass(args, kwargs):
+            return await self.model.ainvoke(messages, *args, **kwargs)
+        key = self._key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        inflight = self.cache.claim(key)
+        if inflight is not None:
+            # Rare (an identical request in flight), so parking a thread on the Event is fine
+            await asyncio.to_thread(inflight.wait, INFLIGHT_WAIT_SECONDS)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+            return await self.model.ainvoke(messages)
+        try:
+            response = await self.model.ainvoke(messages)
+            self.cache.put(key, response)
+            return response
+        finally:
+            self.cache.release(key)
+
+    @staticmethod
+    def _replay_chunks(cached: AIMessage) -> list:
+        return [
+            AIMessageChunk(content=cached.content),
+            AIMessageChunk(content='', tool_call_chunks=[
+                {'name': call['name'], 'args': json.dumps(call['args']), 'id': call.get('id'), 'index': index}
+                for index, call in enumerate(cached.tool_calls)
+            ])
+        ]
+
+    def stream(self, messages: list, *args, **kwargs) -> Iterator[AIMessageChunk]:
+        if self._bypass(args, kwargs):
+            yield from self.model.stream(messages, *args, **kwargs)
+            return
+        key = self._key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            yield from self._replay_chunks(cached)
+            return
+        response = None
+        for chunk in self.model.stream(messages):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self.cache.put(key, response)
+
+    async def astream(self, messages: list, *args, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        if self._bypass(args, kwargs):
+            async for chunk in self.model.astream(messages, *args, **kwargs):
+                yield chunk
+            return
+        key = self._key(messages)
+        cached = self.cache.get(key)
+        if cached is not None:
+            for chunk in self._replay_chunks(cached):
+                yield chunk
+            return
+        response = None
+        async for chunk in self.model.astream(messages):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self.cache.put(key, response)
+
+    def bind_tools(self, tools, **kwargs):
+        return CachedModel(self.cache, self.model.bind_tools(tools, **kwargs), self.model_name, self.temperature,
+                           list(self.tools) + list(tools))
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+llm_response_cache = LLMResponseCache() if LLM_CACHE_ENABLED else None
@@ -0,0 +1,278 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from collections import OrderedDict
+from typing import AsyncIterator, Callable, Iterator, Optional
+
+from langchain_core.messages import AIMessage, AIMessageChunk, messages_from_dict, messages_to_dict
+
+
+# Record/replay of LLM traffic. In record mode every invoke/stream call of
+# the wrapped models appends one JSON line: the prompt hash, the session, the
+# messages, the response (with tool calls and token usage) and its latency. In
+# replay mode responses come from an index of byte offsets over that file, with
+# no provider or network involved, so recorded sessions can be re-run against
+# new compile, cache and context code at full speed and deterministically.
+# Replay matches a call by the user messages in its prompt, not the whole
+# prompt: the system prompt, resume context and history compaction change
+# with the code under test, and a replayed conversation should still line up.
+# Each new session is paired with one recorded session that has its opening
+# turn and is answered from that session's responses.
+
+LLM_CASSETTE_MODE = os.getenv('LLM_CASSETTE_MODE', 'off').lower()   # off, record or replay
+LLM_CASSETTE_PATH = os.getenv('LLM_CASSETTE_PATH', 'llm_cassette.jsonl')
+# 'conversation' (user messages, per session) or 'strict' (exact prompt hash)
+LLM_CASSETTE_MATCH = os.getenv('LLM_CASSETTE_MATCH', 'conversation').lower()
+# Replay with the recorded latency instead of instantly
+LLM_CASSETTE_REPLAY_LATENCY = os.getenv('LLM_CASSETTE_REPLAY_LATENCY', '0') == '1'
+
+
+_UNPAIRED = object()
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a prompt that was never recorded"""
+
+
+def prompt_hash(model: str, messages: list) -> str:
+    """Hash of the model label and each message's type, content and tool calls"""
+    canonical = [
+        [message.type, message.content, getattr(message, 'tool_calls', None) or []]
+        for message in messages
+    ]
+    payload = json.dumps([model, canonical], ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def conversation_key(model: str, user_messages: list) -> str:
+    """Hash of the model label and the user messages of a prompt, in order"""
+    payload = json.dumps([model, user_messages], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _user_messages(messages: list) -> list:
+    return [message.content for message in messages if message.type == 'human']
+
+
+def _as_message(response) -> AIMessage:
+    """A plain AIMessage from a response or an aggregated stream chunk"""
+    return AIMessage(content=response.content, tool_calls=getattr(response, 'tool_calls', None) or [],
+                     usage_metadata=getattr(response, 'usage_metadata', None))
+
+
+class Cassette:
+    """Append-only JSONL store of LLM calls, indexed by conversation key (or prompt hash when strict).
+
+    session_fn returns the conversation ID of the current call, or None
+    outside a conversation.
+    """
+
+    def __init__(self, path: str = LLM_CASSETTE_PATH, mode: str = LLM_CASSETTE_MODE,
+                 replay_latency: bool = LLM_CASSETTE_REPLAY_LATENCY, match: str = LLM_CASSETTE_MATCH,
+                 session_fn: Optional[Callable[[], Optional[str]]] = None):
+        if mode not in ('record', 'replay'):
+            raise ValueError(f"LLM_CASSETTE_MODE must be off, record or replay, not {mode!r}")
+        if match not in ('conversation', 'strict'):
+            raise ValueError(f"LLM_CASSETTE_MATCH must be conversation or strict, not {match!r}")
+        self.path = path
+        self.mode = mode
+        self.match = match
+        self.replay_latency = replay_latency
+        self.session_fn = session_fn or (lambda: None)
+        self.recorded = 0
+        self.replayed = 0
+        # key -> recorded session -> byte offsets of its lines, in recording order
+        # (strict mode keeps every line under one None session)
+        self._offsets = {}
+        self._cursors = {}    # (session, key) -> how many lines have been replayed
+        self._pairing = {}    # replay session -> recorded session
+        self._paired = set()  # recorded sessions already paired
+        self._lock = threading.Lock()
+        if mode == 'replay':
+            self._build_index()
+
+    def _build_index(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"No LLM cassette at {self.path}; record one with LLM_CASSETTE_MODE=record")
+        with open(self.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                if line.strip():
+                    try:
+                        key, session = self._entry_key(json.loads(line))
+                    except (ValueError, KeyError, TypeError):
+                        key = None
+                    if key:
+                        sessions = self._offsets.setdefault(key, OrderedDict())
+                        sessions.setdefault(session, []).append(offset)
+                offset += len(line)
+
+    def _entry_key(self, entry: dict) -> tuple:
+        """(key, recorded session) of a cassette line"""
+        if self.match == 'strict':
+            return entry['hash'], None
+        user_messages = [m['data']['content'] for m in entry['messages'] if m['type'] == 'human']
+        return conversation_key(entry['model'], user_messages), entry.get('session')
+
+    def _key(self, model: str, messages: list) -> str:
+        if self.match == 'strict':
+            return prompt_hash(model, messages)
+        return conversation_key(model, _user_messages(messages))
+
+    def __len__(self) -> int:
+        return sum(len(offsets) for sessions in self._offsets.values() for offsets in sessions.values())
+
+    def record(self, model: str, messages: list, response, latency: float):
+        entry = {
+            'hash': prompt_hash(model, messages),
+            'model': model,
+            'session': self.session_fn(),
+            'recorded_at': datetime.now().isoformat(),
+            'latency_ms': round(latency * 1000, 1),
+            'messages': messages_to_dict(messages),
+            'response': messages_to_dict([_as_message(response)])[0],
+            'tool_calls': getattr(response, 'tool_calls', None) or [],
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self.recorded += 1
+
+    def lookup(self, model: str, messages: list) -> tuple:
+        """(recorded response, its latency in seconds).
+
+        Repeats of one key are served in recording order, then the last again.
+        """
+        key = self._key(model, messages)
+        session = self.session_fn() if self.match != 'strict' else None
+        with self._lock:
+            sessions = self._offsets.get(key)
+            if not sessions:
+                raise CassetteMissError(f"No recorded {model} response for prompt {key[:12]} in {self.path}")
+            offsets = sessions[self._recorded_session(session, sessions)]
+            cursor = (session, key)
+            index = min(self._cursors.get(cursor, 0), len(offsets) - 1)
+            self._cursors[cursor] = index + 1
+            self.replayed += 1
+        with open(self.path, 'rb') as f:
+            f.seek(offsets[index])
+            entry = json.loads(f.readline())
+        return messages_from_dict([entry['response']])[0], entry.get('latency_ms', 0) / 1000
+
+    def _recorded_session(self, session: Optional[str], sessions: OrderedDict) -> Optional[str]:
+        """The recorded session that answers this call (lock held).
+
+        A session is paired on its first call with the first recorded session
+        holding that key that no other session has taken yet (or the first one
+        if all are taken). Calls the pair can't answer, and calls outside a
+        session, use the earliest recording of the key.
+        """
+        if session is None:
+            return next(iter(sessions))
+        recorded = self._pairing.get(session, _UNPAIRED)
+        if recorded is _UNPAIRED:
+            recorded = next((s for s in sessions if s not in self._paired), next(iter(sessions)))
+            self._pairing[session] = recorded
+            self._paired.add(recorded)
+        return recorded if recorded in sessions else next(iter(sessions))
+
+    def replay(self, model: str, messages: list) -> AIMessage:
+        message, latency = self.lookup(model, messages)
+        if self.replay_latency:
+            time.sleep(latency)
+        return message
+
+    async def areplay(self, model: str, messages: list) -> AIMessage:
+        message, latency = self.lookup(model, messages)
+        if self.replay_latency:
+            await asyncio.sleep(latency)
+        return message
+
+    def wrap(self, model, label: str):
+        """model (None in replay mode is fine) behind the cassette; None if there is nothing to record"""
+        if model is None and self.mode == 'record':
+            return None
+        return CassetteModel(self, model, label)
+
+
+class CassetteModel:
+    """Stands in for a chat model (or a tool-bound one): invoke() and stream() go through the cassette"""
+
+    def __init__(self, cassette: Cassette, model, label: str):
+        self.cassette = cassette
+        self.model = model
+        self.label = label
+
+    def invoke(self, messages: list, *args, **kwargs):
+        if self.cassette.mode == 'replay':
+            return self.cassette.replay(self.label, messages)
+        started = time.perf_counter()
+        response = self.model.invoke(messages, *args, **kwargs)
+        self.cassette.record(self.label, messages, response, time.perf_counter() - started)
+        return response
+
+    async def ainvoke(self, messages: list, *args, **kwargs):
+        if self.cassette.mode == 'replay':
+            return await self.cassette.areplay(self.label, messages)
+        started = time.perf_counter()
+        response = await self.model.ainvoke(messages, *args, **kwargs)
+        self.cassette.record(self.label, messages, response, time.perf_counter() - started)
+        return response
+
+    @staticmethod
+    def _replay_chunks(message: AIMessage) -> list:
+        return [
+            AIMessageChunk(content=message.content),
+            AIMessageChunk(content='', usage_metadata=message.usage_metadata, tool_call_chunks=[
+                {'name': call['name'], 'args': json.dumps(call['args']), 'id': call.get('id'), 'index': index}
+                for index, call in enumerate(message.tool_calls)
+            ])
+        ]
+
+    def stream(self, messages: list, *args, **kwargs) -> Iterator[AIMessageChunk]:
+        if self.cassette.mode == 'replay':
+            yield from self._replay_chunks(self.cassette.replay(self.label, messages))
+            return
+        started = time.perf_counter()
+        response = None
+        for chunk in self.model.stream(messages, *args, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self.cassette.record(self.label, messages, response, time.perf_counter() - started)
+
+    async def astream(self, messages: list, *args, **kwargs) -> AsyncIterator[AIMessageChunk]:
+        if self.cassette.mode == 'replay':
+            for chunk in self._replay_chunks(await self.cassette.areplay(self.label, messages)):
+                yield chunk
+            return
+        started = time.perf_counter()
+        response = None
+        async for chunk in self.model.astream(messages, *args, **kwargs):
+            response = chunk if response is None else response + chunk
+            yield chunk
+        if response is not None:
+            self.cassette.record(self.label, messages, response, time.perf_counter() - started)
+
+    def bind_tools(self, tools, **kwargs):
+        return CassetteModel(self.cassette, self.model.bind_tools(tools, **kwargs) if self.model else None,
+                             f"{self.label}+tools")
+
+    def __getattr__(self, name):
+        # Anything else (model name, latency_ms, ...) comes from the wrapped model
+        if self.model is None:
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+
+def open_cassette(mode: str = LLM_CASSETTE_MODE, path: str = LLM_CASSETTE_PATH,
+                  session_fn: Optional[Callable[[], Optional[str]]] = None) -> Optional[Cassette]:
+    """The configured cassette, or None when record/replay is off"""
+    if mode in ('', 'off'):
+        return None
+    return Cassette(path, mode, session_fn=session_fn)
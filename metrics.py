@@ -0,0 +1,243 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+# In-process metrics in the Prometheus text format, served at /metrics.
+# Recording is a dict update under a per-metric lock (held for a few
+# hundred nanoseconds, never across I/O), so it stays on in production.
+# Values that other components already track (cache hits, queue depth,
+# conversation count) are read through callbacks when /metrics is scraped
+# instead of being recorded twice.
+
+METRICS_PREFIX = 'niti_'
+# Sessions with a request in this many seconds count as active
+ACTIVE_SESSION_WINDOW = int(os.getenv('METRICS_ACTIVE_SESSION_WINDOW', '300'))
+
+# Seconds; covers a fast cache hit up to a pdflatex or LLM timeout
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    """Base for counters, gauges and histograms; children are keyed by label values"""
+
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), callback: Optional[Callable] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # A callback returns the current value, or a {label values tuple: value} dict
+        self.callback = callback
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self) -> dict:
+        if self.callback is None:
+            with self._lock:
+                return dict(self._values)
+        value = self.callback()
+        return value if isinstance(value, dict) else {(): value}
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for key, value in sorted(self._samples().items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type_name = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    type_name = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            child = self._values.get(key)
+            if child is None:
+                # Per-bucket counts (the last one is +Inf) and the sum
+                child = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            child[0][index] += 1
+            child[1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe how long the block takes. Yields the labels so the block can
+        fill in ones only known at the end; 'outcome' becomes 'error' if it raises.
+        """
+        started = time.perf_counter()
+        try:
+            yield labels
+        except BaseException:
+            if 'outcome' in self.labelnames:
+                labels['outcome'] = 'error'
+            raise
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        with self._lock:
+            children = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(children.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class SessionActivity:
+    """Last request time per session, for an active-sessions gauge"""
+
+    PRUNE_EVERY = 1024
+
+    def __init__(self, window: float = ACTIVE_SESSION_WINDOW):
+        self.window = window
+        self._last_seen = {}
+        self._touches = 0
+        self._lock = threading.Lock()
+
+    def touch(self, session_id: Optional[str]):
+        if not session_id:
+            return
+        # A single dict store needs no lock; pruning takes it now and then
+        self._last_seen[session_id] = time.monotonic()
+        self._touches += 1
+        if self._touches % self.PRUNE_EVERY == 0:
+            self.active()
+
+    def active(self) -> int:
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            for session_id, seen in list(self._last_seen.items()):
+                if seen < cutoff:
+                    self._last_seen.pop(session_id, None)
+            return len(self._last_seen)
+
+
+class MetricsRegistry:
+    """Named metrics rendered together in the Prometheus text format"""
+
+    def __init__(self, prefix: str = METRICS_PREFIX):
+        self.prefix = prefix
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: Metric) -> Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames=(), callback: Optional[Callable] = None) -> Counter:
+        return self._register(Counter(self.prefix + name, documentation, labelnames, callback))
+
+    def gauge(self, name: str, documentation: str, labelnames=(), callback: Optional[Callable] = None) -> Gauge:
+        return self._register(Gauge(self.prefix + name, documentation, labelnames, callback))
+
+    def histogram(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(self.prefix + name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                # A failing callback (e.g. a locked database) must not break the scrape
+                lines.append(f"# {metric.name} unavailable: {_escape(e)}")
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+session_activity = SessionActivity()
+
+HTTP_REQUESTS = registry.counter(
+    'http_requests_total', 'HTTP requests by route, method and status', ['route', 'method', 'status'])
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route (streams: until the response starts)',
+    ['route', 'method'])
+LLM_REQUEST_SECONDS = registry.histogram(
+    'llm_request_duration_seconds', 'LLM call latency by operation and outcome', ['operation', 'outcome'])
+LLM_TOKENS = registry.counter(
+    'llm_tokens_total', 'Provider-reported LLM tokens by operation and direction', ['operation', 'direction'])
+TOOL_SECONDS = registry.histogram(
+    'tool_duration_seconds', 'Resume tool execution time by tool and outcome', ['tool', 'outcome'])
+COMPILE_WAIT_SECONDS = registry.histogram(
+    'compile_queue_wait_seconds', 'Time compile jobs spend queued before a worker picks them up')
+COMPILE_SECONDS = registry.histogram(
+    'compile_duration_seconds', 'End-to-end compile time (validation, cache, pdflatex, repairs) by outcome',
+    ['outcome'])
+PDFLATEX_SECONDS = registry.histogram(
+    'pdflatex_run_duration_seconds', 'Single pdflatex run time by compiler binary and outcome',
+    ['compiler', 'outcome'])
+registry.gauge('active_sessions', f'Sessions with a request in the last {ACTIVE_SESSION_WINDOW}s',
+               callback=session_activity.active)
+
+
+def compile_outcome(result: dict) -> str:
+    """Outcome label for a compile_latex result"""
+    if result.get('cache_hit'):
+        return 'cache_hit'
+    if result.get('validation_errors'):
+        return 'invalid'
+    if result.get('pdf_generated'):
+        return 'repaired' if result.get('repairs') else 'success'
+    return 'failed'
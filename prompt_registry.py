@@ -0,0 +1,111 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from typing import Optional
+
+from langchain_core.messages import SystemMessage
+
+from context_builder import estimate_tokens
+from resume_template import RESUME_PREAMBLE
+
+
+logger = logging.getLogger(__name__)
+
+# System prompts live as text files in prompts/ (chat.txt is the "chat"
+# prompt). Each is read once, with its hash, token estimate and SystemMessage
+# computed at load time and shared by every request; editing a file swaps in
+# the new version on the next lookup. {{NAME}} placeholders are filled from
+# the registry's variables, so the prompt can embed code-owned text such as
+# the resume preamble without a copy going stale.
+
+PROMPTS_DIR = os.getenv('PROMPTS_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts')
+# Check prompt files for changes on lookup; 0 keeps the startup versions
+PROMPT_RELOAD = os.getenv('PROMPT_RELOAD', '1') != '0'
+
+_PLACEHOLDER = re.compile(r'\{\{([A-Z][A-Z0-9_]*)\}\}')
+
+
+class PromptNotFoundError(LookupError):
+    """Raised for a prompt name without a file in the prompts directory"""
+
+
+class Prompt:
+    """One loaded prompt version"""
+
+    def __init__(self, name: str, text: str, mtime: int):
+        self.name = name
+        self.text = text
+        self.mtime = mtime
+        self.hash = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        self.version = f"{name}@{self.hash[:12]}"
+        self.tokens = estimate_tokens(text)
+        # The id lets caches key on the version instead of rehashing the text
+        self.message = SystemMessage(content=text, id=f"prompt-{self.version}")
+
+    def stats(self) -> dict:
+        return {'version': self.version, 'hash': self.hash, 'tokens': self.tokens, 'chars': len(self.text)}
+
+
+class PromptRegistry:
+    """Prompts loaded from <directory>/<name>.txt, reloaded when a file's mtime changes"""
+
+    def __init__(self, directory: str = PROMPTS_DIR, variables: Optional[dict] = None, reload: bool = PROMPT_RELOAD):
+        self.directory = directory
+        self.variables = dict(variables or {})
+        self.reload = reload
+        self.reloads = 0
+        self._prompts = {}   # name -> Prompt
+        self._lock = threading.Lock()
+        if os.path.isdir(directory):
+            for filename in sorted(os.listdir(directory)):
+                if filename.endswith('.txt'):
+                    self.get(filename[:-len('.txt')])
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{name}.txt")
+
+    def _render(self, text: str) -> str:
+        return _PLACEHOLDER.sub(lambda m: str(self.variables.get(m.group(1), m.group(0))), text)
+
+    def _load(self, name: str, mtime: int) -> Prompt:
+        with open(self._path(name), 'r', encoding='utf-8') as f:
+            text = self._render(f.read().rstrip('\n'))
+        return Prompt(name, text, mtime)
+
+    def get(self, name: str) -> Prompt:
+        """The current version of a prompt; raises PromptNotFoundError"""
+        prompt = self._prompts.get(name)
+        if prompt is not None and not self.reload:
+            return prompt
+        try:
+            mtime = os.stat(self._path(name)).st_mtime_ns
+        except OSError:
+            if prompt is not None:
+                return prompt   # file removed while running: keep serving the loaded version
+            raise PromptNotFoundError(f"No prompt {name!r} in {self.directory}")
+        if prompt is not None and prompt.mtime == mtime:
+            return prompt
+
+        with self._lock:
+            prompt = self._prompts.get(name)
+            if prompt is not None and prompt.mtime == mtime:
+                return prompt
+            loaded = self._load(name, mtime)
+            if prompt is not None:
+                self.reloads += 1
+                logger.info("🔄 Prompt %s reloaded: %s -> %s", name, prompt.version, loaded.version)
+            self._prompts[name] = loaded
+            return loaded
+
+    def stats(self) -> dict:
+        return {
+            'directory': self.directory,
+            'reload': self.reload,
+            'reloads': self.reloads,
+            'prompts': {name: prompt.stats() for name, prompt in sorted(self._prompts.items())}
+        }
+
+
+prompts = PromptRegistry(variables={'RESUME_PREAMBLE': RESUME_PREAMBLE})
@@ -3,8 +3,10 @@ import os
 import uuid
 from datetime import datetime
 from langchain_groq import ChatGroq
-from langchain_core.messages import HumanMessage, SystemMessage, AIMessage
+from langchain_core.messages import HumanMessage, AIMessage
 from dotenv import load_dotenv
+from conversation_store import create_conversation_store, DEFAULT_PAGE_SIZE
+from prompt_registry import prompts
 
 # Load environment variables
 load_dotenv()
@@ -12,15 +14,19 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.urandom(24)  # For session management
 
-# Global conversation storage - Simple implementation
-conversation_messages = {}  # session_id -> list of messages
-conversation_metadata = {}  # session_id -> metadata (timestamp, title, etc.)
+# Conversation storage - in-memory LRU or SQLite, see conversation_store.py
+conversation_store = create_conversation_store()
+MAX_MESSAGES = 100  # per conversation; older turns are dropped
 
 # Initialize LangChain Groq client
 llm = None
 try:
     api_key = os.getenv('GROQ_API_KEY')
-    if api_key:
+    if os.getenv('LLM_PROVIDER', '').lower() == 'fake':
+        from fake_llm import FakeChatModel
+        llm = FakeChatModel()
+        print("🧪 Using the offline fake LLM (LLM_PROVIDER=fake)")
+    elif api_key:
         llm = ChatGroq(
             model="meta-llama/llama-4-scout-17b-16e-instruct",
             temperature=0.7,
@@ -40,42 +46,29 @@ except Exception as e:
 
 def get_or_create_conversation_memory(session_id):
     """Get existing conversation messages or create a new conversation"""
-    if session_id not in conversation_messages:
-        conversation_messages[session_id] = []
-        conversation_metadata[session_id] = {
-            'created_at': datetime.now().isoformat(),
-            'title': 'New Conversation',
-            'message_count': 0
-        }
-    return conversation_messages[session_id]
+    conversation_store.ensure(session_id)
+    return conversation_store.get_messages(session_id)
 
 def save_conversation_message(session_id, human_message, ai_message):
     """Save messages to conversation storage"""
-    messages = get_or_create_conversation_memory(session_id)
-    
-    # Add human message
-    messages.append({
-        'type': 'human',
-        'content': human_message,
-        'timestamp': datetime.now().isoformat()
-    })
-    
-    # Add AI message
-    messages.append({
-        'type': 'ai',
-        'content': ai_message,
-        'timestamp': datetime.now().isoformat()
-    })
+    messages = [
+        # Human message
+        {
+            'type': 'human',
+            'content': human_message,
+            'timestamp': datetime.now().isoformat()
+        },
+        # AI message
+        {
+            'type': 'ai',
+            'content': ai_message,
+            'timestamp': datetime.now().isoformat()
+        }
+    ]
     
-    # Update metadata
-    conversation_metadata[session_id]['message_count'] += 2
-    conversation_metadata[session_id]['last_updated'] = datetime.now().isoformat()
-    
-    # Auto-generate title from first message if still "New Conversation"
-    if (conversation_metadata[session_id]['title'] == 'New Conversation' and 
-        conversation_metadata[session_id]['message_count'] == 2):
-        title = human_message[:50] + "..." if len(human_message) > 50 else human_message
-        conversation_metadata[session_id]['title'] = title
+    # The first exchange replaces the "New Conversation" title
+    title = human_message[:50] + "..." if len(human_message) > 50 else human_message
+    conversation_store.append_messages(session_id, messages, MAX_MESSAGES, title=title)
 
 @app.route('/start_session', methods=['POST'])
 def start_session():
@@ -97,41 +90,42 @@ def get_conversation_history():
     """Get conversation history for current session"""
     session_id = session.get('conversation_id')
     
-    if not session_id or session_id not in conversation_messages:
+    metadata = conversation_store.get_metadata(session_id) if session_id else None
+    if metadata is None:
         return jsonify({
             'messages': [],
             'session_id': None,
             'message': 'No active conversation'
         })
     
-    messages = conversation_messages[session_id]
+    messages = conversation_store.get_messages(session_id)
     
     return jsonify({
         'messages': messages,
         'session_id': session_id,
-        'metadata': conversation_metadata.get(session_id, {}),
+        'metadata': metadata,
         'status': 'success'
     })
 
 @app.route('/list_conversations', methods=['GET'])
 def list_conversations():
-    """List all conversation sessions"""
-    conversations = []
-    for session_id, metadata in conversation_metadata.items():
-        conversations.append({
-            'session_id': session_id,
-            'title': metadata['title'],
-            'created_at': metadata['created_at'],
-            'last_updated': metadata.get('last_updated', metadata['created_at']),
-            'message_count': metadata['message_count']
-        })
+    """List conversation sessions, most recently updated first, one page at a time"""
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    before = request.args.get('before')
     
-    # Sort by last updated (most recent first)
-    conversations.sort(key=lambda x: x['last_updated'], reverse=True)
+    page, next_cursor = conversation_store.list_recent(limit, before)
+    conversations = [{
+        'session_id': metadata['session_id'],
+        'title': metadata['title'],
+        'created_at': metadata['created_at'],
+        'last_updated': metadata.get('last_updated', metadata['created_at']),
+        'message_count': metadata['message_count']
+    } for metadata in page]
     
     return jsonify({
         'conversations': conversations,
-        'total_count': len(conversations),
+        'total_count': conversation_store.count(),
+        'next_cursor': next_cursor,
         'status': 'success'
     })
 
@@ -141,7 +135,8 @@ def switch_conversation():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id not in conversation_messages:
+    metadata = conversation_store.get_metadata(session_id) if session_id else None
+    if metadata is None:
         return jsonify({
             'error': 'Conversation not found',
             'status': 'error'
@@ -152,7 +147,7 @@ def switch_conversation():
     return jsonify({
         'session_id': session_id,
         'status': 'success',
-        'message': f'Switched to conversation: {conversation_metadata[session_id]["title"]}'
+        'message': f'Switched to conversation: {metadata["title"]}'
     })
 
 @app.route('/delete_conversation', methods=['DELETE'])
@@ -161,9 +156,7 @@ def delete_conversation():
     data = request.json
     session_id = data.get('session_id')
     
-    if session_id in conversation_messages:
-        del conversation_messages[session_id]
-        del conversation_metadata[session_id]
+    if session_id and conversation_store.delete(session_id):
         
         # If this was the current session, clear it
         if session.get('conversation_id') == session_id:
@@ -209,45 +202,8 @@ def chat():
         # Get conversation messages
         conversation_history = get_or_create_conversation_memory(session_id)
         
-        # Create a system prompt for resume building
-        system_prompt = """You are an expert LaTeX resume generator and AI resume building assistant. Your job is to help users create professional resumes by:
-
-**PRIMARY RESPONSIBILITIES:**
-1. Gathering information about their education, experience, skills, and achievements
-2. Providing guidance on resume formatting and content
-3. Asking relevant follow-up questions to get complete information
-4. Being encouraging and professional
-
-**WHEN GENERATING RESUMES:**
-- ALWAYS follow the exact LaTeX template structure provided in the codebase
-- NEVER generate single-line LaTeX code - maintain proper indentation and line breaks
-- Use only the defined custom commands: \\resumeSubheading, \\resumeProjectHeading, \\resumeItem, etc.
-- Maintain exact section order: Heading, Professional Summary, Technical Skills, Experience, Projects, Achievements, Certifications, Education
-- Use FontAwesome icons (\\faEnvelope, \\faPhone, \\faLinkedin, \\faGithub) in contact information
-- Ensure proper spacing with \\vspace commands
-- Generate clean, well-structured, multi-line LaTeX code
-
-**ALIGNMENT AND INDENTATION RULES:**
-- Use consistent 2-space or 4-space indentation for nested elements
-- Align \\resumeItem entries with proper indentation under \\resumeItemListStart
-- Align \\resumeSubheading parameters on separate lines with consistent spacing
-- Maintain proper alignment for tabular environments and custom commands
-- Keep section headers (\\section{}) at the left margin
-- Indent all content within environments (\\begin{} ... \\end{})
-- Align closing braces } with their corresponding opening elements
-- Use consistent spacing between sections and subsections
-
-**CONVERSATION GUIDELINES:**
-- Keep responses concise but helpful (under 200 words)
-- Ask for specific details that would make their resume stronger
-- Be conversational and supportive
-- Reference previous messages from conversation history
-- Guide users through the resume creation process step by step
-
-Remember: Always prioritize proper LaTeX formatting and structure when generating resumes."""
-
         # Build messages with conversation history
-        messages = [SystemMessage(content=system_prompt)]
+        messages = [prompts.get('resume_app').message]
         
         # Add conversation history
         for msg in conversation_history:
@@ -271,7 +227,7 @@ Remember: Always prioritize proper LaTeX formatting and structure when generatin
             'response': ai_response,
             'status': 'success',
             'session_id': session_id,
-            'conversation_title': conversation_metadata[session_id]['title']
+            'conversation_title': conversation_store.get_metadata(session_id)['title']
         })
         
     except Exception as e:
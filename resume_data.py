@@ -0,0 +1,129 @@
+import copy
+import json
+
+
+# Structured resume data. The LLM edits this JSON (as an RFC 7386 merge
+# patch) instead of re-emitting the whole LaTeX document, and
+# resume_template.render_resume() turns it into LaTeX.
+
+RESUME_SECTIONS = [
+    'header', 'summary', 'skills', 'experience', 'projects',
+    'achievements', 'certifications', 'education'
+]
+
+HEADER_FIELDS = ['name', 'email', 'phone', 'linkedin', 'github', 'website', 'location']
+
+# Fields of the entries in each list section; 'bullets' and 'items' are lists of strings
+ENTRY_FIELDS = {
+    'skills': ['category', 'items'],
+    'experience': ['title', 'company', 'location', 'dates', 'bullets'],
+    'projects': ['name', 'technologies', 'date', 'bullets'],
+    'achievements': ['name', 'year', 'description'],
+    'certifications': ['name', 'description'],
+    'education': ['institution', 'degree', 'grade', 'dates', 'location'],
+}
+
+LIST_FIELDS = {'bullets', 'items'}
+
+
+class ResumeDataError(ValueError):
+    """The resume data (or a patch to it) doesn't fit the schema"""
+
+
+def empty_resume() -> dict:
+    data = {section: [] for section in RESUME_SECTIONS}
+    data['header'] = {}
+    data['summary'] = ''
+    return data
+
+
+def merge_patch(target, patch):
+    """Apply an RFC 7386 JSON merge patch: objects merge, null deletes, anything else replaces"""
+    if not isinstance(patch, dict):
+        return copy.deepcopy(patch)
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _text(value, where: str) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return str(value).strip()
+    raise ResumeDataError(f"{where} must be a string")
+
+
+def _text_list(value, where: str) -> list:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        # Accept "a, b, c" for skill items
+        return [item.strip() for item in value.split(',') if item.strip()]
+    if not isinstance(value, list):
+        raise ResumeDataError(f"{where} must be a list of strings")
+    return [text for text in (_text(item, where) for item in value) if text]
+
+
+def normalize_resume_data(data) -> dict:
+    """Check data against the schema and return a cleaned copy.
+
+    Missing sections become empty, numbers become strings and blank
+    entries are dropped; unknown sections or fields raise ResumeDataError.
+    """
+    if not isinstance(data, dict):
+        raise ResumeDataError("resume data must be a JSON object")
+
+    unknown = set(data) - set(RESUME_SECTIONS)
+    if unknown:
+        raise ResumeDataError(f"unknown section(s) {sorted(unknown)}; allowed: {RESUME_SECTIONS}")
+
+    normalized = empty_resume()
+
+    header = data.get('header') or {}
+    if not isinstance(header, dict):
+        raise ResumeDataError("header must be an object")
+    unknown = set(header) - set(HEADER_FIELDS)
+    if unknown:
+        raise ResumeDataError(f"unknown header field(s) {sorted(unknown)}; allowed: {HEADER_FIELDS}")
+    normalized['header'] = {field: _text(header[field], f"header.{field}")
+                            for field in HEADER_FIELDS if _text(header.get(field), f"header.{field}")}
+
+    normalized['summary'] = _text(data.get('summary'), 'summary')
+
+    for section, fields in ENTRY_FIELDS.items():
+        entries = data.get(section) or []
+        if not isinstance(entries, list):
+            raise ResumeDataError(f"{section} must be a list")
+        for i, entry in enumerate(entries):
+            where = f"{section}[{i}]"
+            if not isinstance(entry, dict):
+                raise ResumeDataError(f"{where} must be an object with fields {fields}")
+            unknown = set(entry) - set(fields)
+            if unknown:
+                raise ResumeDataError(f"unknown field(s) {sorted(unknown)} in {where}; allowed: {fields}")
+            cleaned = {}
+            for field in fields:
+                if field in LIST_FIELDS:
+                    cleaned[field] = _text_list(entry.get(field), f"{where}.{field}")
+                else:
+                    cleaned[field] = _text(entry.get(field), f"{where}.{field}")
+            if any(cleaned.values()):
+                normalized[section].append(cleaned)
+
+    return normalized
+
+
+def apply_resume_patch(current, patch_json: str) -> dict:
+    """Parse a JSON merge patch, apply it to the current data and validate the result"""
+    try:
+        patch = json.loads(patch_json) if isinstance(patch_json, str) else patch_json
+    except ValueError as e:
+        raise ResumeDataError(f"invalid JSON: {e}")
+    if not isinstance(patch, dict):
+        raise ResumeDataError("the patch must be a JSON object")
+    return normalize_resume_data(merge_patch(current or empty_resume(), patch))
@@ -0,0 +1,215 @@
+import re
+
+
+# The fixed resume preamble: document class, packages, page layout and the
+# \resumeItem / \resumeSubheading macros every generated resume starts with.
+# The chat prompt embeds it, and the compile server precompiles it into a TeX
+# format (see latex_format.py) so compiles skip re-reading these packages.
+# render_resume() builds a full document on it from structured resume data.
+
+RESUME_PREAMBLE = r"""\documentclass[letterpaper,11pt]{article}
+
+\usepackage{latexsym}
+\usepackage[empty]{fullpage}
+\usepackage{titlesec}
+\usepackage{marvosym}
+\usepackage[usenames,dvipsnames]{color}
+\usepackage{verbatim}
+\usepackage{enumitem}
+\usepackage[hidelinks]{hyperref}
+\usepackage{fancyhdr}
+\usepackage[english]{babel}
+\usepackage{tabularx}
+\usepackage{fontawesome5}
+\usepackage{multicol}
+\setlength{\multicolsep}{-3.0pt}
+\setlength{\columnsep}{-1pt}
+\input{glyphtounicode}
+
+\pagestyle{fancy}
+\fancyhf{}
+\fancyfoot{}
+\renewcommand{\headrulewidth}{0pt}
+\renewcommand{\footrulewidth}{0pt}
+
+% Adjust margins
+\addtolength{\oddsidemargin}{-0.6in}
+\addtolength{\evensidemargin}{-0.5in}
+\addtolength{\textwidth}{1.19in}
+\addtolength{\topmargin}{-.7in}
+\addtolength{\textheight}{1.4in}
+
+\urlstyle{same}
+\raggedbottom
+\raggedright
+\setlength{\tabcolsep}{0in}
+
+% Section formatting
+\titleformat{\section}{
+  \vspace{-4pt}\scshape\raggedright\large\bfseries
+}{}{0em}{}[\color{black}\titlerule \vspace{-5pt}]
+
+% Unicode support for ATS
+\pdfgentounicode=1
+
+% Custom commands
+\newcommand{\resumeItem}[1]{\item\small{{#1 \vspace{-2pt}}}}
+\newcommand{\resumeSubheading}[4]{
+  \vspace{-2pt}\item
+    \begin{tabular*}{1.0\textwidth}[t]{l@{\extracolsep{\fill}}r}
+      \textbf{#1} & \textbf{\small #2} \\
+      \textit{\small#3} & \textit{\small #4} \\
+    \end{tabular*}\vspace{-7pt}
+}
+\newcommand{\resumeProjectHeading}[2]{
+    \item
+    \begin{tabular*}{1.001\textwidth}{l@{\extracolsep{\fill}}r}
+      \small#1 & \textbf{\small #2} \\
+    \end{tabular*}\vspace{-7pt}
+}
+\newcommand{\resumeItemListStart}{\begin{itemize}}
+\newcommand{\resumeItemListEnd}{\end{itemize}\vspace{-5pt}}
+\newcommand{\resumeSubHeadingListStart}{\begin{itemize}[leftmargin=0.0in, label={}]}
+\newcommand{\resumeSubHeadingListEnd}{\end{itemize}}
+"""
+
+_LATEX_SPECIALS = {
+    '\\': r'\textbackslash{}',
+    '&': r'\&',
+    '%': r'\%',
+    '$': r'\$',
+    '#': r'\#',
+    '_': r'\_',
+    '{': r'\{',
+    '}': r'\}',
+    '~': r'\textasciitilde{}',
+    '^': r'\textasciicircum{}',
+    '|': r'\textbar{}',
+    '<': r'\textless{}',
+    '>': r'\textgreater{}',
+}
+_LATEX_SPECIAL_CHARS = re.compile('[' + re.escape(''.join(_LATEX_SPECIALS)) + ']')
+_URL_SCHEME = re.compile(r'^(?:https?://)?(?:www\.)?', re.IGNORECASE)
+
+
+def escape_latex(text: str) -> str:
+    """Make arbitrary text safe to place in a LaTeX document"""
+    return _LATEX_SPECIAL_CHARS.sub(lambda m: _LATEX_SPECIALS[m.group(0)], text)
+
+
+def escape_url(url: str) -> str:
+    """Escape a URL for \\href; braces and backslashes can't appear in one safely"""
+    url = url.replace('\\', '').replace('{', '').replace('}', '')
+    return url.replace('%', r'\%').replace('#', r'\#')
+
+
+def _link(url: str) -> str:
+    return url if '://' in url else f"https://{url}"
+
+
+def _item_list(bullets: list, indent: str) -> list:
+    if not bullets:
+        return []
+    lines = [f"{indent}\\resumeItemListStart"]
+    lines += [f"{indent}  \\resumeItem{{{escape_latex(bullet)}}}" for bullet in bullets]
+    lines.append(f"{indent}\\resumeItemListEnd")
+    return lines
+
+
+def _render_header(header: dict) -> list:
+    contacts = []
+    if header.get('email'):
+        email = header['email']
+        contacts.append(f"\\raisebox{{-0.1\\height}}\\faEnvelope\\ \\href{{mailto:{escape_url(email)}}}{{{escape_latex(email)}}}")
+    if header.get('phone'):
+        contacts.append(f"\\raisebox{{-0.1\\height}}\\faPhone\\ {escape_latex(header['phone'])}")
+    if header.get('location'):
+        contacts.append(f"\\raisebox{{-0.1\\height}}\\faMapMarker\\ {escape_latex(header['location'])}")
+    for field, icon in (('linkedin', '\\faLinkedin'), ('github', '\\faGithub'), ('website', '\\faGlobe')):
+        if header.get(field):
+            url = header[field]
+            display = _URL_SCHEME.sub('', url).rstrip('/')
+            contacts.append(f"\\href{{{escape_url(_link(url))}}}{{\\raisebox{{-0.2\\height}}{icon}\\ \\underline{{{escape_latex(display)}}}}}")
+
+    lines = ["%----------HEADING----------", "\\begin{center}"]
+    lines.append(f"    {{\\Huge \\scshape {escape_latex(header.get('name', ''))}}} \\\\ \\vspace{{1pt}}")
+    if contacts:
+        lines.append("    \\small " + " ~\n    ".join(contacts))
+    lines += ["    \\vspace{-8pt}", "\\end{center}"]
+    return lines
+
+
+def render_resume(data: dict) -> str:
+    """Render normalized resume data (see resume_data.py) into a complete LaTeX document.
+
+    All text is escaped and empty sections are left out, so the output
+    always compiles with RESUME_PREAMBLE.
+    """
+    lines = [RESUME_PREAMBLE, "\\begin{document}", ""]
+    lines += _render_header(data.get('header', {}))
+
+    if data.get('summary'):
+        lines += ["", "%-----------PROFESSIONAL SUMMARY-----------", "\\section{Professional Summary}",
+                  escape_latex(data['summary'])]
+
+    if data.get('skills'):
+        lines += ["", "%-----------SKILLS-----------", "\\section{Technical Skills}",
+                  "\\begin{itemize}[leftmargin=0.15in, label={}]"]
+        for skill in data['skills']:
+            items = ', '.join(escape_latex(item) for item in skill['items'])
+            lines.append(f"    \\item \\textbf{{{escape_latex(skill['category'])}}}{{: {items}}}")
+        lines.append("\\end{itemize}")
+
+    if data.get('experience'):
+        lines += ["", "%-----------EXPERIENCE-----------", "\\section{Experience}", "  \\resumeSubHeadingListStart"]
+        for job in data['experience']:
+            lines += ["    \\resumeSubheading",
+                      f"      {{{escape_latex(job['title'])}}}{{{escape_latex(job['dates'])}}}",
+                      f"      {{{escape_latex(job['company'])}}}{{{escape_latex(job['location'])}}}"]
+            lines += _item_list(job['bullets'], "      ")
+        lines.append("  \\resumeSubHeadingListEnd")
+
+    if data.get('projects'):
+        lines += ["", "%-----------PROJECTS-----------", "\\section{Projects}", "  \\resumeSubHeadingListStart"]
+        for project in data['projects']:
+            heading = f"\\textbf{{{escape_latex(project['name'])}}}"
+            if project['technologies']:
+                heading += f" $|$ \\emph{{{escape_latex(project['technologies'])}}}"
+            lines += ["    \\resumeProjectHeading",
+                      f"      {{{heading}}}{{{escape_latex(project['date'])}}}"]
+            lines += _item_list(project['bullets'], "      ")
+        lines.append("  \\resumeSubHeadingListEnd")
+
+    if data.get('achievements'):
+        lines += ["", "%-----------ACHIEVEMENTS-----------", "\\section{Achievements}", "  \\resumeSubHeadingListStart"]
+        for achievement in data['achievements']:
+            text = f"\\textbf{{{escape_latex(achievement['name'])}}}"
+            if achievement['year']:
+                text += f" ({escape_latex(achievement['year'])})"
+            if achievement['description']:
+                text += f": {escape_latex(achievement['description'])}"
+            lines.append(f"    \\resumeItem{{{text}}}")
+        lines.append("  \\resumeSubHeadingListEnd")
+
+    if data.get('certifications'):
+        lines += ["", "%-----------CERTIFICATIONS-----------", "\\section{Certifications}", "  \\resumeSubHeadingListStart"]
+        for certification in data['certifications']:
+            text = f"\\textbf{{{escape_latex(certification['name'])}}}"
+            if certification['description']:
+                text += f": {escape_latex(certification['description'])}"
+            lines.append(f"    \\resumeItem{{{text}}}")
+        lines.append("  \\resumeSubHeadingListEnd")
+
+    if data.get('education'):
+        lines += ["", "%-----------EDUCATION-----------", "\\section{Education}", "  \\resumeSubHeadingListStart"]
+        for school in data['education']:
+            degree = escape_latex(school['degree'])
+            if school['grade']:
+                degree += f"; \\textbf{{{escape_latex(school['grade'])}}}"
+            lines += ["    \\resumeSubheading",
+                      f"      {{{escape_latex(school['institution'])}}}{{{escape_latex(school['dates'])}}}",
+                      f"      {{{degree}}}{{{escape_latex(school['location'])}}}"]
+        lines.append("  \\resumeSubHeadingListEnd")
+
+    lines += ["", "\\end{document}", ""]
+    return '\n'.join(lines)
@@ -60,14 +60,17 @@ function setViewMode(mode) {
 // PDF FUNCTIONS
 // =====================================================
 
-function loadPDFEmbed() {
+function loadPDFEmbed(artifactId) {
     const pdfViewer = document.getElementById('pdfViewer');
     const pdfPlaceholder = document.getElementById('pdfPlaceholder');
     
     console.log('Attempting to load PDF...');
     
-    // Try multiple methods to display the PDF
-    const pdfUrl = 'output.pdf?t=' + new Date().getTime();
+    // Try multiple methods to display the PDF. The server serves this
+    // conversation's latest compiled artifact unless a specific one is asked for.
+    const pdfUrl = artifactId
+        ? 'output.pdf?artifact=' + encodeURIComponent(artifactId)
+        : 'output.pdf?t=' + new Date().getTime();
     
     // Method 1: Try with embed tag
     pdfViewer.innerHTML = `
@@ -154,7 +157,7 @@ function refreshPDF() {
             // If PDF was generated, reload the PDF viewer
             if (data.pdf_generated) {
                 setTimeout(() => {
-                    loadPDFEmbed();
+                    loadPDFEmbed(data.artifact_id);
                     addMessage("📄 Resume PDF refreshed successfully!", 'system');
                 }, 500);
             } else {
@@ -205,59 +208,164 @@ function sendMessage() {
     // Show loading
     showLoading(true);
     
-    // Make actual API call to Groq
-    fetch('/chat', {
+    // Stream the reply token by token; errors raised before streaming starts come back as JSON
+    fetch('/chat/stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
         body: JSON.stringify({ message: message })
     })
-    .then(response => response.json())
-    .then(data => {
+    .then(response => {
+        const isStream = (response.headers.get('Content-Type') || '').startsWith('text/event-stream');
+        if (!isStream || !response.body) {
+            return response.json().then(data => handleChatReply(data, null));
+        }
+        return readChatStream(response.body.getReader());
+    })
+    .catch(error => {
         showLoading(false);
-        if (data.error) {
-            addMessage(`❌ Error: ${data.response || data.error}`, 'system');
-        } else {
-            addMessage(data.response, 'ai');
-            
-            // Update session info
-            if (data.session_id) {
-                currentSessionId = data.session_id;
-                conversationTitle = data.conversation_title || 'New Conversation';
-                updateSessionInfo();
+        console.error('Error:', error);
+        addMessage('❌ Connection error. Please check your internet connection and try again.', 'system');
+    });
+}
+
+function readChatStream(reader) {
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let streamedText = '';
+    let aiMessageDiv = null;
+    let finished = false;
+    
+    function handleFrame(frame) {
+        let event = 'message';
+        let data = '';
+        frame.split('\n').forEach(line => {
+            if (line.startsWith('event:')) {
+                event = line.slice(6).trim();
+            } else if (line.startsWith('data:')) {
+                data += line.slice(5).trim();
             }
-            
-            // Check if the AI response indicates resume was updated
-            if (data.response.includes('Resume updated and compiled successfully') ||
-                data.response.includes('✅ Resume updated')) {
-                setTimeout(() => {
-                    loadPDFEmbed();
-                }, 1000);
+        });
+        if (!data) return;
+        const payload = JSON.parse(data);
+        
+        if (event === 'token') {
+            if (!aiMessageDiv) {
+                aiMessageDiv = addMessage('', 'ai');
             }
-            
-            // Check if we should refresh PDF based on content keywords
-            else if (messageCount > 2 && (
-                message.toLowerCase().includes('experience') ||
-                message.toLowerCase().includes('education') ||
-                message.toLowerCase().includes('skill') ||
-                message.toLowerCase().includes('project') ||
-                message.toLowerCase().includes('certification')
-            )) {
-                setTimeout(() => {
-                    refreshPDF();
-                    addMessage("✅ Resume updated! Check the preview on the right.", 'system');
-                }, 1000);
+            streamedText += payload.text;
+            aiMessageDiv.textContent = streamedText;
+            const chatMessages = document.getElementById('chatMessages');
+            chatMessages.scrollTop = chatMessages.scrollHeight;
+        } else if (event === 'done' || event === 'error') {
+            finished = true;
+            handleChatReply(payload, aiMessageDiv);
+        }
+    }
+    
+    function pump() {
+        return reader.read().then(({ done, value }) => {
+            if (done) {
+                if (!finished) {
+                    handleChatReply({ error: 'STREAM_CLOSED', response: 'The response stream ended unexpectedly.' }, aiMessageDiv);
+                }
+                return;
+            }
+            buffer += decoder.decode(value, { stream: true });
+            let boundary;
+            while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+                handleFrame(buffer.slice(0, boundary));
+                buffer = buffer.slice(boundary + 2);
             }
+            return pump();
+        });
+    }
+    
+    return pump();
+}
+
+function handleChatReply(data, aiMessageDiv) {
+    showLoading(false);
+    if (data.error && data.error !== 'COMPILE_QUEUE_FULL') {
+        if (aiMessageDiv) {
+            aiMessageDiv.remove();
+        }
+        addMessage(`❌ Error: ${data.response || data.error}`, 'system');
+        return;
+    }
+    
+    // Replace the streamed text with the final reply, which carries the tool status notes
+    if (aiMessageDiv) {
+        aiMessageDiv.innerHTML = data.response;
+    } else {
+        addMessage(data.response, 'ai');
+    }
+    
+    // Streamed replies can't carry a Server-Timing header; their breakdown arrives here
+    if (data.server_timing) {
+        console.debug('Server-Timing (/chat/stream):', data.server_timing);
+    }
+    
+    // Update session info
+    if (data.session_id) {
+        currentSessionId = data.session_id;
+        conversationTitle = data.conversation_title || 'New Conversation';
+        updateSessionInfo();
+    }
+    
+    // The PDF compiles in the background; reload the preview when it's done
+    if (data.compile_job_id) {
+        watchCompileJob(data.compile_job_id);
+    }
+}
+
+function watchCompileJob(jobId) {
+    // Subscribe to the job's Server-Sent Events; fall back to polling if the stream breaks
+    const source = new EventSource(`/jobs/${jobId}/events`);
+    let finished = false;
+    
+    source.addEventListener('completed', function(e) {
+        finished = true;
+        source.close();
+        handleCompileJobDone(JSON.parse(e.data));
+    });
+    
+    source.onerror = function() {
+        source.close();
+        if (!finished) {
+            pollCompileJob(jobId);
+        }
+    };
+}
+
+function pollCompileJob(jobId) {
+    fetch(`/jobs/${jobId}`)
+    .then(response => response.json())
+    .then(job => {
+        if (job.superseded_by) {
+            pollCompileJob(job.superseded_by);
+        } else if (job.status === 'done') {
+            handleCompileJobDone(job);
+        } else if (job.status) {
+            setTimeout(() => pollCompileJob(jobId), 1000);
         }
     })
     .catch(error => {
-        showLoading(false);
-        console.error('Error:', error);
-        addMessage('❌ Connection error. Please check your internet connection and try again.', 'system');
+        console.error('Error polling compile job:', error);
     });
 }
 
+function handleCompileJobDone(job) {
+    const result = job.result || {};
+    if (result.pdf_generated) {
+        loadPDFEmbed(result.artifact_id);
+        addMessage("📄 Resume PDF updated in the preview!", 'system');
+    } else {
+        addMessage("⚠️ Resume saved but compilation failed: " + (result.message || 'Unknown error'), 'system');
+    }
+}
+
 function addMessage(text, type) {
     const chatMessages = document.getElementById('chatMessages');
     const messageDiv = document.createElement('div');
@@ -266,6 +374,7 @@ function addMessage(text, type) {
     chatMessages.appendChild(messageDiv);
     chatMessages.scrollTop = chatMessages.scrollHeight;
     messageCount++;
+    return messageDiv;
 }
 
 function addTemplate(type) {
@@ -393,8 +502,15 @@ function showConversationHistory() {
     });
 }
 
-function loadConversations() {
-    fetch('/list_conversations')
+const CONVERSATIONS_PAGE_SIZE = 20;
+
+function loadConversations(before) {
+    const params = new URLSearchParams({ limit: CONVERSATIONS_PAGE_SIZE });
+    if (before) {
+        params.set('before', before);
+    }
+    
+    fetch(`/list_conversations?${params}`)
     .then(response => response.json())
     .then(data => {
         if (data.status === 'success' && data.conversations.length > 0) {
@@ -405,8 +521,15 @@ function loadConversations() {
                 conversationList += `   Messages: ${conv.message_count}\n\n`;
             });
             
-            const choice = prompt(conversationList + "Enter conversation number to load (or cancel):");
-            if (choice && !isNaN(choice)) {
+            let question = "Enter conversation number to load (or cancel):";
+            if (data.next_cursor) {
+                question = "Enter conversation number to load, 'm' for older conversations (or cancel):";
+            }
+            
+            const choice = prompt(conversationList + question);
+            if (choice && choice.trim().toLowerCase() === 'm' && data.next_cursor) {
+                loadConversations(data.next_cursor);
+            } else if (choice && !isNaN(choice)) {
                 const selectedIndex = parseInt(choice) - 1;
                 if (selectedIndex >= 0 && selectedIndex < data.conversations.length) {
                     switchToConversation(data.conversations[selectedIndex].session_id);
@@ -535,7 +658,7 @@ function generateLatexResume() {
             // If PDF was generated, reload the PDF viewer
             if (data.pdf_generated) {
                 setTimeout(() => {
-                    loadPDFEmbed();
+                    loadPDFEmbed(data.artifact_id);
                     addMessage("📄 Resume PDF updated and refreshed in preview!", 'system');
                 }, 500);
             } else {
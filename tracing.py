@@ -0,0 +1,112 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+
+# Per-request trace spans, reported to the browser as a Server-Timing header
+# so devtools shows where a /chat or compile request spent its time (prompt
+# build, LLM call, tools, file writes, queue wait, pdflatex, cleanup). The
+# active trace is a context variable, so it is per thread for the Flask app
+# and per task for the async one (asgi_app.py); compile jobs carry their own
+# trace, which the worker thread activates and a waiting request merges into
+# its own.
+
+SERVER_TIMING_ENABLED = os.getenv('SERVER_TIMING', '1') != '0'
+
+_active = ContextVar('trace', default=None)
+
+
+def _token(value: str) -> str:
+    """value reduced to the characters allowed in a Server-Timing metric name"""
+    return ''.join(c if c.isalnum() or c in '-_.' else '_' for c in value) or 'span'
+
+
+class Trace:
+    """Spans (name, start offset, duration, description) recorded during one request or job"""
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self.started = time.perf_counter()
+        self.spans = []
+
+    def add(self, name: str, duration: float, description: Optional[str] = None, start: Optional[float] = None):
+        """Record an already-measured span; start is a perf_counter() value"""
+        offset = (start if start is not None else time.perf_counter() - duration) - self.started
+        # list.append is atomic, so spans from a worker thread need no lock
+        self.spans.append((name, offset, duration, description))
+
+    def extend(self, other: 'Trace'):
+        """Copy the spans of another trace (e.g. a compile job's) into this one"""
+        shift = other.started - self.started
+        for name, offset, duration, description in list(other.spans):
+            self.spans.append((name, offset + shift, duration, description))
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self, total: bool = True) -> str:
+        """Spans as a Server-Timing header value, in milliseconds"""
+        entries = []
+        for name, _, duration, description in self.spans:
+            entry = f"{_token(name)};dur={duration * 1000:.1f}"
+            if description:
+                entry += ';desc="' + description.replace('\\', '\\\\').replace('"', "'") + '"'
+            entries.append(entry)
+        if total:
+            entries.append(f"total;dur={self.elapsed() * 1000:.1f}")
+        return ', '.join(entries)
+
+    def to_dict(self) -> dict:
+        return {
+            'name': self.name,
+            'total_ms': round(self.elapsed() * 1000, 2),
+            'spans': [{'name': name, 'start_ms': round(offset * 1000, 2), 'duration_ms': round(duration * 1000, 2),
+                       'description': description}
+                      for name, offset, duration, description in self.spans]
+        }
+
+
+def start_trace(name: str = '') -> Optional[Trace]:
+    """Make a new trace the active one (None when Server-Timing is off)"""
+    trace = Trace(name) if SERVER_TIMING_ENABLED else None
+    _active.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[Trace]:
+    return _active.get()
+
+
+def finish_trace() -> Optional[Trace]:
+    """Detach and return the active trace"""
+    trace = current_trace()
+    _active.set(None)
+    return trace
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """Make trace the active one for the block, e.g. in a worker thread or a streamed response"""
+    previous = current_trace()
+    _active.set(trace)
+    try:
+        yield trace
+    finally:
+        # set(), not reset(): a streamed response may be closed from another context
+        _active.set(previous)
+
+
+@contextmanager
+def span(name: str, description: Optional[str] = None):
+    """Time the block as a span of the active trace; a no-op without one"""
+    trace = current_trace()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, time.perf_counter() - started, description, started)
@@ -0,0 +1,176 @@
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+from tracing import span
+
+
+# Per-session compile workspaces. Each conversation gets its own directory
+# holding its current output.tex and the last few compiled PDFs (artifacts),
+# and every compile job runs in a throwaway sub-directory of it, so
+# concurrent requests never share output.tex / output.pdf / aux files.
+
+WORKSPACE_ROOT = os.getenv('NITI_WORKSPACE_DIR') or os.path.join(tempfile.gettempdir(), 'niti_ai_workspaces')
+MAX_ARTIFACTS_PER_SESSION = int(os.getenv('NITI_MAX_ARTIFACTS', '5'))
+# Workspace objects kept in memory; others are reopened from disk when needed
+MAX_OPEN_WORKSPACES = int(os.getenv('NITI_MAX_OPEN_WORKSPACES', '1000'))
+DEFAULT_SESSION_ID = 'default'
+
+_SAFE_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+
+def is_valid_id(value) -> bool:
+    """Session and artifact IDs end up in paths, so only allow a safe charset"""
+    return isinstance(value, str) and bool(_SAFE_ID.match(value))
+
+
+class SessionWorkspace:
+    """Directory layout and artifact bookkeeping for one conversation"""
+
+    def __init__(self, root: str, session_id: str):
+        self.session_id = session_id
+        self.path = os.path.join(root, session_id)
+        self.artifacts_dir = os.path.join(self.path, 'artifacts')
+        self.tex_file = os.path.join(self.path, 'output.tex')
+        self.data_file = os.path.join(self.path, 'resume.json')
+        self.lock = threading.Lock()
+        self._artifacts = []
+
+        os.makedirs(self.artifacts_dir, exist_ok=True)
+
+        # Pick up artifacts left by a previous process, oldest first
+        existing = [f for f in os.listdir(self.artifacts_dir) if f.endswith('.pdf')]
+        existing.sort(key=lambda f: os.path.getmtime(os.path.join(self.artifacts_dir, f)))
+        self._artifacts = [f[:-len('.pdf')] for f in existing]
+
+    @property
+    def latest_artifact_id(self) -> Optional[str]:
+        with self.lock:
+            return self._artifacts[-1] if self._artifacts else None
+
+    def write_source(self, latex_code: str) -> str:
+        """Persist the session's current LaTeX source and return its path"""
+        tmp_file = f"{self.tex_file}.{uuid.uuid4().hex}.tmp"
+        with span('write', 'output.tex'):
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                f.write(latex_code)
+            os.replace(tmp_file, self.tex_file)
+        return self.tex_file
+
+    def read_source(self) -> Optional[str]:
+        if not os.path.exists(self.tex_file):
+            return None
+        with open(self.tex_file, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    def write_data(self, data: dict):
+        """Persist the session's structured resume data"""
+        tmp_file = f"{self.data_file}.{uuid.uuid4().hex}.tmp"
+        with span('write', 'resume.json'):
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_file, self.data_file)
+
+    def read_data(self) -> Optional[dict]:
+        if not os.path.exists(self.data_file):
+            return None
+        with open(self.data_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def drop_data(self):
+        """Forget the structured resume data once output.tex was edited as LaTeX"""
+        try:
+            os.remove(self.data_file)
+        except FileNotFoundError:
+            pass
+
+    def new_job_dir(self) -> str:
+        """Create an isolated scratch directory for a single compile job"""
+        return tempfile.mkdtemp(prefix='job-', dir=self.path)
+
+    def store_artifact(self, pdf_file: str) -> str:
+        """Move a freshly compiled PDF into the artifact store and make it the latest"""
+        artifact_id = uuid.uuid4().hex
+        os.replace(pdf_file, self.artifact_path(artifact_id))
+        return self._register(artifact_id)
+
+    def link_artifact(self, pdf_file: str) -> str:
+        """Publish an existing PDF (e.g. a cache entry) as the latest artifact, leaving the source in place"""
+        artifact_id = uuid.uuid4().hex
+        tmp_file = f"{self.artifact_path(artifact_id)}.tmp"
+        try:
+            os.link(pdf_file, tmp_file)
+        except OSError:
+            shutil.copyfile(pdf_file, tmp_file)
+        os.replace(tmp_file, self.artifact_path(artifact_id))
+        return self._register(artifact_id)
+
+    def _register(self, artifact_id: str) -> str:
+        with self.lock:
+            self._artifacts.append(artifact_id)
+            stale = self._artifacts[:-MAX_ARTIFACTS_PER_SESSION]
+            del self._artifacts[:-MAX_ARTIFACTS_PER_SESSION]
+
+        for old_id in stale:
+            try:
+                os.remove(self.artifact_path(old_id))
+            except OSError:
+                pass
+        return artifact_id
+
+    def artifact_path(self, artifact_id: str) -> str:
+        return os.path.join(self.artifacts_dir, f"{artifact_id}.pdf")
+
+    def find_artifact(self, artifact_id: Optional[str] = None) -> Optional[str]:
+        """Path of the requested (or latest) artifact, or None if it is gone"""
+        if artifact_id is None:
+            artifact_id = self.latest_artifact_id
+        if not is_valid_id(artifact_id):
+            return None
+        pdf_file = self.artifact_path(artifact_id)
+        return pdf_file if os.path.exists(pdf_file) else None
+
+
+class WorkspaceManager:
+    """Hands out one SessionWorkspace per session ID, keeping the most recently used open"""
+
+    def __init__(self, root: str = WORKSPACE_ROOT, max_open: int = MAX_OPEN_WORKSPACES):
+        self.root = root
+        self.max_open = max_open
+        self._workspaces = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+
+    def get(self, session_id: Optional[str]) -> SessionWorkspace:
+        session_id = session_id or DEFAULT_SESSION_ID
+        if not is_valid_id(session_id):
+            raise ValueError(f"Invalid session ID: {session_id!r}")
+
+        with self._lock:
+            workspace = self._workspaces.get(session_id)
+            if workspace is None:
+                workspace = SessionWorkspace(self.root, session_id)
+                self._workspaces[session_id] = workspace
+                # Closing a workspace only drops the object; its files stay until remove()
+                while len(self._workspaces) > self.max_open:
+                    self._workspaces.popitem(last=False)
+            else:
+                self._workspaces.move_to_end(session_id)
+            return workspace
+
+    def remove(self, session_id: str):
+        """Drop a session's workspace and everything compiled in it"""
+        if not is_valid_id(session_id):
+            return
+        with self._lock:
+            self._workspaces.pop(session_id, None)
+        shutil.rmtree(os.path.join(self.root, session_id), ignore_errors=True)
+
+
+workspaces = WorkspaceManager()